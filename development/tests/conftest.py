@@ -0,0 +1,122 @@
+"""
+Közös pytest beállítások és segédek az add-on (silo_prediction.py) teszteléséhez
+
+A korábbi test_*.py szkriptek önállóan futtatandók (python development/tests/...),
+a pytest ezeket nem gyűjti.
+"""
+import os
+import sys
+import bisect
+import time
+from datetime import datetime, timedelta
+
+ADDON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'silo_prediction_addon')
+TECH_CSV_PATH = os.path.join(ADDON_DIR, 'tech_feed_data.csv')
+
+# Az add-on naplója /app/logs alá ír; a tech görbe az add-on könyvtárából ('tech_feed_data' néven)
+os.makedirs('/app/logs', exist_ok=True)
+os.environ.setdefault('HA_TOKEN', 'test')
+os.environ.setdefault('TECH_CURVES_DIR', ADDON_DIR)
+sys.path.insert(0, ADDON_DIR)
+
+import silo_prediction as sp  # noqa: E402
+
+collect_ignore = ['test_addon_fix.py', 'test_fallback_mode.py', 'test_fix.py', 'test_with_csv.py']
+
+ENTITY_ID = 'sensor.test_merleg_suly'
+SENSOR_NAME = 'Test Silo'
+DATE_SENSOR = 'sensor.test_silo'
+
+
+def synthetic_history(days: int = 25, birds: int = 20000, step_minutes: int = 10):
+    """
+    Szintetikus mérleg sor: csend időszak, ciklus eleji feltöltés, majd tech görbe
+    szerinti fogyás (nappal gyorsabban), 2000 kg alatt automatikus feltöltés
+
+    Returns:
+        (cycle_start, [(timestamp, weight), ...])
+    """
+    tech = sp.TechnologicalFeedData(TECH_CSV_PATH)
+    cycle_start = sp.LOCAL_TZ.localize(datetime(2025, 10, 1, 7, 0))
+    timestamp = cycle_start - timedelta(days=7)
+    weight = 300.0
+    refilled = False
+    history = []
+    while timestamp < cycle_start + timedelta(days=days):
+        if not refilled and timestamp >= cycle_start - timedelta(days=1):
+            weight += 15000
+            refilled = True
+        if timestamp >= cycle_start:
+            day = (timestamp - cycle_start).total_seconds() / 86400
+            rate = tech.get_daily_intake_per_bird(int(day)) * birds / 1000 / (1440 / step_minutes)
+            weight -= rate * (1.3 if 7 <= timestamp.hour < 19 else 0.7)
+            if weight < 2000:
+                weight += 12000
+        history.append((timestamp, round(weight / 10) * 10))
+        timestamp += timedelta(minutes=step_minutes)
+    return cycle_start, history
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code: int = 200):
+        self._payload = payload
+        self.status_code = status_code
+        self.text = ''
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise sp.requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+
+class FakeHomeAssistant:
+    """
+    HA REST API a szintetikus sorból (requests.get / requests.post helyett):
+    history a clock szerinti "most"-ig, a közzétett szenzor állapotok memóriában
+    """
+
+    def __init__(self, history, clock):
+        self.history = history
+        self.timestamps = [timestamp for timestamp, _ in history]
+        self.clock = clock
+        self.states = {}
+        self.posts = []  # (entity_id, state, attributes) sorrendben
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        if '/api/history/period/' in url:
+            start = datetime.fromisoformat(url.split('/api/history/period/')[1])
+            end = min(datetime.fromisoformat(params['end_time']), self.clock.now())
+            first = bisect.bisect_left(self.timestamps, start)
+            last = bisect.bisect_right(self.timestamps, end)
+            return FakeResponse([[{'state': str(weight), 'last_changed': timestamp.isoformat()}
+                                  for timestamp, weight in self.history[first:last]]])
+        if '/api/states/' in url:
+            entity_id = url.split('/api/states/')[1]
+            return FakeResponse(self.states[entity_id]) if entity_id in self.states else FakeResponse({}, 404)
+        return FakeResponse({'message': 'API running.'})
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        entity_id = url.split('/api/states/')[1]
+        self.states[entity_id] = json
+        self.posts.append((entity_id, json['state'], json['attributes']))
+        return FakeResponse({})
+
+    def install(self, monkeypatch):
+        monkeypatch.setattr(sp.requests, 'get', self.get)
+        monkeypatch.setattr(sp.requests, 'post', self.post)
+
+
+def make_predictor(clock) -> 'sp.SiloPredictor':
+    return sp.SiloPredictor('http://ha', 'test', ENTITY_ID, SENSOR_NAME, 1000, 20000, 45,
+                            tech_csv_path=TECH_CSV_PATH, clock=clock)
+
+
+def wait_idle(manager, timeout: float = 30.0):
+    """Futó feladatok befejezése és eredményük alkalmazása (a fő szál helyett)"""
+    deadline = time.time() + timeout
+    while manager._in_flight:
+        assert time.time() < deadline, f"feladatok nem fejeződtek be: {list(manager._in_flight)}"
+        manager._reap_finished()
+        time.sleep(0.01)
@@ -0,0 +1,232 @@
+"""
+Nem blokkoló Home Assistant kliens (AsyncHAClient, user-044): REST és WebSocket
+egy helyi aiohttp szerveren, ami a HA API-t utánozza
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+
+from conftest import DATE_SENSOR, FakeHomeAssistant, FakeResponse, make_predictor, sp, synthetic_history
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import TestServer  # noqa: E402
+
+TOKEN = 'secret-token'
+ENTITY_ID = 'sensor.test_merleg_suly'
+
+
+class HomeAssistantServer:
+    """HA REST + WebSocket API minimálisan: hitelesítés, history, szenzor POST, subscribe_trigger"""
+
+    def __init__(self):
+        self.posted = {}
+        self.subscriptions = []
+        self.auth_messages = []
+        self.app = web.Application()
+        self.app.router.add_get('/api/history/period/{start}', self.history)
+        self.app.router.add_post('/api/states/{entity_id}', self.post_state)
+        self.app.router.add_get('/api/websocket', self.websocket)
+
+    @staticmethod
+    def authorized(request) -> bool:
+        return request.headers.get('Authorization') == f'Bearer {TOKEN}'
+
+    async def history(self, request):
+        if not self.authorized(request):
+            return web.Response(status=401)
+        return web.json_response([[{'state': '1234.0', 'last_changed': request.match_info['start']},
+                                   {'state': request.query['filter_entity_id'], 'last_changed': request.query['end_time']}]])
+
+    async def post_state(self, request):
+        if not self.authorized(request):
+            return web.Response(status=401)
+        self.posted[request.match_info['entity_id']] = await request.json()
+        return web.json_response({})
+
+    async def websocket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({'type': 'auth_required'})
+        auth = await ws.receive_json()
+        self.auth_messages.append(auth)
+        if auth.get('access_token') != TOKEN:
+            await ws.send_json({'type': 'auth_invalid', 'message': 'Invalid access token'})
+            await ws.close()
+            return ws
+        await ws.send_json({'type': 'auth_ok'})
+
+        subscribe = await ws.receive_json()
+        self.subscriptions.append(subscribe)
+        await ws.send_json({'id': subscribe['id'], 'type': 'result', 'success': True, 'result': None})
+        await ws.send_json({'id': subscribe['id'], 'type': 'event', 'event': {'variables': {'trigger': {
+            'platform': 'state', 'entity_id': ENTITY_ID,
+            'from_state': {'state': '1000.0'}, 'to_state': {'state': '1100.0'}}}}})
+        async for _ in ws:  # a kliens zárja
+            pass
+        return ws
+
+
+async def run_with_server(scenario):
+    server = HomeAssistantServer()
+    test_server = TestServer(server.app)
+    await test_server.start_server()
+    try:
+        return server, await scenario(str(test_server.make_url('')).rstrip('/'))
+    finally:
+        await test_server.close()
+
+
+def test_rest_calls_with_aiohttp_session():
+    async def scenario(ha_url):
+        results = []
+        for token in (TOKEN, 'wrong'):
+            client = sp.AsyncHAClient(ha_url, token)
+            await client.start()
+            try:
+                assert client.websocket_available
+                results.append(await client.get_json(f"{ha_url}/api/history/period/2025-10-01T00:00:00",
+                                                     params={'filter_entity_id': ENTITY_ID,
+                                                             'end_time': '2025-10-02T00:00:00'}))
+                if token == TOKEN:
+                    await client.post_json(f"{ha_url}/api/states/sensor.test_silo",
+                                           {'state': 'ok', 'attributes': {'stale': False}})
+                else:
+                    with pytest.raises(aiohttp.ClientResponseError):
+                        await client.post_json(f"{ha_url}/api/states/sensor.test_silo", {'state': 'x'})
+            finally:
+                await client.close()
+        return results
+
+    server, results = asyncio.run(run_with_server(scenario))
+
+    status, history = results[0]
+    assert status == 200
+    assert history[0][1] == {'state': ENTITY_ID, 'last_changed': '2025-10-02T00:00:00'}
+    assert results[1] == (401, None)
+    assert server.posted == {'sensor.test_silo': {'state': 'ok', 'attributes': {'stale': False}}}
+
+
+def test_watch_states_authenticates_subscribes_and_reports_events():
+    async def scenario(ha_url):
+        client = sp.AsyncHAClient(ha_url, TOKEN)
+        await client.start()
+        changes = asyncio.Queue()
+        watcher = asyncio.create_task(client.watch_states([ENTITY_ID], lambda *change: changes.put_nowait(change)))
+        try:
+            return await asyncio.wait_for(changes.get(), timeout=10)
+        finally:
+            watcher.cancel()
+            await asyncio.gather(watcher, return_exceptions=True)
+            await client.close()
+
+    server, change = asyncio.run(run_with_server(scenario))
+
+    assert server.auth_messages == [{'type': 'auth', 'access_token': TOKEN}]
+    assert server.subscriptions == [{'id': 1, 'type': 'subscribe_trigger',
+                                     'trigger': {'platform': 'state', 'entity_id': [ENTITY_ID]}}]
+    assert change == (ENTITY_ID, '1000.0', '1100.0')
+
+
+def test_watch_states_stops_on_rejected_token():
+    async def scenario(ha_url):
+        client = sp.AsyncHAClient(ha_url, 'wrong')
+        await client.start()
+        try:
+            await asyncio.wait_for(client.watch_states([ENTITY_ID], lambda *change: None), timeout=10)
+        finally:
+            await client.close()
+
+    server, _ = asyncio.run(run_with_server(scenario))
+    assert server.auth_messages == [{'type': 'auth', 'access_token': 'wrong'}]
+    assert server.subscriptions == []
+
+
+@pytest.mark.parametrize('ha_url, expected', [
+    ('http://supervisor/core', 'ws://supervisor/core/websocket'),
+    ('https://ha.local:8123/', 'wss://ha.local:8123/api/websocket'),
+])
+def test_websocket_url(ha_url, expected):
+    assert sp.AsyncHAClient(ha_url, TOKEN).websocket_url == expected
+
+
+def test_requests_fallback_without_session(monkeypatch):
+    calls = []
+
+    def fake_get(url, headers=None, params=None, timeout=None):
+        calls.append(('get', url, headers['Authorization']))
+        return FakeResponse([[]]) if 'history' in url else FakeResponse(None, 502)
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        calls.append(('post', url, json))
+        return FakeResponse({}, 500)
+
+    monkeypatch.setattr(sp.requests, 'get', fake_get)
+    monkeypatch.setattr(sp.requests, 'post', fake_post)
+
+    async def scenario():
+        client = sp.AsyncHAClient('http://ha', TOKEN)  # start() nélkül: nincs aiohttp munkamenet
+        assert not client.websocket_available
+        history = await client.get_json('http://ha/api/history/period/x')
+        state = await client.get_json('http://ha/api/states/x')
+        with pytest.raises(sp.requests.HTTPError):
+            await client.post_json('http://ha/api/states/x', {'state': 'x'})
+        return history, state
+
+    assert asyncio.run(scenario()) == ((200, [[]]), (502, None))
+    assert calls[0] == ('get', 'http://ha/api/history/period/x', f'Bearer {TOKEN}')
+    assert calls[-1] == ('post', 'http://ha/api/states/x', {'state': 'x'})
+
+
+def test_process_async_over_aiohttp(monkeypatch):
+    """Teljes feldolgozás asyncio módban, natív aiohttp munkamenettel (requests hívás nélkül)"""
+    cycle_start, history = synthetic_history(days=25)
+    clock = sp.VirtualClock(cycle_start + timedelta(days=20, hours=10))
+    ha = FakeHomeAssistant(history, clock)
+
+    def no_requests(*args, **kwargs):
+        raise AssertionError("asyncio módban aiohttp-vel nem hívhat requests-et")
+
+    monkeypatch.setattr(sp.requests, 'get', no_requests)
+    monkeypatch.setattr(sp.requests, 'post', no_requests)
+
+    async def history_handler(request):
+        response = ha.get(f"/api/history/period/{request.match_info['start']}", params=dict(request.query))
+        return web.json_response(response.json())
+
+    async def state_handler(request):
+        response = ha.get(f"/api/states/{request.match_info['entity_id']}")
+        return web.json_response(response.json(), status=response.status_code)
+
+    async def post_handler(request):
+        ha.post(f"/api/states/{request.match_info['entity_id']}", json=await request.json())
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_get('/api/history/period/{start}', history_handler)
+    app.router.add_get('/api/states/{entity_id}', state_handler)
+    app.router.add_post('/api/states/{entity_id}', post_handler)
+
+    async def scenario():
+        test_server = TestServer(app)
+        await test_server.start_server()
+        client = sp.AsyncHAClient(str(test_server.make_url('')).rstrip('/'), TOKEN)
+        await client.start()
+        silo = make_predictor(clock)
+        silo.ha_url = client.ha_url
+        try:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                await silo.process_async(client, executor)
+        finally:
+            await client.close()
+            await test_server.close()
+        return silo
+
+    silo = asyncio.run(scenario())
+    assert silo.last_prediction is not None
+    attributes = ha.states[DATE_SENSOR]['attributes']
+    assert attributes['stale'] is False
+    assert attributes['predicted_empty_timestamp'] == silo.last_prediction['predicted_empty_timestamp']
+    assert silo.last_published_at == clock.time()
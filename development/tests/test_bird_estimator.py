@@ -0,0 +1,107 @@
+"""
+Rekurzív madárszám becslő és a napi fogyasztási tábla (user-037)
+"""
+from datetime import timedelta
+
+import pytest
+
+from conftest import make_predictor, sp, synthetic_history
+
+
+@pytest.fixture(scope='module')
+def cycle():
+    """(predictor, cycle_start, folyamatos görbe, adathiány index) a szintetikus sorból"""
+    cycle_start, history = synthetic_history(days=25)
+    clock = sp.VirtualClock(history[-1][0])
+    predictor = make_predictor(clock)
+    predictor.cycle_start_date = cycle_start
+    daily_data = predictor.sample_daily_data(history)
+    continuous_data = predictor.create_continuous_curve(daily_data, cycle_start)
+    return predictor, cycle_start, continuous_data, sp.SeriesGapIndex.from_series(continuous_data)
+
+
+def test_chunked_updates_match_full_table(cycle):
+    predictor, _, continuous_data, gap_index = cycle
+    full = sp.BirdCountEstimator()
+    added = full.update_from_table(sp.DailyConsumptionTable.build(continuous_data, predictor.tech_data, gap_index))
+    assert added > 10
+
+    # Futásonként csak az utolsó beépített nap utáni 7:00-as párok
+    chunked = sp.BirdCountEstimator()
+    for end in range(9, len(continuous_data) + 1, 5):
+        table = sp.DailyConsumptionTable.build(continuous_data[:end], predictor.tech_data, gap_index,
+                                               after_day=chunked.last_day)
+        if chunked.last_day is not None:
+            assert all(day > chunked.last_day for day in table.day.tolist())
+        chunked.update_from_table(table)
+
+    assert chunked.to_dict() == full.to_dict()
+    assert chunked.estimate == pytest.approx(full.estimate)
+    assert chunked.variance == pytest.approx(full.variance)
+
+
+def test_after_day_builds_only_new_pairs(cycle):
+    predictor, _, continuous_data, gap_index = cycle
+    full = sp.DailyConsumptionTable.build(continuous_data, predictor.tech_data, gap_index)
+    last_day = int(full.day[len(full) // 2])
+
+    tail = sp.DailyConsumptionTable.build(continuous_data, predictor.tech_data, gap_index, after_day=last_day)
+    mask = full.day > last_day
+    assert tail.day.tolist() == full.day[mask].tolist()
+    assert tail.consumption_kg.tolist() == full.consumption_kg[mask].tolist()
+
+    # Már minden nap beépült → üres tábla
+    assert len(sp.DailyConsumptionTable.build(continuous_data, predictor.tech_data, gap_index,
+                                              after_day=int(full.day[-1]))) == 0
+
+
+def test_state_round_trip(cycle):
+    predictor, cycle_start, continuous_data, gap_index = cycle
+    estimator = sp.BirdCountEstimator()
+    estimator.reset(cycle_start.isoformat())
+    estimator.update_from_table(sp.DailyConsumptionTable.build(continuous_data[:40], predictor.tech_data, gap_index))
+
+    restored = sp.BirdCountEstimator()
+    restored.load_dict(estimator.to_dict())
+    assert restored.to_dict() == estimator.to_dict()
+
+    # Folytatás a visszatöltött állapotból = folytatás az eredetiből (a perzisztált kerekítésen belül)
+    rest = sp.DailyConsumptionTable.build(continuous_data, predictor.tech_data, gap_index,
+                                          after_day=estimator.last_day)
+    estimator.update_from_table(rest)
+    restored.update_from_table(rest)
+    assert restored.last_day == estimator.last_day
+    assert restored.updates == estimator.updates
+    assert restored.estimate == pytest.approx(estimator.estimate, abs=1.0)
+
+
+@pytest.mark.parametrize('state', [None, 'x', {}, {'estimate': 'abc', 'variance': 1, 'last_day': 3}])
+def test_invalid_state_gives_empty_estimator(state):
+    estimator = sp.BirdCountEstimator()
+    estimator.load_dict(state)
+    assert estimator.estimate is None
+    assert estimator.last_day is None
+
+
+def test_new_cycle_start_resets_estimator(cycle):
+    _, cycle_start, continuous_data, gap_index = cycle
+    predictor = make_predictor(sp.VirtualClock(continuous_data[-1][0]))
+    predictor.cycle_start_date = cycle_start
+
+    first = predictor.update_bird_estimator(continuous_data, gap_index)
+    assert first is not None
+    updates = predictor.bird_estimator.updates
+    assert predictor.bird_estimator.cycle_start == cycle_start.isoformat()
+
+    # Ugyanaz a ciklus: nincs új nap, nincs újrafeldolgozás
+    assert predictor.update_bird_estimator(continuous_data, gap_index) == first
+    assert predictor.bird_estimator.updates == updates
+
+    # Új 0. nap: a becslő újraindul, csak az új ciklus napjaiból épül
+    predictor.cycle_start_date = cycle_start + timedelta(days=10)
+    new_cycle = [row for row in continuous_data if row[0] >= predictor.cycle_start_date]
+    new_cycle = [(timestamp, weight, day - 10, exact_day - 10) for timestamp, weight, day, exact_day in new_cycle]
+    predictor.update_bird_estimator(new_cycle, sp.SeriesGapIndex.from_series(new_cycle))
+    assert predictor.bird_estimator.cycle_start == predictor.cycle_start_date.isoformat()
+    assert 0 < predictor.bird_estimator.updates < updates
+    assert predictor.bird_estimator.last_day == continuous_data[-1][2] - 10 - 1
@@ -0,0 +1,113 @@
+"""
+Zárt alakú kiürülési megoldók vs. a lecserélt lépésenkénti ciklusok
+(solve_arithmetic_depletion, Exp-only és növekedési korrekció, user-029)
+"""
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from conftest import make_predictor, sp
+
+
+def depletion_steps_loop(weight, first_step, step_increment, max_steps):
+    """Lépésenkénti referencia: a j. lépésben first_step + j × step_increment fogyás, lépésen belül egyenletesen"""
+    if weight <= 0:
+        return 0.0
+    for j in range(int(max_steps) + 1):
+        consumption = first_step + step_increment * j
+        if consumption > 0 and weight <= consumption:
+            steps = j + weight / consumption
+            return steps if steps <= max_steps else None
+        if consumption <= 0 and step_increment <= 0:
+            return None  # Nem növekvő, nem pozitív fogyás: soha nem ürül ki
+        weight -= consumption
+    return None
+
+
+CASES = {
+    'b>0': (15000.0, 1800.0, 60.0),
+    'b<0': (15000.0, 3000.0, -80.0),
+    'b=0': (15000.0, 2500.0, 0.0),
+    'b<0 nincs metszés': (15000.0, 1000.0, -100.0),
+    'b=0 nem fogy': (15000.0, 0.0, 0.0),
+    'b>0 negatív kezdő fogyás': (5000.0, -200.0, 150.0),
+}
+
+
+@pytest.mark.parametrize('weight, first_step, step_increment', CASES.values(), ids=CASES.keys())
+def test_arithmetic_depletion_matches_step_loop(weight, first_step, step_increment):
+    expected = depletion_steps_loop(weight, first_step, step_increment, 60)
+    actual = sp.solve_arithmetic_depletion(weight, first_step, step_increment, 60)
+
+    if expected is None:
+        assert actual is None
+    else:
+        assert actual == pytest.approx(expected, rel=1e-9)
+
+
+def test_arithmetic_depletion_edges():
+    assert sp.solve_arithmetic_depletion(0.0, 100.0, 1.0, 60) == 0.0
+    assert sp.solve_arithmetic_depletion(-5.0, 100.0, 1.0, 60) == 0.0
+    # Pontosan lépéshatáron
+    assert sp.solve_arithmetic_depletion(300.0, 100.0, 0.0, 60) == pytest.approx(3.0)
+    assert sp.solve_arithmetic_depletion(330.0, 100.0, 10.0, 60) == pytest.approx(3.0)
+    # Horizonton túl
+    assert sp.solve_arithmetic_depletion(1e6, 100.0, 0.0, 60) is None
+
+
+@pytest.mark.parametrize('weight, base_rate, acceleration', [
+    (15000.0, 1800.0, 60.0),
+    (15000.0, 3000.0, -80.0),
+    (12345.0, 2222.0, 0.0),
+    (15000.0, 1000.0, -100.0),
+    (200000.0, 1500.0, 10.0),
+], ids=['b>0', 'b<0', 'b=0', 'b<0 nincs metszés', 'horizonton túl'])
+def test_exp_only_matches_hourly_loop(weight, base_rate, acceleration):
+    max_days = 60
+    clock = sp.VirtualClock(sp.LOCAL_TZ.localize(datetime(2025, 10, 20, 12, 0)))
+    predictor = make_predictor(clock)
+
+    # A lecserélt ciklus: napi ráta naponta gyorsulással, óránként levonva
+    daily_rates = base_rate + acceleration * np.arange(max_days)
+    loop_hours = sp._hourly_depletion_loop(weight, daily_rates / 24.0)
+
+    _, closed_days = predictor.predict_with_exp_only(weight, [], base_rate, acceleration)
+    _, iterative_days = predictor.predict_with_exp_only(weight, [], base_rate, acceleration, iterative=True)
+    assert iterative_days * 24 == loop_hours
+
+    if loop_hours >= max_days * 24:
+        assert closed_days == max_days
+    else:
+        # Egész órás ciklus: az első óra vége, amikor a súly <= 0 → zárt alak ebben az órában
+        assert loop_hours - 1 < closed_days * 24 <= loop_hours + 1e-9
+
+
+@pytest.mark.parametrize('weight, base_slope, growth_rate, age_days', [
+    (15000.0, -60.0, 0.05, 20.0),
+    (15000.0, -120.0, -0.02, 20.0),
+    (8000.0, -90.0, 0.0, 10.0),
+    (15000.0, 5.0, -0.01, 20.0),
+    (15000.0, 30.0, 0.05, 5.0),
+], ids=['b>0', 'b<0', 'b=0', 'b<0 nincs metszés', 'b>0 eleinte töltődik'])
+def test_growth_correction_matches_step_loop(weight, base_slope, growth_rate, age_days):
+    step_hours = 3
+    max_steps = 10000 // step_hours
+    predictor = make_predictor(sp.VirtualClock(sp.LOCAL_TZ.localize(datetime(2025, 10, 20, 12, 0))))
+    predictor.growth_rate_kg_per_hour_per_day = growth_rate
+
+    loop_steps = sp._growth_depletion_loop(weight, base_slope, growth_rate, age_days, step_hours, max_steps)
+    closed_hours = predictor._calculate_with_growth_correction(weight, base_slope, 0.0, age_days)
+    iterative_hours = predictor._calculate_with_growth_correction(weight, base_slope, 0.0, age_days,
+                                                                  iterative=True)
+    assert iterative_hours == loop_steps * step_hours
+
+    if loop_steps >= max_steps:
+        assert closed_hours == max_steps * step_hours
+    else:
+        # A ciklus a 0 kg-ot elérő lépés végét adja, a zárt alak ezen a lépésen belüli időpontot
+        assert (loop_steps - 1) * step_hours < closed_hours <= loop_steps * step_hours + 1e-9
+        exact = depletion_steps_loop(weight, step_hours * (growth_rate * age_days - base_slope),
+                                     step_hours * growth_rate * step_hours / 24.0, max_steps)
+        assert closed_hours == pytest.approx(exact * step_hours, rel=1e-9)
+
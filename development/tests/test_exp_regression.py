@@ -0,0 +1,132 @@
+"""
+Exp állandó csúszó ablakos regressziója (calculate_exp_constant / RegressionAccumulator, user-033)
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from conftest import make_predictor, sp
+
+STEP = timedelta(hours=6)
+
+
+def normalized_curve(days=20, start=datetime(2025, 10, 1, 1, 0), skip=(), seed=3):
+    """6 órás normalizált görbe: 2000 + 60 × nap kg/nap fogyás zajjal, 'skip' indexek kihagyva (adathiány)"""
+    rng = np.random.default_rng(seed)
+    start = sp.LOCAL_TZ.localize(start)
+    weight = 40000.0
+    curve = []
+    for i in range(days * 4):
+        if i not in skip:
+            curve.append((start + i * STEP, weight))
+        weight -= (2000 + 60 * i / 4) / 4 + rng.normal(0, 40)
+    return curve
+
+
+def reference_points(curve):
+    """
+    A regresszió pontjai közvetlenül a görbéből: lezárt periódusok (az utolsó, még
+    gyűlő minta nélkül), pontosan 24 órás, adathiányt át nem ívelő, >10 kg-os párok,
+    csak az ablakban (a sor eleje + 24 órától)
+    """
+    epoch = np.array([timestamp.timestamp() for timestamp, _ in curve])
+    weight = np.array([w for _, w in curve])
+    points = []
+    for i in range(len(curve) - 1):
+        prev = np.nonzero(epoch == epoch[i] - 86400)[0]
+        if not len(prev):
+            continue
+        prev = prev[0]
+        if np.any(np.diff(epoch[prev:i + 1]) > sp.GAP_THRESHOLD_HOURS * 3600):
+            continue
+        consumption = abs(weight[prev] - weight[i])
+        if consumption > 10 and epoch[i] >= epoch[0] + 86400 - 60:
+            points.append((epoch[i] / 86400, consumption))
+    return np.array(points)
+
+
+def assert_matches_polyfit(predictor, result, curve):
+    points = reference_points(curve)
+    x, y = points[:, 0], points[:, 1]
+    slope, _ = np.polyfit(x, y, 1)
+    residuals = y - np.polyval(np.polyfit(x, y, 1), x)
+    slope_stderr = np.sqrt(np.sum(residuals ** 2) / (len(x) - 2) / np.sum((x - x.mean()) ** 2))
+
+    exp_constant, base_rate, acceleration = result
+    assert predictor.exp_fit_stats['n'] == len(x)
+    assert acceleration == pytest.approx(slope, rel=1e-6)
+    assert base_rate == pytest.approx(y.mean(), rel=1e-9)
+    assert exp_constant == pytest.approx(slope / y.mean(), rel=1e-6)
+    assert predictor.exp_fit_stats['slope_stderr'] == pytest.approx(slope_stderr, rel=1e-6)
+    assert predictor.exp_fit_stats['rate_stderr'] == pytest.approx(y.std(ddof=1) / np.sqrt(len(y)), rel=1e-6)
+
+
+@pytest.fixture
+def predictor():
+    return make_predictor(sp.VirtualClock(sp.LOCAL_TZ.localize(datetime(2025, 11, 1))))
+
+
+@pytest.mark.parametrize('skip', [(), tuple(range(30, 33))], ids=['continuous', 'with_gap'])
+def test_sliding_calls_match_polyfit(predictor, skip):
+    curve = normalized_curve(days=30, skip=skip)
+
+    # Futásonként egy-két új periódus, a sor eleje is csúszik (7 napos ablak)
+    for end in range(12, len(curve) + 1, 3):
+        window = [row for row in curve[:end] if row[0] >= curve[end - 1][0] - timedelta(days=7)]
+        result = predictor.calculate_exp_constant(window)
+        assert_matches_polyfit(predictor, result, window)
+
+
+def test_open_last_period_is_excluded(predictor):
+    curve = normalized_curve(days=10)
+    assert_matches_polyfit(predictor, predictor.calculate_exp_constant(curve), curve)
+
+    # A még gyűlő utolsó periódus értéke (bármilyen ideiglenes érték) nem számít...
+    extended = curve + [(curve[-1][0] + STEP, curve[-1][1] - 300)]
+    provisional = extended[:-1] + [(extended[-1][0], extended[-1][1] - 5000)]
+    result = predictor.calculate_exp_constant(provisional)
+    assert predictor.exp_fit_stats['n'] == len(reference_points(extended))
+    assert make_predictor(predictor.clock).calculate_exp_constant(extended) == pytest.approx(result)
+
+    # ...és lezárása után a végleges értékével kerül be (az ideiglenes nem ragad be)
+    extended.append((extended[-1][0] + STEP, extended[-1][1] - 500))
+    assert_matches_polyfit(predictor, predictor.calculate_exp_constant(extended), extended)
+
+
+def test_rebuild_when_last_period_disappears(predictor):
+    first = normalized_curve(days=10)
+    predictor.calculate_exp_constant(first)
+
+    # Új sor (pl. újraindulás / új ciklus): az utoljára feldolgozott periódus nincs benne
+    second = normalized_curve(days=10, start=datetime(2025, 10, 20, 1, 0), seed=7)
+    result = predictor.calculate_exp_constant(second)
+    assert_matches_polyfit(predictor, result, second)
+    assert predictor._exp_origin == second[0][0].timestamp()
+
+    fresh = make_predictor(predictor.clock)
+    assert fresh.calculate_exp_constant(second) == pytest.approx(result)
+
+
+def test_too_few_points(predictor):
+    assert predictor.calculate_exp_constant(normalized_curve(days=1)) == (0.0, 0.0, 0.0)
+    # 2 nap: 8 minta, de csak 2 lezárt 24 órás pár (az utolsó periódus még gyűlik)
+    assert predictor.calculate_exp_constant(normalized_curve(days=2)[:7]) == (0.0, 0.0, 0.0)
+
+
+def test_accumulator_add_remove_matches_polyfit():
+    rng = np.random.default_rng(0)
+    x = np.arange(50, dtype=float)
+    y = 3.0 * x + 10 + rng.normal(0, 2, len(x))
+
+    accumulator = sp.RegressionAccumulator.from_arrays(x[:30], y[:30])
+    accumulator.remove(x[:10], y[:10])
+    accumulator.add(x[30:], y[30:])
+    fit = accumulator.fit()
+
+    slope, intercept = np.polyfit(x[10:], y[10:], 1)
+    assert accumulator.n == 40
+    assert fit['slope'] == pytest.approx(slope)
+    assert fit['intercept'] == pytest.approx(intercept)
+    assert fit['rvalue'] == pytest.approx(np.corrcoef(x[10:], y[10:])[0, 1])
+    assert sp.RegressionAccumulator.from_arrays([1.0, 1.0], [2.0, 3.0]).fit() is None
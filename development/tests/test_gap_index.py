@@ -0,0 +1,89 @@
+"""
+Adathiány index és időalapú keresés (SeriesGapIndex, user-026)
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from conftest import make_predictor, sp, synthetic_history
+
+START = datetime(2025, 10, 1, 1, 0)
+
+
+def series(hours):
+    """Időbélyegek a START-tól órában megadott eltolásokkal"""
+    return [sp.LOCAL_TZ.localize(START) + timedelta(hours=h) for h in hours]
+
+
+def test_gaps_above_threshold_only():
+    timestamps = series([0, 6, 12, 21, 30.5, 36, 60])
+    index = sp.SeriesGapIndex(timestamps, threshold_hours=9.0)
+
+    # 12 → 21 pontosan a küszöb (nem hiány), 21 → 30.5 és 36 → 60 hiány
+    assert index.gaps == [(timestamps[3], timestamps[4]), (timestamps[5], timestamps[6])]
+    assert index.gap_starts.tolist() == [timestamps[3].timestamp(), timestamps[5].timestamp()]
+    assert index.gap_ends.tolist() == [timestamps[4].timestamp(), timestamps[6].timestamp()]
+
+    assert sp.SeriesGapIndex(series([0])).gaps == []
+    assert sp.SeriesGapIndex([]).gaps == []
+    assert sp.SeriesGapIndex.from_series([(t, 1.0) for t in timestamps]).gaps == index.gaps
+
+
+def test_find_at_nearest_within_tolerance():
+    epoch = np.array([0.0, 100.0, 200.0, 400.0])
+
+    # Alapértelmezett tűrés 60 s: a legközelebbi minta, ha elég közel van
+    assert sp.SeriesGapIndex.find_at(epoch, [0.0, 130.0, 170.0, 300.0, 460.0, 461.0, -50.0]).tolist() == \
+        [0, 1, 2, -1, 3, -1, 0]
+    assert sp.SeriesGapIndex.find_at(epoch, [150.0], tolerance_seconds=10).tolist() == [-1]
+    assert sp.SeriesGapIndex.find_at(epoch, 390.0).tolist() == 3
+    assert sp.SeriesGapIndex.find_at(np.array([]), [1.0, 2.0]).tolist() == [-1, -1]
+
+
+def test_lookup_24h_earlier_is_time_based():
+    # Kimaradt minták: az i-4. minta NEM a 24 órával korábbi
+    timestamps = series([0, 6, 18, 24, 30, 36, 42, 48])
+    index = sp.SeriesGapIndex(timestamps)
+    epoch = index.epoch
+
+    assert index.lookup(epoch - 86400).tolist() == [-1, -1, -1, 0, 1, -1, 2, 3]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_spans_gap_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    hours = np.cumsum(rng.choice([6.0, 6.0, 6.0, 12.0, 30.0], size=60))
+    index = sp.SeriesGapIndex(series(hours.tolist()))
+    epoch = index.epoch
+
+    start = rng.uniform(epoch[0] - 86400, epoch[-1], 400)
+    end = start + rng.uniform(0, 4 * 86400, 400)
+    expected = [any(start[k] <= gap_start and gap_end <= end[k]
+                    for gap_start, gap_end in zip(index.gap_starts, index.gap_ends))
+                for k in range(len(start))]
+
+    assert index.spans_gap(start, end).tolist() == expected
+    assert not sp.SeriesGapIndex(series([0, 6, 12])).spans_gap(start, end).any()
+
+
+def test_daily_pairs_do_not_span_gaps():
+    cycle_start, history = synthetic_history(days=20)
+    clock = sp.VirtualClock(history[-1][0])
+    predictor = make_predictor(clock)
+    daily_data = predictor.sample_daily_data(history)
+    continuous = predictor.create_continuous_curve(daily_data, cycle_start)
+
+    # 10. nap 3:00 és 11. nap 12:00 között nincs adat
+    gap_from, gap_to = cycle_start + timedelta(days=10, hours=-4), cycle_start + timedelta(days=11, hours=5)
+    holed = [row for row in continuous if not gap_from < row[0] < gap_to]
+    index = sp.SeriesGapIndex.from_series(holed)
+    assert len(index.gaps) == 1
+
+    full = sp.DailyConsumptionTable.build(continuous, predictor.tech_data, sp.SeriesGapIndex.from_series(continuous))
+    table = sp.DailyConsumptionTable.build(holed, predictor.tech_data, index)
+
+    gap_start, gap_end = index.gap_starts[0], index.gap_ends[0]
+    assert len(table) > 0
+    assert all(not (day_start <= gap_start and gap_end <= day_start + 86400) for day_start in table.epoch.tolist())
+    assert set(table.day.tolist()) < set(full.day.tolist())
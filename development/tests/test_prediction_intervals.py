@@ -0,0 +1,51 @@
+"""
+Monte Carlo predikciós intervallum (calculate_prediction_intervals, user-031)
+"""
+from datetime import datetime
+
+import pytest
+
+from conftest import make_predictor, sp
+
+
+@pytest.fixture
+def predictor():
+    clock = sp.VirtualClock(sp.LOCAL_TZ.localize(datetime(2025, 10, 20, 12, 0)))
+    predictor = make_predictor(clock)
+    predictor.model_state = {
+        'computed_at': clock.now(),
+        'current_weight': 6000.0,
+        'current_day': 20,
+        'bird_count': 20000,
+        'base_rate': 2000.0,
+        'acceleration': 50.0,
+        'correction_factor': 1.0,
+        'tech_offset_days': 0.0
+    }
+    predictor.exp_fit_stats = {'slope_stderr': 0.0, 'rate_stderr': 0.0}
+    return predictor
+
+
+def test_no_input_spread_gives_point_interval(predictor):
+    # Csak a becsült paraméterek szórása számít: ha mind 0, az intervallum egy pont
+    central = sp.ScenarioEngine(predictor.tech_data).evaluate(
+        **{k: v for k, v in predictor.model_state.items() if k != 'computed_at'})
+    intervals = predictor.calculate_prediction_intervals(0.0, n_samples=500, seed=1)
+
+    assert intervals['days_until_empty_p10'] == intervals['days_until_empty_p90']
+    assert intervals['days_until_empty_p50'] == pytest.approx(float(central['days_until_empty']), abs=0.01)
+
+
+def test_interval_widens_with_bird_count_std(predictor):
+    narrow = predictor.calculate_prediction_intervals(200.0, n_samples=2000, seed=1)
+    wide = predictor.calculate_prediction_intervals(2000.0, n_samples=2000, seed=1)
+
+    narrow_width = narrow['days_until_empty_p90'] - narrow['days_until_empty_p10']
+    wide_width = wide['days_until_empty_p90'] - wide['days_until_empty_p10']
+    assert 0 < narrow_width < wide_width
+    assert narrow['days_until_empty_p10'] <= narrow['days_until_empty_p50'] <= narrow['days_until_empty_p90']
+
+
+def test_missing_fit_stats_gives_no_interval(predictor):
+    predictor.exp_fit_stats = None
+    assert predictor.calculate_prediction_intervals(100.0) is None
@@ -0,0 +1,108 @@
+"""
+Silónkénti feltöltés állapot: cooldown és utófeldolgozás (RefillState, user-042)
+"""
+from datetime import timedelta
+
+import pytest
+
+from conftest import FakeHomeAssistant, sp, synthetic_history, wait_idle
+
+
+def test_followup_delay_and_cap():
+    state = sp.RefillState()
+    assert state.register_detection(1000.0, {'rise_kg': 5000}) == 1000.0 + sp.REFILL_FOLLOWUP_DELAY
+    assert state.first_detected_at == 1000.0
+
+    # Még tartó feltöltés: kitolás, de legfeljebb REFILL_FOLLOWUP_MAX_DELAY-jel az első detektálás után
+    later = 1000.0 + sp.REFILL_FOLLOWUP_MAX_DELAY - 60
+    assert state.register_detection(later, {'rise_kg': 8000}) == 1000.0 + sp.REFILL_FOLLOWUP_MAX_DELAY
+    assert state.last_event == {'rise_kg': 8000}
+
+    # Befejeződött: előrehozás (kitolni nem lehet)
+    assert state.advance_followup(2000.0) == 2000.0
+    assert state.advance_followup(9999.0) == 2000.0
+
+
+def test_complete_starts_cooldown_and_resets():
+    state = sp.RefillState()
+    state.register_detection(1000.0, {})
+    state.complete_followup(2000.0)
+
+    assert state.followup_due is None
+    assert state.first_detected_at is None
+    assert state.refills_processed == 1
+    assert state.in_cooldown(2000.0 + sp.REFILL_COOLDOWN - 1)
+    assert not state.in_cooldown(2000.0 + sp.REFILL_COOLDOWN)
+
+    # Új feltöltés: az első detektálás újra számít a felső korláthoz
+    assert state.register_detection(5000.0, {}) == 5000.0 + sp.REFILL_FOLLOWUP_DELAY
+    assert state.first_detected_at == 5000.0
+    assert sp.RefillState().advance_followup(300.0) == 300.0
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    cycle_start, history = synthetic_history(days=25)
+    clock = sp.VirtualClock(cycle_start + timedelta(days=20, hours=10))
+    FakeHomeAssistant(history, clock).install(monkeypatch)
+    manager = sp.MultiSiloManager(silo_configs=[
+        {'entity_id': f'sensor.silo_{name}_weight', 'sensor_name': f'Silo {name}', 'refill_threshold': 1000,
+         'max_capacity': 20000, 'tech_curve': 'tech_feed_data'} for name in ('a', 'b')], clock=clock)
+    yield manager
+    manager.executor.shutdown(wait=True)
+
+
+def test_refill_on_one_silo_does_not_affect_the_other(manager):
+    silo_a, silo_b = manager.silos
+    clock = manager.clock
+    started = []
+    manager._start_processing = lambda kind, silo: started.append((kind, silo.entity_id))
+
+    now = clock.time()
+    event = {'detected_at': clock.now().isoformat(), 'rise_kg': 9000}
+    manager._finish_refill_check(silo_a, event)
+    assert silo_a.last_refill_event == event
+    assert manager.scheduler.due_at('refill_followup', silo_a.entity_id) == now + sp.REFILL_FOLLOWUP_DELAY
+    assert manager.scheduler.due_at('refill_followup', silo_b.entity_id) is None
+    assert manager.refill_states[silo_b.entity_id].followup_due is None
+
+    # Függő utófeldolgozás mellett csak az érintett siló periodikus futása marad ki
+    manager._run_job('refresh', silo_a.entity_id)
+    manager._run_job('refresh', silo_b.entity_id)
+    assert started == [('refresh', silo_b.entity_id)]
+
+    # Ismételt detektálás: nem duplikál, kitolja az egyetlen függő utófeldolgozást
+    clock.advance(600)
+    manager._finish_refill_check(silo_a, event)
+    assert manager.scheduler.due_at('refill_followup', silo_a.entity_id) == clock.time() + sp.REFILL_FOLLOWUP_DELAY
+
+    # A feltöltés befejeződött → utófeldolgozás azonnal
+    manager._finish_refill_progress(silo_a, (False, clock.now(), 15000.0))
+    assert manager.scheduler.due_at('refill_followup', silo_a.entity_id) == clock.time()
+    due_jobs = manager.scheduler.pop_due(clock.time())
+    assert ('refill_followup', silo_a.entity_id) in due_jobs
+    assert ('refill_followup', silo_b.entity_id) not in due_jobs
+
+
+def test_followup_starts_cooldown_only_for_its_silo(manager):
+    silo_a, silo_b = manager.silos
+    clock = manager.clock
+    manager._finish_refill_check(silo_a, {'rise_kg': 9000})
+    clock.advance(300)
+    manager._finish_refill_check(silo_b, {'rise_kg': 7000})
+
+    # A fő ciklus szerint: esedékes feladatok kivétele és futtatása (csak az utófeldolgozások)
+    clock.advance(sp.REFILL_FOLLOWUP_DELAY - 300)
+    followups = [job for job in manager.scheduler.pop_due(clock.time()) if job[0] == 'refill_followup']
+    assert followups == [('refill_followup', silo_a.entity_id)]
+    manager._run_job(*followups[0])
+    wait_idle(manager)
+
+    state_a, state_b = manager.refill_states[silo_a.entity_id], manager.refill_states[silo_b.entity_id]
+    assert state_a.in_cooldown(clock.time()) and state_a.refills_processed == 1
+    assert not state_b.in_cooldown(clock.time()) and state_b.followup_due is not None
+
+    # Cooldown alatt az újabb detektálás nem ütemez utófeldolgozást
+    manager._finish_refill_check(silo_a, {'rise_kg': 9000})
+    assert manager.scheduler.due_at('refill_followup', silo_a.entity_id) is None
+    assert manager.scheduler.due_at('refill_followup', silo_b.entity_id) is not None
@@ -0,0 +1,110 @@
+"""
+Siló szintű feladat ütemező (JobScheduler, user-041)
+"""
+from datetime import timedelta
+
+from conftest import FakeHomeAssistant, sp, synthetic_history, wait_idle
+
+
+def test_pop_due_in_time_order():
+    scheduler = sp.JobScheduler()
+    scheduler.schedule(30.0, 'refresh', 'b')
+    scheduler.schedule(10.0, 'refresh', 'a')
+    scheduler.schedule(20.0, 'midnight')
+    scheduler.schedule(10.0, 'refill_check', 'a')  # azonos időpont: ütemezési sorrend
+
+    assert scheduler.next_due() == 10.0
+    assert scheduler.pop_due(5.0) == []
+    assert scheduler.pop_due(20.0) == [('refresh', 'a'), ('refill_check', 'a'), ('midnight', None)]
+    assert scheduler.next_due() == 30.0
+    assert scheduler.pop_due(100.0) == [('refresh', 'b')]
+    assert scheduler.next_due() is None
+    assert scheduler.pop_due(1000.0) == []
+
+
+def test_reschedule_replaces_previous_time():
+    scheduler = sp.JobScheduler()
+    scheduler.schedule(10.0, 'refresh', 'a')
+    scheduler.schedule(50.0, 'refresh', 'a')  # kitolás: a régi bejegyzés érvénytelen
+
+    assert scheduler.due_at('refresh', 'a') == 50.0
+    assert scheduler.next_due() == 50.0
+    assert scheduler.pop_due(40.0) == []
+    assert scheduler.pop_due(50.0) == [('refresh', 'a')]
+    assert scheduler.due_at('refresh', 'a') is None
+
+    # Előrehozás: csak egyszer fut
+    scheduler.schedule(50.0, 'refresh', 'a')
+    scheduler.schedule(20.0, 'refresh', 'a')
+    assert scheduler.pop_due(100.0) == [('refresh', 'a')]
+
+
+def test_keep_earlier_does_not_postpone():
+    scheduler = sp.JobScheduler()
+    scheduler.schedule(10.0, 'refill_check', 'a')
+    scheduler.schedule(60.0, 'refill_check', 'a', keep_earlier=True)
+    assert scheduler.due_at('refill_check', 'a') == 10.0
+
+    scheduler.schedule(5.0, 'refill_check', 'a', keep_earlier=True)
+    assert scheduler.due_at('refill_check', 'a') == 5.0
+
+    scheduler.schedule(7.0, 'refill_check', 'b', keep_earlier=True)  # nincs korábbi → ütemez
+    assert scheduler.pop_due(100.0) == [('refill_check', 'a'), ('refill_check', 'b')]
+
+
+def test_cancel_and_keys_are_independent():
+    scheduler = sp.JobScheduler()
+    scheduler.schedule(10.0, 'refresh', 'a')
+    scheduler.schedule(15.0, 'refresh', 'b')
+    scheduler.schedule(20.0, 'refill_followup', 'a')
+
+    scheduler.cancel('refresh', 'a')
+    scheduler.cancel('refresh', 'missing')
+    assert scheduler.due_at('refresh', 'a') is None
+    assert scheduler.next_due() == 15.0
+    assert scheduler.pop_due(100.0) == [('refresh', 'b'), ('refill_followup', 'a')]
+
+
+def test_job_scheduled_while_popping_runs_next_round():
+    scheduler = sp.JobScheduler()
+    scheduler.schedule(10.0, 'refresh', 'a')
+    jobs = scheduler.pop_due(10.0)
+    scheduler.schedule(10.0 + 300, 'refresh', 'a')  # feladat ütemezi a következő futását
+
+    assert jobs == [('refresh', 'a')]
+    assert scheduler.pop_due(10.0) == []
+    assert scheduler.next_due() == 310.0
+
+
+def test_manager_schedules_per_silo_jobs(monkeypatch):
+    cycle_start, history = synthetic_history(days=25)
+    clock = sp.VirtualClock(cycle_start + timedelta(days=20, hours=10))
+    FakeHomeAssistant(history, clock).install(monkeypatch)
+
+    manager = sp.MultiSiloManager(silo_configs=[
+        {'entity_id': f'sensor.silo_{name}_weight', 'sensor_name': f'Silo {name}', 'refill_threshold': 1000,
+         'max_capacity': 20000, 'tech_curve': 'tech_feed_data'} for name in ('a', 'b')], clock=clock)
+    silo_a, silo_b = (silo.entity_id for silo in manager.silos)
+    try:
+        now = clock.time()
+        manager._schedule_startup_jobs()
+        assert manager.scheduler.due_at('midnight') == manager._next_midnight(clock.now()).timestamp()
+        for key in (silo_a, silo_b):
+            assert manager.scheduler.due_at('process', key) is not None
+            assert manager.scheduler.due_at('refill_check', key) == now + sp.REFILL_CHECK_INTERVAL
+
+        # Indulási feldolgozás → silónként periodikus frissítés update_interval múlva
+        for kind, key in manager.scheduler.pop_due(now + manager.burst_stagger * 2 + manager.burst_jitter * 2):
+            manager._run_job(kind, key)
+        wait_idle(manager)
+        assert manager.scheduler.due_at('refresh', silo_a) == manager.scheduler.due_at('refresh', silo_b) \
+            == now + manager.update_interval
+
+        # Csak az egyik siló frissül → csak az ő következő futása tolódik
+        clock.advance(manager.update_interval)
+        manager._run_job('refresh', silo_a)
+        wait_idle(manager)
+        assert manager.scheduler.due_at('refresh', silo_a) == clock.time() + manager.update_interval
+        assert manager.scheduler.due_at('refresh', silo_b) == now + manager.update_interval
+    finally:
+        manager.executor.shutdown(wait=True)
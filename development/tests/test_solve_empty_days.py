@@ -0,0 +1,61 @@
+"""
+Tech+Exp kiürülési idő zárt alakban (solve_empty_days / predict_with_tech_and_exp, user-028)
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from conftest import make_predictor, sp
+
+CASES = {
+    'növekvő': (15000.0, np.linspace(1500, 3500, 60)),
+    'csökkenő': (15000.0, np.linspace(4000, 500, 60)),
+    'állandó': (10000.0, np.full(60, 2500.0)),
+    'nincs metszés': (500000.0, np.full(60, 2000.0)),
+    'negatív napok (töltődés)': (9000.0, np.array([3000.0, -2000.0, -1000.0, 4000.0, 5000.0] + [100.0] * 55)),
+}
+
+
+@pytest.mark.parametrize('weight, daily_kg', CASES.values(), ids=CASES.keys())
+def test_matches_hourly_loop(weight, daily_kg):
+    cumulative = sp.cumulative_consumption(daily_kg)
+    days = float(sp.solve_empty_days(weight, cumulative))
+    loop_hours = sp._hourly_depletion_loop(weight, daily_kg / 24.0)
+
+    if loop_hours >= len(daily_kg) * 24 and not np.any(cumulative >= weight):
+        assert np.isnan(days)
+    else:
+        # A ciklus a 0 kg-ot elérő óra végét adja, a zárt alak ezen az órán belüli időpontot
+        # (pontosan óra határon a ciklus összeadási kerekítése miatt a következő óra is lehet)
+        assert loop_hours - 1 - 1e-6 <= days * 24 <= loop_hours + 1e-9
+        day = int(days)
+        assert weight - cumulative[day] == pytest.approx((days - day) * daily_kg[day])
+
+
+def test_batch_matches_scalar():
+    weights = np.array([0.0, 5000.0, 15000.0, 500000.0])
+    daily_kg = np.stack([np.linspace(1500, 3500, 60), np.full(60, 2500.0)])
+    cumulative = sp.cumulative_consumption(daily_kg)
+
+    batch = sp.solve_empty_days(weights[None, :], cumulative[:, None, :])
+    assert batch.shape == (2, 4)
+    for i in range(2):
+        for j, weight in enumerate(weights):
+            expected = sp.solve_empty_days(weight, cumulative[i])
+            assert np.isnan(batch[i, j]) if np.isnan(expected) else batch[i, j] == pytest.approx(expected)
+    assert np.all(batch[:, 0] == 0.0)
+    assert np.all(np.isnan(batch[:, 3]))
+
+
+def test_tech_and_exp_closed_form_matches_iterative():
+    clock = sp.VirtualClock(sp.LOCAL_TZ.localize(datetime(2025, 10, 20, 12, 0)))
+    predictor = make_predictor(clock)
+    cycle_start = clock.now() - timedelta(days=18)
+
+    for weight, birds, acceleration in ((12000.0, 20000, 40.0), (3000.0, 25000, -30.0), (9000.0, 18000, 0.0)):
+        _, closed_days = predictor.predict_with_tech_and_exp(weight, cycle_start, birds, 2000.0, acceleration)
+        assert predictor.last_forecast_cumulative is not None
+        _, iterative_days = predictor.predict_with_tech_and_exp(weight, cycle_start, birds, 2000.0, acceleration,
+                                                                iterative=True)
+        assert iterative_days * 24 - 1 < closed_days * 24 <= iterative_days * 24 + 1e-9
@@ -0,0 +1,130 @@
+"""
+Határidő / elavulás figyelés: extrapolált előrejelzés közzététele (user-049)
+"""
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+
+from conftest import (DATE_SENSOR, ENTITY_ID, SENSOR_NAME, FakeHomeAssistant, make_predictor, sp, synthetic_history,
+                      wait_idle)
+
+
+def wait_for(event, timeout=10.0):
+    assert event.wait(timeout), "esemény nem következett be"
+
+
+@pytest.fixture
+def replay(monkeypatch):
+    cycle_start, history = synthetic_history(days=25)
+    clock = sp.VirtualClock(cycle_start + timedelta(days=20, hours=10))
+    ha = FakeHomeAssistant(history, clock)
+    ha.install(monkeypatch)
+    return clock, ha
+
+
+class GatedHomeAssistant:
+    """A következő history lekérés és az extrapolált ('stale') POST-ok kapuzása"""
+
+    def __init__(self, ha):
+        self.ha = ha
+        self.hold_history = False
+        self.history_waiting = threading.Event()
+        self.history_release = threading.Event()
+        self.stale_waiting = threading.Event()
+        self.stale_release = threading.Event()
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        if self.hold_history and '/api/history/period/' in url:
+            self.hold_history = False
+            self.history_waiting.set()
+            wait_for(self.history_release)
+        return self.ha.get(url, headers, params, timeout)
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        if json['attributes'].get('stale'):
+            self.stale_waiting.set()
+            wait_for(self.stale_release)
+        return self.ha.post(url, headers, json, timeout)
+
+
+def test_deadline_stale_publish_does_not_overwrite_slow_process(monkeypatch, replay):
+    clock, ha = replay
+    gated = GatedHomeAssistant(ha)
+    monkeypatch.setattr(sp.requests, 'get', gated.get)
+    monkeypatch.setattr(sp.requests, 'post', gated.post)
+    monkeypatch.setenv('JOB_DEADLINE_SECONDS', '120')
+
+    manager = sp.MultiSiloManager(silo_configs=[{'entity_id': ENTITY_ID, 'sensor_name': SENSOR_NAME,
+                                                 'refill_threshold': 1000, 'max_capacity': 20000,
+                                                 'tech_curve': 'tech_feed_data'}], clock=clock)
+    try:
+        manager._run_job('process', ENTITY_ID)
+        wait_idle(manager)
+        assert ha.states[DATE_SENSOR]['attributes']['stale'] is False
+
+        # Lassú periodikus frissítés: a history lekérés áll, közben lejár a határidő
+        clock.advance(2 * 3600)
+        gated.hold_history = True
+        manager._run_job('refresh', ENTITY_ID)
+        wait_for(gated.history_waiting)
+        clock.advance(manager.job_deadline + 1)
+        manager._run_job('deadline', ENTITY_ID)
+
+        # Az extrapolált közzététel félúton áll, amikor a feldolgozás befejeződik
+        wait_for(gated.stale_waiting)
+        posts_before = len(ha.posts)
+        gated.history_release.set()
+        time.sleep(0.5)
+        assert len(ha.posts) == posts_before, "a friss POST-ok nem várták meg az extrapolált közzétételt"
+
+        gated.stale_release.set()
+        wait_idle(manager)
+    finally:
+        gated.history_release.set()
+        gated.stale_release.set()
+        manager.executor.shutdown(wait=True)
+
+    stale_flags = [attributes.get('stale') for entity_id, _, attributes in ha.posts if entity_id == DATE_SENSOR]
+    assert stale_flags == [False, True, False]
+    for entity_id in (DATE_SENSOR, f"{DATE_SENSOR}_time_remaining"):
+        assert ha.states[entity_id]['attributes']['stale'] is False
+
+
+def test_publish_stale_skips_after_fresh_prediction(replay):
+    clock, ha = replay
+    silo = make_predictor(clock)
+    silo.process()
+    posts = len(ha.posts)
+
+    # Feldolgozás előtt indult határidő: a friss előrejelzés már elkészült → nincs extrapolált POST
+    assert silo.publish_stale(clock.time() - 60) is False
+    assert len(ha.posts) == posts
+
+    # Sikertelen közzététel után is: az előrejelzés friss, nem extrapoláljuk 'stale'-ként
+    silo.last_published_at = None
+    assert silo.publish_stale(clock.time() - 60) is False
+
+    clock.advance(3600)
+    assert silo.publish_stale(clock.time() - 60, stale=False) is True
+    attributes = ha.states[DATE_SENSOR]['attributes']
+    assert attributes['stale'] is False
+    assert attributes['extrapolated_from'] == silo.last_prediction_at.isoformat()
+    assert attributes['predicted_empty_p10'] is None
+
+
+def test_shift_forecast_trajectory():
+    trajectory = {'offset_h': [0, 6, 12, 18], 'weight_kg': [1000, 700, 400, 0]}
+
+    shifted = sp.shift_forecast_trajectory(trajectory, 3.0)
+    assert shifted == {'offset_h': [0, 3, 9, 15], 'weight_kg': [850, 700, 400, 0]}
+
+    # Egy órán belüli következő pont kimarad (nem duplikálódik a 0. óra)
+    shifted = sp.shift_forecast_trajectory(trajectory, 5.4)
+    assert shifted['offset_h'] == [0, 7, 13]
+    assert shifted['weight_kg'][0] == 730
+
+    assert sp.shift_forecast_trajectory(trajectory, 0.0) == trajectory
+    assert sp.shift_forecast_trajectory(trajectory, 18.0) is None
+    assert sp.shift_forecast_trajectory({'offset_h': [], 'weight_kg': []}, 1.0) is None
@@ -0,0 +1,106 @@
+"""
+Tech görbe nyilvántartás újratöltése (TechCurveRegistry.check_reload, user-034)
+"""
+import os
+
+import pytest
+
+from conftest import sp
+
+
+def write_curve(path, days, mtime, intake=lambda day: 10 + day):
+    """Görbe CSV a repo formátumában (" 10. nap", " 20 g") rögzített mtime-mal"""
+    lines = ['nap,takarmány'] + [f' {day}. nap, {intake(day)} g' for day in range(days)]
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def curve_file(tmp_path):
+    path = tmp_path / 'curve.csv'
+    write_curve(path, 10, 1000)
+    registry = sp.TechCurveRegistry()
+    return registry, registry.get(str(path)), path
+
+
+def test_reload_waits_for_stable_mtime(curve_file):
+    registry, handle, path = curve_file
+    original = handle.curve
+    write_curve(path, 12, 2000, intake=lambda day: 20 + day)
+
+    assert registry.check_reload() == []  # Első észlelés: az írás még tarthat
+    assert handle.curve is original
+
+    assert registry.check_reload() == [str(path)]
+    assert handle.curve.max_day == 11
+    assert handle.curve.get_daily_intake_per_bird(5) == 25
+    assert handle.mtime == 2000
+
+    assert registry.check_reload() == []
+
+
+def test_rewrite_between_polls_restarts_wait(curve_file):
+    registry, handle, path = curve_file
+    write_curve(path, 10, 2000, intake=lambda day: 20 + day)
+    assert registry.check_reload() == []
+
+    write_curve(path, 10, 3000, intake=lambda day: 30 + day)
+    assert registry.check_reload() == []
+    assert handle.curve.get_daily_intake_per_bird(5) == 15
+
+    assert registry.check_reload() == [str(path)]
+    assert handle.curve.get_daily_intake_per_bird(5) == 35
+
+
+def test_touch_without_content_change_keeps_curve(curve_file):
+    registry, handle, path = curve_file
+    original = handle.curve
+    os.utime(path, (2000, 2000))
+
+    assert registry.check_reload() == []
+    assert registry.check_reload() == []
+    assert handle.curve is original
+    assert handle.mtime == 2000
+
+
+def test_curve_losing_days_is_rejected(curve_file):
+    registry, handle, path = curve_file
+    original = handle.curve
+    write_curve(path, 6, 2000, intake=lambda day: 20 + day)  # pl. félbeszakadt másolás
+
+    assert registry.check_reload() == []
+    assert registry.check_reload() == []
+    assert handle.curve is original
+    assert handle.curve.max_day == 9
+
+
+def test_unparseable_file_keeps_curve(curve_file):
+    registry, handle, path = curve_file
+    original = handle.curve
+    path.write_bytes(b'\xff\xfe nem CSV')
+    os.utime(path, (2000, 2000))
+
+    assert registry.check_reload() == []
+    assert registry.check_reload() == []
+    assert handle.curve is original
+
+
+def test_curve_is_parsed_from_hashed_bytes(curve_file, monkeypatch):
+    registry, handle, path = curve_file
+    write_curve(path, 12, 2000, intake=lambda day: 20 + day)
+    assert registry.check_reload() == []
+
+    # A beolvasás után a fájl újra átíródik: a fordítás nem olvashatja újra (a hash-elt bájtokból dolgozik)
+    read_file = sp.TechCurveRegistry._read_file
+    signatures = []
+
+    def read_then_overwrite(csv_path):
+        signatures.append(read_file(csv_path))
+        path.write_text('nap,takarmány\n', encoding='utf-8')
+        os.utime(path, (2000, 2000))
+        return signatures[-1]
+
+    monkeypatch.setattr(sp.TechCurveRegistry, '_read_file', staticmethod(read_then_overwrite))
+    assert registry.check_reload() == [str(path)]
+    assert handle.curve.max_day == 11
+    assert handle.digest == signatures[-1][1]
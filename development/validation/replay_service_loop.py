@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Szolgáltatás ciklus visszajátszása rögzített adatokon, virtuális idővel
+
+A valódi MultiSiloManager.run() fut (indulás, éjféli feldolgozás, feltöltés
+figyelés, cooldown, utófeldolgozás) egy VirtualClock-kal: a teljes CSV időszak
+másodpercek alatt lefut. A HA API-t a CSV-ből kiszolgáló helyi "HA" helyettesíti,
+ami számolja a hívásokat (költség) és rögzíti a közzétett szenzor állapotokat.
+"""
+import bisect
+import csv
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy as np
+
+ADDON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'silo_prediction_addon')
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'Blokkhistory3_4.csv')
+
+# Konfiguráció
+ENTITY_ID = "sensor.cfm_3_hall_modbus_1_lp7516_merleg_suly"
+SENSOR_NAME = "CFM 3 Hall Replay"
+REFILL_THRESHOLD = 1000
+MAX_CAPACITY = 20000
+WARMUP_DAYS = 3  # a visszajátszás ennyi nappal az első adat után indul
+
+# Az add-on naplója /app/logs alá ír; a tech görbe az add-on könyvtárából ('tech_feed_data' néven)
+os.makedirs('/app/logs', exist_ok=True)
+os.environ.setdefault('HA_TOKEN', 'replay')
+os.environ.setdefault('TECH_CURVES_DIR', ADDON_DIR)
+sys.path.insert(0, ADDON_DIR)
+import silo_prediction as sp  # noqa: E402
+
+
+def load_csv_data():
+    """CSV betöltése (időbélyeg, súly) párokként"""
+    data = []
+    with open(CSV_PATH, "r") as f:
+        for row in csv.DictReader(f):
+            if row['state'] in ['unavailable', 'unknown', '']:
+                continue
+            try:
+                timestamp = datetime.fromisoformat(row['last_changed'].replace('Z', '+00:00'))
+                data.append((timestamp, float(row['state'])))
+            except ValueError:
+                continue
+
+    data.sort(key=lambda point: point[0])
+    print(f"✅ {len(data)} rekord betöltve: {data[0][0].strftime('%Y-%m-%d')} - {data[-1][0].strftime('%Y-%m-%d')}")
+    return data
+
+
+class RecordedResponse:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+        self.text = ''
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise sp.requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+
+class RecordedHomeAssistant:
+    """
+    HA API a rögzített sorból: history a virtuális "most"-ig, szenzor állapotok
+    memóriában; a hívások száma fajtánként (költség)
+    """
+
+    def __init__(self, data, clock):
+        self.data = data
+        self.timestamps = [timestamp for timestamp, _ in data]
+        self.clock = clock
+        self.states = {}
+        self.calls = Counter()
+        self.published = []  # (virtuális idő, dátum szenzor attribútumai)
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        if '/api/history/period/' in url:
+            self.calls['history'] += 1
+            start = datetime.fromisoformat(url.split('/api/history/period/')[1])
+            end = min(datetime.fromisoformat(params['end_time']), self.clock.now())
+            return RecordedResponse([self._history(start, end)])
+
+        if url.endswith('/api/states'):
+            self.calls['states'] += 1
+            return RecordedResponse([dict(state, entity_id=entity_id) for entity_id, state in self.states.items()])
+
+        if '/api/states/' in url:
+            self.calls['state'] += 1
+            entity_id = url.split('/api/states/')[1]
+            return RecordedResponse(self.states[entity_id]) if entity_id in self.states else RecordedResponse({}, 404)
+
+        self.calls['api'] += 1
+        return RecordedResponse({'message': 'API running.'})
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        self.calls['post'] += 1
+        entity_id = url.split('/api/states/')[1]
+        self.states[entity_id] = json
+        if entity_id == f"sensor.{SENSOR_NAME.lower().replace(' ', '_')}":
+            self.published.append((self.clock.now(), json['state'], json['attributes']))
+        return RecordedResponse({})
+
+    def _history(self, start, end):
+        """HA history formátum: az időszak eleji állapot + az időszak változásai"""
+        first = bisect.bisect_left(self.timestamps, start)
+        last = bisect.bisect_right(self.timestamps, end)
+        rows = [{'state': str(weight), 'last_changed': timestamp.isoformat()}
+                for timestamp, weight in self.data[first:last]]
+        if first > 0:
+            rows.insert(0, {'state': str(self.data[first - 1][1]), 'last_changed': start.isoformat()})
+        return rows
+
+
+def main():
+    print("=" * 80)
+    print("⏩ SZOLGÁLTATÁS CIKLUS VISSZAJÁTSZÁSA (VIRTUÁLIS IDŐ)")
+    print("=" * 80)
+
+    random.seed(0)
+    np.random.seed(0)
+
+    data = load_csv_data()
+    start = data[0][0].astimezone(sp.LOCAL_TZ) + timedelta(days=WARMUP_DAYS)
+    stop = data[-1][0].astimezone(sp.LOCAL_TZ)
+    clock = sp.VirtualClock(start, stop_at=stop)
+    ha = RecordedHomeAssistant(data, clock)
+
+    silo_configs = [{
+        'entity_id': ENTITY_ID,
+        'sensor_name': SENSOR_NAME,
+        'refill_threshold': REFILL_THRESHOLD,
+        'max_capacity': MAX_CAPACITY,
+        'tech_curve': 'tech_feed_data'
+    }]
+
+    started = time.time()
+    with mock.patch.object(sp.requests, 'get', ha.get), mock.patch.object(sp.requests, 'post', ha.post):
+        manager = sp.MultiSiloManager(silo_configs=silo_configs, clock=clock)
+        manager.run()
+    elapsed = time.time() - started
+
+    simulated_days = (stop - start).total_seconds() / 86400
+    refill_state = manager.refill_states[ENTITY_ID]
+
+    print("\n" + "=" * 80)
+    print("📊 EREDMÉNY")
+    print("=" * 80)
+    print(f"⏱️ {simulated_days:.1f} nap visszajátszva {elapsed:.1f} s alatt ({simulated_days * 86400 / elapsed:,.0f}x)")
+    print(f"🌐 HA hívások: {dict(ha.calls)}")
+    print(f"🔄 Feldolgozott feltöltések: {refill_state.refills_processed}")
+    print(f"📤 Dátum szenzor frissítések: {len(ha.published)}")
+
+    print("\n📅 Napi utolsó előrejelzés:")
+    daily = {}
+    for published_at, state, attributes in ha.published:
+        daily[published_at.date()] = (published_at, state, attributes)
+    for day, (published_at, state, attributes) in sorted(daily.items()):
+        stale = " (elavult)" if attributes.get('stale') else ""
+        print(f"   {published_at.strftime('%Y-%m-%d %H:%M')}  {attributes.get('current_weight_kg')} kg  → {state}{stale}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,46 @@ UPDATE_INTERVAL=$(bashio::config 'update_interval')
 # Export global environment variables
 export PREDICTION_DAYS="$PREDICTION_DAYS"
 export UPDATE_INTERVAL="$UPDATE_INTERVAL"
+
+# Párhuzamos siló feldolgozás munkaszálainak száma (opcionális)
+if bashio::config.has_value 'max_workers'; then
+    export MAX_WORKERS=$(bashio::config 'max_workers')
+fi
+
+# Futtatási mód: threads (alapértelmezett) vagy asyncio (opcionális)
+if bashio::config.has_value 'execution_mode'; then
+    export EXECUTION_MODE=$(bashio::config 'execution_mode')
+fi
+
+# Sharded mód: worker folyamatok száma (0 = egy folyamat)
+if bashio::config.has_value 'worker_processes'; then
+    export WORKER_PROCESSES=$(bashio::config 'worker_processes')
+fi
+
+# Indulási / éjféli tömeges feldolgozás terhelés elosztása (opcionális)
+if bashio::config.has_value 'burst_concurrency'; then
+    export BURST_CONCURRENCY=$(bashio::config 'burst_concurrency')
+fi
+if bashio::config.has_value 'burst_stagger_seconds'; then
+    export BURST_STAGGER_SECONDS=$(bashio::config 'burst_stagger_seconds')
+fi
+if bashio::config.has_value 'burst_jitter_seconds'; then
+    export BURST_JITTER_SECONDS=$(bashio::config 'burst_jitter_seconds')
+fi
+
+# Feldolgozási határidő és elavulás figyelés (opcionális)
+if bashio::config.has_value 'job_deadline_seconds'; then
+    export JOB_DEADLINE_SECONDS=$(bashio::config 'job_deadline_seconds')
+fi
+if bashio::config.has_value 'max_stale_minutes'; then
+    export MAX_STALE_MINUTES=$(bashio::config 'max_stale_minutes')
+fi
+
+# Névvel ellátott tech görbék könyvtára (opcionális)
+if bashio::config.has_value 'tech_curves_dir'; then
+    export TECH_CURVES_DIR=$(bashio::config 'tech_curves_dir')
+fi
+
 export HA_URL="http://supervisor/core"
 
 # The SUPERVISOR_TOKEN is automatically available in the environment
@@ -39,8 +79,20 @@ for ((i=0; i<NUM_SILOS; i++)); do
     SENSOR_NAME=$(bashio::config "silos[$i].sensor_name")
     REFILL=$(bashio::config "silos[$i].refill_threshold")
     MAX_CAP=$(bashio::config "silos[$i].max_capacity")
+    TECH_CURVE="default"
+    if bashio::config.has_value "silos[$i].tech_curve"; then
+        TECH_CURVE=$(bashio::config "silos[$i].tech_curve")
+    fi
+
+    # Opcionális növekedési korrekció (régi lineáris modell)
+    GROWTH=""
+    for KEY in enable_growth_correction animal_age_days growth_rate_kg_per_hour_per_day; do
+        if bashio::config.has_value "silos[$i].${KEY}"; then
+            GROWTH="${GROWTH},\"${KEY}\":$(bashio::config "silos[$i].${KEY}")"
+        fi
+    done
 
-    SILOS_JSON="${SILOS_JSON}{\"entity_id\":\"${ENTITY}\",\"sensor_name\":\"${SENSOR_NAME}\",\"refill_threshold\":${REFILL},\"max_capacity\":${MAX_CAP}}"
+    SILOS_JSON="${SILOS_JSON}{\"entity_id\":\"${ENTITY}\",\"sensor_name\":\"${SENSOR_NAME}\",\"refill_threshold\":${REFILL},\"max_capacity\":${MAX_CAP},\"tech_curve\":\"${TECH_CURVE}\"${GROWTH}}"
     SILO_COUNT=$((SILO_COUNT + 1))
 done
 SILOS_JSON="${SILOS_JSON}]"
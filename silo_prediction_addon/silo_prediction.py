@@ -6,20 +6,48 @@ Intelligens siló kiürülési előrejelzés technológiai fogyasztási adatok a
 
 import os
 import json
+import math
 import time
 import logging
+import heapq
+import hashlib
+import itertools
+import random
+import threading
+import asyncio
+import queue
+import multiprocessing
+from multiprocessing import shared_memory
 import requests
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pytz
 import csv
+import io
+from collections import deque
 from datetime import datetime, timedelta
 from typing import List, Tuple, Dict, Optional
-from scipy import stats
+
+# Opcionális JIT gyorsítás (Numba) - ha nincs telepítve, a tiszta NumPy változatok futnak
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = os.getenv('SILO_DISABLE_JIT', '').lower() not in ('1', 'true', 'yes')
+except ImportError:
+    njit = None
+    NUMBA_AVAILABLE = False
+
+# Opcionális aiohttp (asyncio mód) - ha nincs telepítve, a requests hívások szálon futnak, WebSocket nélkül
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
 
 # Logging beállítása időbélyeggel
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format='%(asctime)s - %(name)s - %(levelname)s - [%(threadName)s] %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S',
     handlers=[
         logging.FileHandler('/app/logs/silo_prediction.log'),
@@ -36,22 +64,323 @@ except Exception as e:
     LOCAL_TZ = pytz.UTC
     logger.warning(f"⚠️ Europe/Budapest timezone nem elérhető ({e}), UTC-t használunk")
 
+# Tech görbék: alapértelmezett görbe neve és útvonala, névvel ellátott görbék könyvtára
+DEFAULT_TECH_CURVE = 'default'
+DEFAULT_TECH_CSV_PATH = '/app/tech_feed_data.csv'
+DEFAULT_TECH_CURVES_DIR = '/share/silo_prediction/tech_curves'
+
+# Adathiány küszöb: a 6 órás mintasorban ennél nagyobb kihagyás = adathiány (HA / Modbus kiesés)
+GAP_THRESHOLD_HOURS = 9.0
+
+# Monte Carlo predikciós intervallum: szimulált pályák száma
+MONTE_CARLO_SAMPLES = 2000
+
+# Rekurzív madárszám becslő (Kalman): napi mérés relatív szórása, napi folyamatzaj (elhullás) relatív szórása
+BIRD_MEASUREMENT_CV = 0.10
+BIRD_PROCESS_CV = 0.002
+
+# 6 órás mintavételi időszakok kezdő órái (7:00-kor nap váltás) és a napszakos arány prior súlya (napokban)
+BUCKET_START_HOURS = (7, 13, 19, 1)
+CONSUMPTION_SHARE_PRIOR_DAYS = 2.0
+
+# Modell ensemble: közös horizont (nap), polinom modell előzmény ablaka (nap) és fokszáma
+ENSEMBLE_HORIZON_DAYS = 60
+POLYNOMIAL_HISTORY_DAYS = 30
+POLYNOMIAL_DEGREE = 2
+
+# Ütemező: feltöltés ellenőrzés és tech görbe figyelés gyakorisága, feltöltés utáni újraszámolás késleltetése (s)
+REFILL_CHECK_INTERVAL = 60
+REFILL_FOLLOWUP_DELAY = 15 * 60
+REFILL_COOLDOWN = 15 * 60
+REFILL_FOLLOWUP_MAX_DELAY = 60 * 60  # elhúzódó (többször detektált) feltöltésnél legkésőbb ennyivel az első detektálás után
+TECH_RELOAD_CHECK_INTERVAL = 60
+# Állapotfüggő feltöltés ellenőrzés (REFILL_CHECK_INTERVAL: feltöltés várható / ismeretlen állapotú siló)
+REFILL_POLL_ACTIVE = 15  # feltöltés folyamatban: a befejezés (detect_refill_completion) gyors észleléséhez
+REFILL_EXPECTED_HOURS = 6  # feltöltés várható: ennyi órán belüli kiürülés (vagy refill_threshold alatti súly)
+REFILL_POLL_NEAR = 5 * 60  # kiürülés REFILL_POLL_NEAR_DAYS napon belül, vagy ismeretlen (de a súly a küszöb felett)
+REFILL_POLL_NEAR_DAYS = 1.0
+REFILL_POLL_IDLE = 15 * 60  # tele siló, kiürülés messze
+REFILL_DETECTION_WINDOW_MINUTES = 15  # friss feltöltés keresési ablak (legalább az ellenőrzési intervallum)
+REFILL_WS_TRIGGER_KG = 50  # asyncio mód: WebSocket-en érkező ekkora súlynövekedés azonnali feltöltés ellenőrzést indít
+
+# Indulás: HA API elérhetőség ellenőrzés exponenciális visszalépéssel (fix várakozás helyett)
+HA_READY_INITIAL_DELAY = 1
+HA_READY_MAX_DELAY = 60
+CYCLE_DATA_RETRY_INTERVAL = 60  # sikertelen ciklus adat betöltés után a feldolgozás ennyi idő múlva újra
+
+# Tömeges feldolgozás (indulás / éjfél) terhelés elosztása - alapértelmezések (config: burst_*)
+DEFAULT_BURST_CONCURRENCY = 2  # egyszerre futó teljes (45 napos) feldolgozások
+DEFAULT_BURST_STAGGER_SECONDS = 2  # silók közötti eltolás
+DEFAULT_BURST_JITTER_SECONDS = 3  # + véletlen 0..jitter másodperc silónként
+
+# Feldolgozási határidő és elavulás figyelés - alapértelmezések (config: job_deadline_seconds, max_stale_minutes)
+DEFAULT_JOB_DEADLINE_SECONDS = 120  # ennyi után az utolsó előrejelzés extrapolálva ('stale') kerül ki, a frissítés háttérben fut tovább
+DEFAULT_MAX_STALE_MINUTES = 60  # a szenzorok legfeljebb ennyi ideig maradnak frissítés nélkül (extrapolálva, 0 = kikapcsolva)
+STALE_WATCHDOG_INTERVAL = 60  # elavulás ellenőrzés gyakorisága
+
+# Meleg history cache: csak a cache vége utáni szakaszt kérjük le (késve rögzített állapotok miatt átfedéssel)
+HISTORY_CACHE_OVERLAP = timedelta(minutes=10)
+
+# Párhuzamos siló feldolgozás: munkaszálak alapértelmezett száma
+DEFAULT_MAX_WORKERS = 4
+
+# Futtatási mód: 'threads' (munkaszál-készlet) vagy 'asyncio' (egy event loop, nem blokkoló HA I/O)
+EXECUTION_MODES = ('threads', 'asyncio')
+
+# Sharded mód (worker_processes > 0): worker folyamatok felügyelete
+SHARD_POLL_INTERVAL = 5  # eredmény sor / worker életjel ellenőrzés (s)
+SHARD_METRICS_INTERVAL = 15 * 60  # worker metrikák naplózása (s)
+SHARD_MAX_RESTARTS = 3  # ennél több összeomlás SHARD_RESTART_WINDOW alatt → a worker silói a többire kerülnek
+SHARD_RESTART_WINDOW = 10 * 60
+
+# Feldolgozó feladatok prioritása (foglalt silónál a legerősebb függő kérés fut le utána)
+PROCESS_JOB_PRIORITY = {'refresh': 0, 'recompute': 1, 'process': 2, 'refill_followup': 3}
+
+# Előrejelzett súlygörbe attribútum: lépésköz (óra), max pontszám, súly kvantálás (kg)
+TRAJECTORY_STEP_HOURS = 6
+TRAJECTORY_MAX_POINTS = 120
+TRAJECTORY_QUANTUM_KG = 10
+
+
+# ---------------------------------------------------------------------------
+# Numerikus kernelek: ciklusos forrás (Numba JIT-tel fordítva) és tiszta NumPy
+# változat. Mindkettő ugyanazt a lebegőpontos műveletsort végzi (a súlyt
+# lépésenként csökkentjük, a NumPy változatban kumulatív összeggel, ami balról
+# jobbra összegez), így az eredmény bitre azonos. A backend importkor dől el.
+# ---------------------------------------------------------------------------
+
+def _hourly_depletion_loop(weight, hourly_kg):
+    """Óránkénti fogyás: naponta 24 órán át hourly_kg[nap] levonása, órák száma a 0 kg-ig"""
+    if weight <= 0:
+        return 0
+    hours = 0
+    for day in range(hourly_kg.shape[0]):
+        for _ in range(24):
+            weight -= hourly_kg[day]
+            hours += 1
+            if weight <= 0:
+                return hours
+    return hours
+
+
+def _hourly_depletion_numpy(weight, hourly_kg):
+    """_hourly_depletion_loop tiszta NumPy változata"""
+    if weight <= 0:
+        return 0
+    path = np.cumsum(np.concatenate(([weight], -np.repeat(np.asarray(hourly_kg, dtype=float), 24))))[1:]
+    empty = path <= 0
+    return int(np.argmax(empty)) + 1 if np.any(empty) else len(path)
+
+
+def _growth_depletion_loop(weight, base_slope, growth_rate, age_days, step_hours, max_steps):
+    """Növekedési korrekciós lépésenkénti fogyás, lépések száma a 0 kg-ig (vagy max_steps)"""
+    steps = 0
+    while weight > 0 and steps < max_steps:
+        day_in_cycle = age_days + (steps * step_hours) / 24.0
+        weight += (base_slope - growth_rate * day_in_cycle) * step_hours
+        steps += 1
+    return steps
+
+
+def _growth_depletion_numpy(weight, base_slope, growth_rate, age_days, step_hours, max_steps):
+    """_growth_depletion_loop tiszta NumPy változata"""
+    if weight <= 0:
+        return 0
+    day_in_cycle = age_days + (np.arange(max_steps) * step_hours) / 24.0
+    path = np.cumsum(np.concatenate(([weight], (base_slope - growth_rate * day_in_cycle) * step_hours)))[1:]
+    empty = path <= 0
+    return int(np.argmax(empty)) + 1 if np.any(empty) else max_steps
+
+
+def _silence_refill_loop(weights, window, max_weight, max_change, min_jump):
+    """
+    Első feltöltés csend periódus után: index, ahol az előző `window` minta
+    mind <= max_weight és a szomszédos változás <= max_change, majd > min_jump ugrás (-1, ha nincs)
+    """
+    for i in range(window, weights.shape[0]):
+        silence = True
+        for j in range(i - window, i):
+            if weights[j] > max_weight:
+                silence = False
+                break
+            if j > 0 and abs(weights[j] - weights[j - 1]) > max_change:
+                silence = False
+                break
+        if silence and weights[i] - weights[i - 1] > min_jump:
+            return i
+    return -1
+
+
+def _silence_refill_numpy(weights, window, max_weight, max_change, min_jump):
+    """_silence_refill_loop tiszta NumPy változata (gördülő ablak kumulatív összeggel)"""
+    weights = np.asarray(weights, dtype=float)
+    n = len(weights)
+    if n <= window:
+        return -1
+
+    calm = weights <= max_weight
+    calm[1:] &= np.abs(np.diff(weights)) <= max_change
+    calm_count = np.concatenate(([0], np.cumsum(calm)))
+
+    i = np.arange(window, n)
+    silence = (calm_count[i] - calm_count[i - window]) == window
+    jump = (weights[i] - weights[i - 1]) > min_jump
+    hits = np.nonzero(silence & jump)[0]
+    return int(i[hits[0]]) if len(hits) else -1
+
+
+if NUMBA_AVAILABLE:
+    hourly_depletion_hours = njit(cache=True)(_hourly_depletion_loop)
+    growth_depletion_steps = njit(cache=True)(_growth_depletion_loop)
+    silence_refill_index = njit(cache=True)(_silence_refill_loop)
+    KERNEL_BACKEND = 'numba'
+else:
+    hourly_depletion_hours = _hourly_depletion_numpy
+    growth_depletion_steps = _growth_depletion_numpy
+    silence_refill_index = _silence_refill_numpy
+    KERNEL_BACKEND = 'numpy'
+
+logger.info(f"⚙️ Numerikus kernelek: {KERNEL_BACKEND}")
+
+
+# ---------------------------------------------------------------------------
+# Időforrás: a "most" és minden várakozás ezen keresztül megy (SiloPredictor,
+# MultiSiloManager), így a szolgáltatás ciklusa rögzített adatokon virtuális
+# idővel, a valósnál sokkal gyorsabban is lefuttatható (VirtualClock).
+# ---------------------------------------------------------------------------
+
+class Clock:
+    """Valós idő (éles működés)"""
+
+    def time(self) -> float:
+        return time.time()
+
+    def now(self) -> datetime:
+        """Aktuális idő lokális időzónában"""
+        return datetime.now(LOCAL_TZ)
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    async def sleep_async(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+    @property
+    def running(self) -> bool:
+        """A szolgáltatás ciklusa fut-e még (valós időben mindig)"""
+        return True
+
+    def wait(self, event: threading.Event, timeout: float, busy: bool = False) -> bool:
+        """
+        Várakozás az eseményre legfeljebb timeout másodpercig
+
+        Args:
+            busy: Van futó feladat (virtuális időben ilyenkor nem lép az idő)
+
+        Returns:
+            True ha az esemény bekövetkezett
+        """
+        return event.wait(timeout)
+
+    async def wait_async(self, event: asyncio.Event, timeout: float, busy: bool = False) -> bool:
+        """wait() asyncio változata"""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class VirtualClock(Clock):
+    """
+    Virtuális idő (szimuláció / visszajátszás rögzített adatokon)
+
+    Az idő csak sleep() / wait() hatására lép előre, azonnal. Amíg feladat fut
+    (busy), az idő áll és a befejezést valós időben várjuk meg - a feldolgozás
+    a virtuális időben pillanatszerű, így a futás determinisztikus.
+
+    Args:
+        start: Kezdő időpont
+        stop_at: Eddig fut a szolgáltatás ciklusa (None = korlátlanul)
+    """
+
+    def __init__(self, start: datetime, stop_at: Optional[datetime] = None):
+        self._now = start.timestamp()
+        self.stop_at = stop_at.timestamp() if stop_at else None
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        with self._lock:
+            return self._now
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.time(), LOCAL_TZ)
+
+    def advance(self, seconds: float):
+        with self._lock:
+            self._now += max(seconds, 0.0)
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    async def sleep_async(self, seconds: float):
+        self.advance(seconds)
+
+    @property
+    def running(self) -> bool:
+        return self.stop_at is None or self.time() < self.stop_at
+
+    def wait(self, event: threading.Event, timeout: float, busy: bool = False) -> bool:
+        if busy:
+            return event.wait()
+        if event.is_set():
+            return True
+        self.advance(timeout)
+        return False
+
+    async def wait_async(self, event: asyncio.Event, timeout: float, busy: bool = False) -> bool:
+        if busy:
+            await event.wait()
+            return True
+        if event.is_set():
+            return True
+        self.advance(timeout)
+        return False
+
+
+SYSTEM_CLOCK = Clock()
+
 
 class TechnologicalFeedData:
     """
     Technológiai takarmány fogyasztási adatok kezelése
     CSV fájlból betöltés és interpoláció
+
+    Betöltéskor a görbét sűrű tömbbé fordítjuk (napi g/madár minden egész napra)
+    és kumulatív (prefix összeg) táblát készítünk, így a napi felvétel és két
+    tetszőleges (tört) nap közötti összes felvétel O(1) / np.interp lekérdezés.
     """
 
-    def __init__(self, csv_path: str = '/app/tech_feed_data.csv'):
+    def __init__(self, csv_path: str = '/app/tech_feed_data.csv', content: Optional[bytes] = None):
+        """
+        Args:
+            csv_path: CSV fájl útvonala
+            content: A fájl már beolvasott tartalma (pl. amiből a hash készült) - ekkor nem olvassuk újra
+        """
         self.csv_path = csv_path
         self.feed_data = {}  # {day: grams_per_day}
-        self._load_csv()
+        self.is_fallback = False  # True, ha a beégetett adatokat használjuk
+        self._load_csv(content)
+        self._compile()
 
-    def _load_csv(self):
-        """CSV fájl betöltése"""
+    def _load_csv(self, content: Optional[bytes] = None):
+        """CSV fájl (vagy a megadott tartalom) betöltése"""
         try:
-            with open(self.csv_path, 'r', encoding='utf-8') as f:
+            if content is None:
+                with open(self.csv_path, 'rb') as f:
+                    content = f.read()
+
+            with io.StringIO(content.decode('utf-8'), newline='') as f:
                 reader = csv.reader(f)
                 next(reader)  # Fejléc átugrása
 
@@ -82,6 +411,7 @@ class TechnologicalFeedData:
     def _load_fallback_data(self):
         """Beégetett fallback adatok, ha a CSV nem elérhető"""
         logger.warning("⚠️ Fallback: beégetett technológiai adatok használata")
+        self.is_fallback = True
         self.feed_data = {
             0: 0, 1: 0, 2: 16, 3: 20, 4: 24, 5: 27, 6: 31, 7: 35, 8: 39, 9: 44,
             10: 48, 11: 52, 12: 57, 13: 62, 14: 67, 15: 72, 16: 77, 17: 83, 18: 88, 19: 94,
@@ -91,12 +421,52 @@ class TechnologicalFeedData:
             50: 227
         }
 
-    def get_daily_intake_per_bird(self, day: int) -> float:
+    def _compile(self):
+        """
+        Technológiai görbe fordítása sűrű tömbökbe
+
+        - day_grid / intake_g: 0..max_day minden egész napra (hiányzó napok lineárisan interpolálva)
+        - cumulative_g: prefix összeg, cumulative_g[k] = 0..k-1. nap összes felvétele (g/madár)
+
+        A kumulatív tábla napi lépcsős görbét feltételez (a k. napon egész nap intake_g[k]),
+        pontosan úgy, ahogy az óránkénti szimulációk a napi tech adatot használják.
+        """
+        known_days = np.array(sorted(self.feed_data.keys()), dtype=float)
+        known_intake = np.array([self.feed_data[int(d)] for d in known_days], dtype=float)
+
+        self.max_day = int(known_days[-1])
+        self.day_grid = np.arange(self.max_day + 1, dtype=float)
+        self.intake_g = np.interp(self.day_grid, known_days, known_intake)
+        self.plateau_g = float(self.intake_g[-1])
+        self.cumulative_g = np.concatenate(([0.0], np.cumsum(self.intake_g)))
+
+    @classmethod
+    def from_arrays(cls, csv_path: str, intake_g: np.ndarray, cumulative_g: np.ndarray,
+                    is_fallback: bool = False) -> 'TechnologicalFeedData':
+        """
+        Már lefordított görbe (pl. megosztott memóriából) - CSV olvasás és fordítás nélkül
+
+        Args:
+            intake_g: Napi felvétel (g/madár) 0..max_day minden egész napra
+            cumulative_g: Prefix összeg (len(intake_g) + 1 elem)
+        """
+        curve = cls.__new__(cls)
+        curve.csv_path = csv_path
+        curve.is_fallback = is_fallback
+        curve.intake_g = intake_g
+        curve.cumulative_g = cumulative_g
+        curve.max_day = len(intake_g) - 1
+        curve.day_grid = np.arange(curve.max_day + 1, dtype=float)
+        curve.plateau_g = float(intake_g[-1])
+        curve.feed_data = {day: float(g) for day, g in enumerate(intake_g)}
+        return curve
+
+    def get_daily_intake_per_bird(self, day: float) -> float:
         """
         Egy madár várható napi takarmány felvétele
 
         Args:
-            day: Nevelési nap (0-tól számítva)
+            day: Nevelési nap (0-tól számítva, tört érték esetén lineáris interpoláció)
 
         Returns:
             Takarmány felvétel grammban/nap (1 madár)
@@ -104,321 +474,1574 @@ class TechnologicalFeedData:
         if day < 0:
             return 0.0
 
-        # Ha túlléptük a táblázat végét, plató érték
-        if day > max(self.feed_data.keys()):
-            return float(self.feed_data[max(self.feed_data.keys())])
-
-        # Pontos érték
-        if day in self.feed_data:
-            return float(self.feed_data[day])
+        # Táblázat vége után plató érték (np.interp jobb oldali levágása)
+        return float(np.interp(day, self.day_grid, self.intake_g))
 
-        # Lineáris interpoláció két ismert pont között
-        lower_day = max([d for d in self.feed_data.keys() if d < day], default=0)
-        upper_day = min([d for d in self.feed_data.keys() if d > day], default=max(self.feed_data.keys()))
+    def get_daily_intake_bulk(self, days) -> np.ndarray:
+        """
+        Napi felvétel (g/madár) tömbös lekérdezése - get_daily_intake_per_bird vektorizált változata
 
-        if lower_day == upper_day:
-            return float(self.feed_data[lower_day])
+        Args:
+            days: Nevelési napok tömbje (tört is lehet)
 
-        # Lineáris interpoláció
-        lower_intake = self.feed_data[lower_day]
-        upper_intake = self.feed_data[upper_day]
+        Returns:
+            g/madár/nap tömb
+        """
+        days = np.asarray(days, dtype=float)
+        return np.where(days < 0, 0.0, np.interp(days, self.day_grid, self.intake_g))
 
-        fraction = (day - lower_day) / (upper_day - lower_day)
-        interpolated = lower_intake + fraction * (upper_intake - lower_intake)
+    def cumulative_intake(self, days) -> np.ndarray:
+        """
+        Kumulatív felvétel (g/madár) a 0. nap elejétől a megadott (tört) napig
 
-        return interpolated
+        Napi lépcsős görbe: a k. napon belül egyenletes fogyasztás intake_g[k] g/nap ütemben.
+        Negatív napokra 0, a táblázat vége után a plató értékkel folytatódik.
 
+        Args:
+            days: Nevelési nap(ok), tört érték is
 
-class SiloPredictor:
-    """Egy silo előrejelzési logikája technológiai adatok alapján"""
+        Returns:
+            g/madár (skalár bemenetre 0-dimenziós tömb)
+        """
+        days = np.clip(np.asarray(days, dtype=float), 0.0, None)
+        table_end = float(self.max_day + 1)
 
-    def __init__(self, ha_url: str, ha_token: str, entity_id: str, sensor_name: str,
-                 refill_threshold: int, max_capacity: int, prediction_days: int = 45,
-                 tech_csv_path: str = '/app/tech_feed_data.csv'):
-        self.ha_url = ha_url
-        self.ha_token = ha_token
-        self.entity_id = entity_id
-        self.sensor_name = sensor_name
-        self.refill_threshold = refill_threshold
-        self.max_capacity = max_capacity
-        self.prediction_days = prediction_days  # 45 nap ajánlott
+        within = np.minimum(days, table_end)
+        whole = np.minimum(np.floor(within).astype(int), self.max_day)
+        cumulative = self.cumulative_g[whole] + (within - whole) * self.intake_g[whole]
 
-        # Technológiai fogyasztási adatok betöltése
-        self.tech_data = TechnologicalFeedData(csv_path=tech_csv_path)
+        return cumulative + np.maximum(days - table_end, 0.0) * self.plateau_g
 
-        # Ciklus adatok (betöltés HA szenzorból)
-        self.cycle_start_date = None  # 0. nap dátuma
-        self.bird_count = None  # Madár darabszám
+    def cumulative_intake_between(self, start_day, end_day) -> np.ndarray:
+        """
+        Összes felvétel (g/madár) két tetszőleges (tört) nap között, tömbösen is
 
-        self.headers = {
-            'Authorization': f'Bearer {self.ha_token}',
-            'Content-Type': 'application/json'
-        }
+        Args:
+            start_day: Kezdő nap(ok)
+            end_day: Záró nap(ok)
 
-        logger.info(f"📦 Silo inicializálva: {self.sensor_name} ({self.entity_id})")
-        logger.info(f"📊 Előrejelzési időablak: {self.prediction_days} nap")
+        Returns:
+            g/madár
+        """
+        return self.cumulative_intake(end_day) - self.cumulative_intake(start_day)
 
-        # Betöltjük a ciklus adatokat (ha vannak)
-        self._load_cycle_data()
 
-    def _load_cycle_data(self):
-        """Ciklus adatok betöltése a HA szenzor attribútumaiból"""
-        sensor_entity_id = f"sensor.{self.sensor_name.lower().replace(' ', '_')}"
-        url = f"{self.ha_url}/api/states/{sensor_entity_id}"
+class TechCurveHandle:
+    """
+    Hivatkozás egy lefordított tech görbére
 
-        try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                attributes = data.get('attributes', {})
-
-                # Ciklus kezdete (0. nap)
-                cycle_start_str = attributes.get('cycle_start_date')
-                if cycle_start_str:
-                    self.cycle_start_date = datetime.fromisoformat(cycle_start_str).replace(tzinfo=LOCAL_TZ)
-                    logger.info(f"📥 [{self.sensor_name}] Ciklus kezdete betöltve: {self.cycle_start_date.strftime('%Y-%m-%d')}")
-
-                # Madár darabszám
-                self.bird_count = attributes.get('bird_count')
-                if self.bird_count:
-                    logger.info(f"📥 [{self.sensor_name}] Madár darabszám betöltve: {self.bird_count}")
+    A siló ezt tartja meg; újratöltéskor a .curve attribútum egyetlen
+    értékadással (atomikusan) cserélődik, így a hot path nem keres szótárban.
+    """
 
-            else:
-                logger.debug(f"ℹ️ [{self.sensor_name}] Szenzor még nem létezik, nincs ciklus adat")
-        except Exception as e:
-            logger.debug(f"ℹ️ [{self.sensor_name}] Ciklus adatok betöltése nem sikerült: {e}")
+    def __init__(self, csv_path: str, curve: TechnologicalFeedData,
+                 mtime: Optional[float], digest: Optional[str]):
+        self.csv_path = csv_path
+        self.curve = curve
+        self.mtime = mtime
+        self.pending_mtime = None  # Új, még nem stabil mtime (check_reload két ellenőrzésen át várja)
+        self.digest = digest
+        self.loaded_at = SYSTEM_CLOCK.now()
 
-    def _save_cycle_data(self, cycle_start_date: datetime, bird_count: int):
-        """Ciklus adatok mentése (0. nap, madár darabszám)"""
-        self.cycle_start_date = cycle_start_date
-        self.bird_count = bird_count
-        logger.info(f"💾 [{self.sensor_name}] Ciklus adatok mentve: "
-                   f"kezdet={cycle_start_date.strftime('%Y-%m-%d')}, madarak={bird_count}")
 
-    def get_historical_data(self) -> List[Tuple[datetime, float]]:
-        """Történeti adatok lekérése a Home Assistant API-ból"""
-        # Lokális időben számolunk
-        end_time = datetime.now(LOCAL_TZ)
-        start_time = end_time - timedelta(days=self.prediction_days)
+class TechCurveRegistry:
+    """
+    Folyamat-szintű, közös tech görbe nyilvántartás (minden siló ugyanazt használja)
 
-        logger.info(f"📊 [{self.sensor_name}] Adatok lekérése: {start_time.strftime('%Y-%m-%d %H:%M')} - {end_time.strftime('%Y-%m-%d %H:%M')}")
+    - Fájlonként egyszer tölt be és fordít
+    - check_reload(): mtime változás esetén megvárja, hogy az mtime két egymást
+      követő ellenőrzésen át ne változzon (az írás befejeződött), majd tartalom hash,
+      eltérés esetén újrafordítás és atomikus csere. A hash és a fordítás ugyanabból
+      a beolvasásból készül; hibás, részben írt vagy napokat vesztő fájl esetén a régi marad.
+    """
 
-        url = f"{self.ha_url}/api/history/period/{start_time.isoformat()}"
-        params = {
-            'filter_entity_id': self.entity_id,
-            'end_time': end_time.isoformat()
-        }
+    def __init__(self):
+        self._handles = {}  # {csv_path: TechCurveHandle}
+        self._names = {DEFAULT_TECH_CURVE: DEFAULT_TECH_CSV_PATH}  # {görbe név: csv_path}
+        self._lock = threading.Lock()
 
+    @staticmethod
+    def _read_file(csv_path: str) -> Tuple[Optional[float], Optional[str], Optional[bytes]]:
+        """(mtime, sha256, tartalom) egyetlen beolvasásból, vagy (None, None, None), ha a fájl nem olvasható"""
         try:
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            response.raise_for_status()
-
-            data = response.json()
-
-            if not data or not data[0]:
-                logger.warning(f"❌ [{self.sensor_name}] Nincs adat a válaszban")
-                return []
-
-            # Adatok feldolgozása - UTC-ből lokális időre konvertálás
-            processed_data = []
-            for entry in data[0]:
-                try:
-                    # HA UTC-ben küldi, konvertáljuk lokálisra
-                    timestamp_utc = datetime.fromisoformat(entry['last_changed'].replace('Z', '+00:00'))
-                    # Konvertálás lokális időzónára
-                    timestamp = timestamp_utc.astimezone(LOCAL_TZ)
+            mtime = os.stat(csv_path).st_mtime
+            with open(csv_path, 'rb') as f:
+                content = f.read()
+            return mtime, hashlib.sha256(content).hexdigest(), content
+        except OSError:
+            return None, None, None
+
+    def get(self, csv_path: str) -> TechCurveHandle:
+        """Közös görbe hivatkozás (első kéréskor betöltés és fordítás)"""
+        with self._lock:
+            handle = self._handles.get(csv_path)
+            if handle is None:
+                mtime, digest, content = self._read_file(csv_path)
+                handle = TechCurveHandle(csv_path, TechnologicalFeedData(csv_path=csv_path, content=content),
+                                         mtime, digest)
+                self._handles[csv_path] = handle
+            return handle
+
+    def register_directory(self, directory: str) -> List[str]:
+        """
+        Névvel ellátott görbék betöltése egy könyvtárból (fájlnév kiterjesztés nélkül = név)
 
-                    state = entry.get('state', '0')
-                    if state in ['unknown', 'unavailable', 'null', None]:
-                        continue
+        Pl. ross308.csv → 'ross308'. Minden görbe azonnal lefordul (sűrű + prefix összeg tömbök).
 
-                    weight = float(state)
-                    if 0 <= weight <= 50000:
-                        processed_data.append((timestamp, weight))
+        Args:
+            directory: Görbe CSV-k könyvtára
 
-                except (ValueError, KeyError, TypeError):
-                    continue
+        Returns:
+            A betöltött görbék nevei
+        """
+        if not os.path.isdir(directory):
+            logger.info(f"ℹ️ Tech görbe könyvtár nem található: {directory} (csak az alapértelmezett görbe)")
+            return []
 
-            processed_data.sort(key=lambda x: x[0])
+        names = []
+        for filename in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(filename)
+            if extension.lower() != '.csv':
+                continue
 
-            logger.info(f"✅ [{self.sensor_name}] {len(processed_data)} adatpont betöltve")
-            return processed_data
+            csv_path = os.path.join(directory, filename)
+            with self._lock:
+                self._names[name] = csv_path
+            self.get(csv_path)
+            names.append(name)
 
-        except requests.RequestException as e:
-            logger.error(f"❌ [{self.sensor_name}] API hiba: {e}")
-            return []
+        logger.info(f"📚 Tech görbék betöltve ({directory}): {', '.join(names) if names else 'nincs'}")
+        return names
 
-    def sample_daily_data(self, data: List[Tuple[datetime, float]]) -> List[Tuple[datetime, float]]:
+    def get_named(self, name: Optional[str]) -> Optional[TechCurveHandle]:
         """
-        6 ÓRÁNKÉNTI mintavételezés (napi 4 adatpont) - 7:00-kor nap váltás
+        Görbe hivatkozás név szerint (None → alapértelmezett)
 
-        Minden 6 órás periódusból (7:00, 13:00, 19:00, 1:00) egy átlagos súlyértéket készít.
+        Returns:
+            TechCurveHandle vagy None, ha nincs ilyen nevű görbe
+        """
+        csv_path = self._names.get(name or DEFAULT_TECH_CURVE)
+        return self.get(csv_path) if csv_path else None
 
-        INDOKLÁS:
-        A nevelési ciklus végén a fogyási ráta exponenciálisan növekszik:
-        - 1-2. feltöltés: 7-9 nap
-        - 2-3. feltöltés: 5 nap
-        - 3-4. feltöltés: 4 nap
-        - 4+. feltöltés: 2-3 nap
+    def names(self) -> List[str]:
+        """Ismert görbenevek"""
+        return sorted(self._names.keys())
 
-        Napi 1 adatpont későbbi fázisban pontatlan lenne!
+    def snapshot(self) -> Tuple[Dict[str, str], Dict[str, TechCurveHandle]]:
+        """(név → csv_path, csv_path → hivatkozás) másolat"""
+        with self._lock:
+            return dict(self._names), dict(self._handles)
 
-        Args:
-            data: Nyers adatok
+    def install(self, names: Dict[str, str], csv_path: str, curve: TechnologicalFeedData,
+                digest: Optional[str]) -> bool:
+        """
+        Máshol lefordított görbe beállítása (sharded mód: megosztott memóriából)
 
         Returns:
-            List of (timestamp, átlag_súly) - 6 óránként
+            True, ha új vagy a tartalma változott (a meglévő hivatkozáson atomikus csere)
         """
-        if not data:
-            return []
-
-        # 6 órás időszakokra csoportosítás
-        # Periódusok: 7:00-12:59, 13:00-18:59, 19:00-0:59, 1:00-6:59
-        period_buckets = {}
-
-        for timestamp, weight in data:
-            # Nap kulcs (7:00-os nap váltással)
-            if timestamp.hour < 7:
-                day_key = timestamp.date() - timedelta(days=1)
-            else:
-                day_key = timestamp.date()
+        with self._lock:
+            self._names.update(names)
+            handle = self._handles.get(csv_path)
+            if handle is None:
+                self._handles[csv_path] = TechCurveHandle(csv_path, curve, None, digest)
+                return True
+            if handle.digest == digest:
+                return False
 
-            # Periódus meghatározása (0-3: 7:00, 13:00, 19:00, 1:00)
-            if 7 <= timestamp.hour < 13:
-                period = 0  # 7:00-12:59
-            elif 13 <= timestamp.hour < 19:
-                period = 1  # 13:00-18:59
-            elif 19 <= timestamp.hour < 24:
-                period = 2  # 19:00-23:59
-            else:  # 0 <= timestamp.hour < 7
-                period = 3  # 0:00-6:59 (előző nap folytatása)
+            handle.curve = curve
+            handle.digest = digest
+            handle.loaded_at = SYSTEM_CLOCK.now()
+            return True
 
-            period_key = (day_key, period)
+    def check_reload(self) -> List[str]:
+        """
+        Változott görbefájlok újratöltése
 
-            if period_key not in period_buckets:
-                period_buckets[period_key] = []
+        Returns:
+            Az újratöltött fájlok útvonalai
+        """
+        reloaded = []
 
-            period_buckets[period_key].append(weight)
+        with self._lock:
+            for csv_path, handle in self._handles.items():
+                try:
+                    mtime = os.stat(csv_path).st_mtime
+                except OSError:
+                    continue  # Fájl (ideiglenesen) nem elérhető → marad a régi görbe
 
-        # Periódus átlagok számítása
-        sampled_data = []
-        for (day_key, period) in sorted(period_buckets.keys()):
-            weights = period_buckets[(day_key, period)]
-            avg_weight = np.mean(weights)
+                if mtime == handle.mtime:
+                    continue
+                if mtime != handle.pending_mtime:
+                    handle.pending_mtime = mtime  # Az írás még tarthat → a következő ellenőrzésig várunk
+                    continue
 
-            # Timestamp: a periódus kezdete
-            if period == 0:
-                period_timestamp = datetime.combine(day_key, datetime.min.time()).replace(hour=7, tzinfo=LOCAL_TZ)
-            elif period == 1:
-                period_timestamp = datetime.combine(day_key, datetime.min.time()).replace(hour=13, tzinfo=LOCAL_TZ)
-            elif period == 2:
-                period_timestamp = datetime.combine(day_key, datetime.min.time()).replace(hour=19, tzinfo=LOCAL_TZ)
-            else:  # period == 3
-                # 1:00 (következő nap 1:00-ja, de még az előző naphoz tartozik)
-                period_timestamp = datetime.combine(day_key + timedelta(days=1), datetime.min.time()).replace(hour=1, tzinfo=LOCAL_TZ)
+                # A hash és a fordítás ugyanabból a beolvasásból (közben módosuló fájl sem keverhető)
+                read_mtime, digest, content = self._read_file(csv_path)
+                if read_mtime != mtime:
+                    handle.pending_mtime = read_mtime
+                    continue  # Az ellenőrzés óta újra írták
+                handle.mtime = mtime
+                handle.pending_mtime = None
+                if digest == handle.digest:
+                    continue  # Csak az mtime változott (touch), a tartalom nem
+
+                curve = TechnologicalFeedData(csv_path=csv_path, content=content)
+                if curve.is_fallback:
+                    logger.error(f"❌ Tech görbe újratöltés sikertelen, a régi marad: {csv_path}")
+                    continue
+                if curve.max_day < handle.curve.max_day:
+                    logger.error(f"❌ Tech görbe újratöltés elutasítva, a régi marad: {csv_path} "
+                                 f"({curve.max_day + 1} nap < {handle.curve.max_day + 1} nap; "
+                                 f"rövidebb görbe újraindítással tölthető be)")
+                    continue
 
-            sampled_data.append((period_timestamp, avg_weight))
+                handle.curve = curve
+                handle.digest = digest
+                handle.loaded_at = SYSTEM_CLOCK.now()
+                reloaded.append(csv_path)
+                logger.info(f"♻️ Tech görbe újratöltve: {csv_path} ({len(curve.feed_data)} nap)")
 
-        if sampled_data:
-            logger.info(f"📈 [{self.sensor_name}] {len(sampled_data)} adatpont mintavételezve (6 óránként, napi 4 minta) "
-                       f"({sampled_data[0][0].strftime('%Y-%m-%d %H:%M')} - {sampled_data[-1][0].strftime('%Y-%m-%d %H:%M')})")
+        return reloaded
 
-        return sampled_data
 
-    def detect_refills(self, data: List[Tuple[datetime, float]]) -> Tuple[List[Tuple[datetime, float]], Optional[datetime]]:
-        """
-        Feltöltések detektálása és csak az utolsó feltöltés UTÁNI adatok megtartása
+# Közös, folyamat-szintű tech görbe nyilvántartás
+TECH_CURVES = TechCurveRegistry()
 
-        Returns:
-            Tuple: (cleaned_data, last_refill_timestamp)
-                   last_refill_timestamp: None ha nem volt feltöltés, különben az utolsó feltöltés időpontja
-        """
-        if len(data) < 2:
-            return data, None
 
-        last_refill_index = -1
-        last_refill_timestamp = None
+class SeriesGapIndex:
+    """
+    Adathiány (gap) index egy idősorhoz
 
-        for i in range(1, len(data)):
-            prev_weight = data[i-1][1]
-            curr_weight = data[i][1]
-            weight_change = curr_weight - prev_weight
+    Soronként EGYSZER számoljuk: a szomszédos minták közötti, küszöbnél nagyobb
+    kihagyások (kezdet = utolsó minta előtte, vég = első minta utána).
+    Az időalapú keresés bináris kereséssel történik (index-eltolás helyett).
+    """
 
-            if weight_change > 3000:
-                logger.info(f"🔄 [{self.sensor_name}] Feltöltés detektálva: {data[i-1][0]} -> {data[i][0]}, "
-                           f"Súlyváltozás: +{weight_change:.0f}kg")
-                last_refill_index = i
-                last_refill_timestamp = data[i][0]
+    def __init__(self, timestamps: List[datetime], threshold_hours: float = GAP_THRESHOLD_HOURS):
+        self.threshold_hours = threshold_hours
+        self.epoch = np.array([ts.timestamp() for ts in timestamps], dtype=float)
 
-        if last_refill_index >= 0:
-            cleaned_data = data[last_refill_index:]
-            logger.info(f"✅ [{self.sensor_name}] Utolsó feltöltés után: {len(cleaned_data)} adatpont ({data[last_refill_index][0]})")
+        if len(self.epoch) > 1:
+            gap_idx = np.nonzero(np.diff(self.epoch) > threshold_hours * 3600)[0]
         else:
-            cleaned_data = data
-            logger.info(f"✅ [{self.sensor_name}] Nem volt feltöltés, {len(cleaned_data)} adatpont használva")
+            gap_idx = np.array([], dtype=int)
 
-        return cleaned_data, last_refill_timestamp
+        self.gap_starts = self.epoch[gap_idx]
+        self.gap_ends = self.epoch[gap_idx + 1]
+        self.gaps = [(timestamps[i], timestamps[i + 1]) for i in gap_idx]
 
-    def detect_cycle_start(self, data: List[Tuple[datetime, float]]) -> Optional[datetime]:
-        """
-        0. nap detektálása: INTELLIGENS első feltöltés detektálás + 100kg+ súlycsökkenés napja
+    @classmethod
+    def from_series(cls, data: List[Tuple], threshold_hours: float = GAP_THRESHOLD_HOURS) -> 'SeriesGapIndex':
+        """Gap index (timestamp, ...) sorokból"""
+        return cls([row[0] for row in data], threshold_hours)
 
-        Logika (KÉTLÉPCSŐS):
-        1. ELSŐDLEGES: Keresünk ~5 napos "csend" periódust (előző ciklus vége):
-           - Siló súlya < 1000 kg
-           - Nincs jelentős fogyasztás (< 50 kg/nap)
-           - Ezt követő 3000kg+ ugrás = ELSŐ FELTÖLTÉS (új ciklus kezdete)
-        2. FALLBACK: Ha nincs csend periódus, keresünk nagy (10000kg+) feltöltést
-           - Ez valószínűleg ciklus kezdő feltöltés
-        3. Utána keressük az első 100kg+ csökkenést egy nap alatt
-        4. Ez lesz a 0. nap (állomány érkezése)
+    @staticmethod
+    def find_at(epoch: np.ndarray, target, tolerance_seconds: float = 60.0) -> np.ndarray:
+        """
+        Adott időpontú minta indexe bináris kereséssel (vektorizált)
 
         Args:
-            data: Mintavételezett adatok (6 óránként)
+            epoch: Rendezett időbélyegek (epoch másodperc)
+            target: Keresett időpont(ok) (epoch másodperc)
+            tolerance_seconds: Megengedett eltérés
 
         Returns:
-            0. nap dátuma vagy None
+            Indexek tömbje, -1 ha nincs minta a tűréshatáron belül
         """
-        if len(data) < 7:  # Minimum 7 nap adat kell
-            return None
+        target = np.asarray(target, dtype=float)
+        n = len(epoch)
+        if n == 0:
+            return np.full(target.shape, -1, dtype=int)
 
-        # 1. ELSŐDLEGES: Csend periódus + első feltöltés keresése
-        first_refill_index = -1
+        pos = np.searchsorted(epoch, target)
+        left = np.clip(pos - 1, 0, n - 1)
+        right = np.clip(pos, 0, n - 1)
+        nearest = np.where(np.abs(epoch[right] - target) <= np.abs(epoch[left] - target), right, left)
 
-        for i in range(5, len(data)):  # Legalább 5 nap múltbeli adat kell
-            # Előző 5 nap vizsgálata (csend periódus?)
-            silence_period = True
-            for j in range(i - 5, i):
-                weight = data[j][1]
+        return np.where(np.abs(epoch[nearest] - target) <= tolerance_seconds, nearest, -1)
 
-                # Súly túl magas (> 1000 kg) → nem csend periódus
-                if weight > 1000:
-                    silence_period = False
-                    break
+    def lookup(self, target, tolerance_seconds: float = 60.0) -> np.ndarray:
+        """Saját idősorban keresés (lásd find_at)"""
+        return self.find_at(self.epoch, target, tolerance_seconds)
 
-                # Van fogyasztás (> 50 kg/nap)
-                if j > 0:
-                    daily_change = abs(data[j][1] - data[j-1][1])
-                    if daily_change > 50:
-                        silence_period = False
-                        break
+    def spans_gap(self, start_epoch, end_epoch) -> np.ndarray:
+        """
+        Átível-e a [start, end] intervallum egy adathiányon (vektorizált)
 
-            # Ha csend periódus, és most jön egy 3000kg+ ugrás → ELSŐ FELTÖLTÉS
-            if silence_period and i < len(data):
-                weight_change = data[i][1] - data[i-1][1]
+        Mivel a hiányok rendezettek és diszjunktak, elég az első, start utáni
+        hiányt megnézni: ha az end előtt véget ér, az intervallum átíveli.
+        """
+        start = np.asarray(start_epoch, dtype=float)
+        end = np.asarray(end_epoch, dtype=float)
+        if len(self.gap_starts) == 0:
+            return np.zeros(np.broadcast(start, end).shape, dtype=bool)
 
-                if weight_change > 3000:
-                    first_refill_index = i
-                    logger.info(f"📍 [{self.sensor_name}] Csend periódus detektálva: "
-                               f"{data[i-5][0].strftime('%Y-%m-%d')} - {data[i-1][0].strftime('%Y-%m-%d')} "
-                               f"(súly < 1000 kg, nincs fogyasztás)")
-                    logger.info(f"📍 [{self.sensor_name}] ELSŐ FELTÖLTÉS (csend után): {data[i][0].strftime('%Y-%m-%d')}, "
-                               f"+{weight_change:.0f} kg → súly: {data[i][1]:.0f} kg")
-                    break
+        k = np.searchsorted(self.gap_starts, start, side='left')
+        has_gap = k < len(self.gap_starts)
+        k = np.minimum(k, len(self.gap_starts) - 1)
 
-        # 2. FALLBACK: Ha nincs csend periódus, keresünk nagy (5000kg+) feltöltést
-        if first_refill_index < 0:
-            logger.info(f"🔍 [{self.sensor_name}] Csend periódus nem található, alternatív módszer: nagy feltöltés keresése...")
+        return has_gap & (self.gap_ends[k] <= end)
+
+
+class DailyConsumptionTable:
+    """
+    Napi fogyasztási tábla (tömbökként)
+
+    Soronként egy nap: egymást követő 7:00-as minták különbsége (időalapú,
+    pontosan 24 órás, adathiányt át nem ívelő párok). A madárszám és a
+    korrekciós szorzó is ebből számolódik vektorizált redukciókkal.
+
+    Oszlopok:
+        day: Nevelési nap (a fogyasztás napja = előző 7:00 napja)
+        epoch: Előző 7:00 időbélyege (epoch másodperc)
+        consumption_kg: Napi fogyasztás (előző 7:00 - mai 7:00)
+        tech_g: Technológiai napi takarmányfelvétel (g/madár)
+        bird_estimate: Madárszám becslés (fogyasztás / tech, egészre vágva)
+        valid: Használható nap (fogyasztás >= 10 kg és van tech adat)
+    """
+
+    MIN_DAILY_CONSUMPTION_KG = 10.0
+
+    def __init__(self, day, epoch, consumption_kg, tech_g):
+        self.day = np.asarray(day, dtype=int)
+        self.epoch = np.asarray(epoch, dtype=float)
+        self.consumption_kg = np.asarray(consumption_kg, dtype=float)
+        self.tech_g = np.asarray(tech_g, dtype=float)
+        self.skipped_pairs = 0
+
+        self.valid = (self.consumption_kg >= self.MIN_DAILY_CONSUMPTION_KG) & (self.tech_g > 0)
+        ratio = np.divide(self.consumption_kg * 1000.0, self.tech_g,
+                          out=np.zeros_like(self.consumption_kg), where=self.valid)
+        self.bird_estimate = np.floor(ratio).astype(int)
+
+    @classmethod
+    def build(cls, continuous_data: List[Tuple[datetime, float, int, float]],
+              tech_data: TechnologicalFeedData,
+              gap_index: Optional[SeriesGapIndex] = None,
+              after_day: Optional[int] = None) -> 'DailyConsumptionTable':
+        """
+        Tábla a folyamatos görbéből
+
+        Args:
+            continuous_data: [(timestamp, normalized_weight, day_in_cycle, exact_day), ...]
+            tech_data: Lefordított tech görbe
+            gap_index: Adathiány index (ha None, itt készül)
+            after_day: Csak az e nap UTÁNI napok sorai (a görbe végéről visszafelé
+                       keresve, a korábbi napok nem kerülnek feldolgozásra)
+        """
+        start = 0
+        if after_day is not None:
+            start = len(continuous_data)
+            while start > 0 and continuous_data[start - 1][2] > after_day:
+                start -= 1
+
+        rows = [row for row in continuous_data[start:] if row[0].hour == 7]
+        if len(rows) < 2:
+            return cls([], [], [], [])
+
+        if gap_index is None:
+            gap_index = SeriesGapIndex.from_series(continuous_data)
+
+        epoch = np.array([row[0].timestamp() for row in rows], dtype=float)
+        weight = np.array([row[1] for row in rows], dtype=float)
+        day = np.array([row[2] for row in rows], dtype=int)
+
+        # Pár keresése időalapon (+24 óra), adathiányon átívelő párok kizárva
+        next_idx = SeriesGapIndex.find_at(epoch, epoch + 86400)
+        has_next = next_idx >= 0
+        paired = has_next & ~gap_index.spans_gap(epoch, epoch[np.where(has_next, next_idx, 0)])
+        prev_idx = np.nonzero(paired)[0]
+        curr_idx = next_idx[paired]
+
+        table = cls(day[prev_idx], epoch[prev_idx], weight[prev_idx] - weight[curr_idx],
+                    tech_data.get_daily_intake_bulk(day[prev_idx]))
+        table.skipped_pairs = len(rows) - 1 - len(prev_idx)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    def bird_counts(self) -> Dict[int, int]:
+        """Napi madárszámok {nap: madárszám} az érvényes napokra"""
+        return dict(zip(self.day[self.valid].tolist(), self.bird_estimate[self.valid].tolist()))
+
+    def correction_factor(self, bird_counts: Optional[Dict[int, int]] = None) -> Tuple[float, float, float]:
+        """
+        Valós / technológiai fogyasztás aránya
+
+        Args:
+            bird_counts: Napi madárszámok (ha None, a tábla saját becslése)
+
+        Returns:
+            (correction_factor, total_actual_kg, total_expected_kg)
+        """
+        if bird_counts is None:
+            mask = self.valid
+            birds = self.bird_estimate.astype(float)
+        else:
+            birds = np.array([bird_counts.get(d, np.nan) for d in self.day.tolist()], dtype=float)
+            mask = ~np.isnan(birds) & (self.consumption_kg >= 0) & (self.tech_g > 0)
+
+        total_actual = float(np.sum(self.consumption_kg[mask]))
+        total_expected = float(np.sum(self.tech_g[mask] * birds[mask]) / 1000.0)
+
+        if total_expected > 0:
+            return total_actual / total_expected, total_actual, total_expected
+        return 1.0, total_actual, total_expected
+
+
+class BucketConsumptionTable:
+    """
+    6 órás fogyasztási tábla napszakos arányokkal (mind a 4 időszak felhasználva)
+
+    Minden mintához az időszak fogyasztása (minta - 6 órával későbbi minta),
+    az időszak (0-3: 7:00, 13:00, 19:00, 1:00) és a nevelési nap tech adata.
+    A napszakos fogyasztási arányt (hányad része a napi takarmánynak fogy az
+    adott 6 órában) a teljes, adathiány nélküli napokból tanuljuk, egyenletes
+    (0.25) priorral - így az első napokban is értelmes a becslés.
+    Időszakonkénti madárszám = fogyasztás / (tech napi g/madár × arány).
+    """
+
+    MIN_BUCKET_CONSUMPTION_KG = 2.5  # 10 kg/nap negyede
+
+    def __init__(self, epoch, day, slot, consumption_kg, tech_g, shares, share_days: int = 0):
+        self.epoch = np.asarray(epoch, dtype=float)
+        self.day = np.asarray(day, dtype=int)
+        self.slot = np.asarray(slot, dtype=int)
+        self.consumption_kg = np.asarray(consumption_kg, dtype=float)
+        self.tech_g = np.asarray(tech_g, dtype=float)
+        self.shares = np.asarray(shares, dtype=float)
+        self.share_days = share_days
+
+        expected_g = self.tech_g * self.shares[self.slot] if len(self.slot) else np.zeros(0)
+        self.expected_g = expected_g
+        self.valid = (self.consumption_kg >= self.MIN_BUCKET_CONSUMPTION_KG) & (expected_g > 0)
+        self.bird_estimate = np.divide(self.consumption_kg * 1000.0, expected_g,
+                                       out=np.zeros_like(self.consumption_kg), where=self.valid)
+
+    @classmethod
+    def build(cls, continuous_data: List[Tuple[datetime, float, int, float]],
+              tech_data: TechnologicalFeedData,
+              gap_index: Optional[SeriesGapIndex] = None,
+              prior_days: float = CONSUMPTION_SHARE_PRIOR_DAYS) -> 'BucketConsumptionTable':
+        """
+        Tábla a folyamatos görbéből
+
+        Args:
+            continuous_data: [(timestamp, normalized_weight, day_in_cycle, exact_day), ...]
+            tech_data: Lefordított tech görbe
+            gap_index: Adathiány index (ha None, itt készül)
+            prior_days: Egyenletes napszakos arány súlya (napokban)
+        """
+        uniform = np.full(len(BUCKET_START_HOURS), 1.0 / len(BUCKET_START_HOURS))
+        if len(continuous_data) < 2:
+            return cls([], [], [], [], [], uniform)
+
+        if gap_index is None:
+            gap_index = SeriesGapIndex.from_series(continuous_data)
+
+        epoch = np.array([row[0].timestamp() for row in continuous_data], dtype=float)
+        weight = np.array([row[1] for row in continuous_data], dtype=float)
+        day = np.array([row[2] for row in continuous_data], dtype=int)
+        hour_slot = np.full(24, -1, dtype=int)
+        hour_slot[list(BUCKET_START_HOURS)] = np.arange(len(BUCKET_START_HOURS))
+        slot = hour_slot[[row[0].hour for row in continuous_data]]
+
+        # Időszak fogyasztása: minta - 6 órával későbbi minta (adathiány nélkül)
+        next_idx = SeriesGapIndex.find_at(epoch, epoch + 6 * 3600)
+        paired = (next_idx >= 0) & (slot >= 0)
+        paired &= ~gap_index.spans_gap(epoch, epoch[np.where(paired, next_idx, 0)])
+        idx = np.nonzero(paired)[0]
+        consumption = weight[idx] - weight[next_idx[idx]]
+
+        # Napszakos arány tanulása teljes napokból (7:00 → 4 egymást követő időszak)
+        shares = uniform.copy()
+        share_days = 0
+        slot_of_idx = slot[idx]
+        position = np.full(len(epoch), -1, dtype=int)
+        position[idx] = np.arange(len(idx))
+        current = idx[slot_of_idx == 0]
+        if len(current):
+            complete = np.ones(len(current), dtype=bool)
+            columns = []
+            for _ in BUCKET_START_HOURS:
+                complete &= position[current] >= 0
+                columns.append(np.where(complete, position[current], 0))
+                current = np.where(complete, next_idx[current], 0)
+            day_parts = consumption[np.stack(columns, axis=1)[complete]]
+            day_totals = day_parts.sum(axis=1)
+            good = (day_totals >= DailyConsumptionTable.MIN_DAILY_CONSUMPTION_KG) & np.all(day_parts >= 0, axis=1)
+            share_days = int(np.sum(good))
+            if share_days:
+                observed = (day_parts[good] / day_totals[good, None]).sum(axis=0)
+                shares = (observed + prior_days * uniform) / (share_days + prior_days)
+                shares /= shares.sum()
+
+        return cls(epoch[idx], day[idx], slot_of_idx, consumption,
+                   tech_data.get_daily_intake_bulk(day[idx]), shares, share_days)
+
+    def __len__(self) -> int:
+        return len(self.epoch)
+
+    def bird_count(self, min_buckets: int = 3) -> Optional[Tuple[int, float]]:
+        """
+        Összesített madárszám (összegek aránya, így a kis fogyasztású időszakok
+        zaja nem dominál) és szórása (időszakonkénti becslések szórásából)
+
+        Returns:
+            (madárszám, szórás) vagy None, ha kevés érvényes időszak van
+        """
+        n = int(np.sum(self.valid))
+        if n < min_buckets:
+            return None
+
+        birds = float(np.sum(self.consumption_kg[self.valid]) * 1000.0 / np.sum(self.expected_g[self.valid]))
+        spread = float(np.std(self.bird_estimate[self.valid], ddof=1))
+        return int(round(birds)), spread / math.sqrt(n)
+
+
+class BirdCountEstimator:
+    """
+    Rekurzív madárszám becslő (egydimenziós Kalman szűrő)
+
+    Állapot: madárszám becslés és varianciája. Minden lezárt nap EGYSZER kerül
+    bele O(1) lépésben: előrejelzés (lassú elhullás → folyamatzaj napokkal
+    arányosan), majd korrekció a napi mérésből (fogyasztás / tech adat).
+    Az állapot a szenzor attribútumaiban perzisztál, újraindítás után folytatódik.
+    """
+
+    def __init__(self, measurement_cv: float = BIRD_MEASUREMENT_CV, process_cv: float = BIRD_PROCESS_CV):
+        self.measurement_cv = measurement_cv
+        self.process_cv = process_cv
+        self.reset()
+
+    def reset(self, cycle_start: Optional[str] = None):
+        """Állapot törlése (új ciklus)"""
+        self.cycle_start = cycle_start
+        self.estimate = None
+        self.variance = None
+        self.last_day = None
+        self.updates = 0
+
+    @property
+    def std(self) -> Optional[float]:
+        """Becslés szórása"""
+        return math.sqrt(self.variance) if self.variance is not None else None
+
+    def update(self, day: int, measurement: float) -> bool:
+        """
+        Egy lezárt nap mérésének beépítése
+
+        Args:
+            day: Nevelési nap (csak a legutóbb beépítettnél későbbi nap számít)
+            measurement: Napi madárszám mérés
+
+        Returns:
+            True ha a nap beépült
+        """
+        if self.last_day is not None and day <= self.last_day:
+            return False
+
+        measurement_var = (self.measurement_cv * measurement) ** 2
+
+        if self.estimate is None:
+            self.estimate = float(measurement)
+            self.variance = measurement_var
+        else:
+            # Előrejelzés: eltelt napokkal arányos folyamatzaj
+            self.variance += (self.process_cv * self.estimate) ** 2 * (day - self.last_day)
+
+            # Korrekció
+            gain = self.variance / (self.variance + measurement_var)
+            self.estimate += gain * (measurement - self.estimate)
+            self.variance *= (1.0 - gain)
+
+        self.last_day = int(day)
+        self.updates += 1
+        return True
+
+    def update_from_table(self, table: DailyConsumptionTable) -> int:
+        """
+        Új lezárt napok beépítése a napi fogyasztási táblából
+
+        Returns:
+            Beépített napok száma
+        """
+        if len(table) == 0:
+            return 0
+
+        new_rows = table.valid if self.last_day is None else (table.valid & (table.day > self.last_day))
+        added = 0
+        for day, birds in zip(table.day[new_rows].tolist(), table.bird_estimate[new_rows].tolist()):
+            added += self.update(day, birds)
+        return added
+
+    def to_dict(self) -> Dict:
+        """Perzisztálható állapot (szenzor attribútum)"""
+        return {
+            'cycle_start': self.cycle_start,
+            'estimate': round(self.estimate, 1) if self.estimate is not None else None,
+            'variance': round(self.variance, 1) if self.variance is not None else None,
+            'last_day': self.last_day,
+            'updates': self.updates
+        }
+
+    def load_dict(self, state: Optional[Dict]):
+        """Állapot visszatöltése (hiányos / hibás állapot → üres becslő)"""
+        if not isinstance(state, dict):
+            return
+        try:
+            self.cycle_start = state.get('cycle_start')
+            self.estimate = float(state['estimate']) if state.get('estimate') is not None else None
+            self.variance = float(state['variance']) if state.get('variance') is not None else None
+            self.last_day = int(state['last_day']) if state.get('last_day') is not None else None
+            self.updates = int(state.get('updates') or 0)
+            if self.estimate is None or self.variance is None:
+                self.reset(self.cycle_start)
+        except (TypeError, ValueError, KeyError):
+            self.reset()
+
+
+class RegressionAccumulator:
+    """
+    Egyszerű lineáris regresszió futó elégséges statisztikákból (scipy nélkül)
+
+    n, Σx, Σy, Σxy, Σx², Σy² tárolva; pontok hozzáadása és eltávolítása
+    (csúszó ablak) O(1) pontonként, a meredekség, tengelymetszet, r és
+    standard hiba lekérdezése O(1).
+    """
+
+    def __init__(self):
+        self.n = 0.0
+        self.sum_x = 0.0
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+        self.sum_xx = 0.0
+        self.sum_yy = 0.0
+
+    @classmethod
+    def from_arrays(cls, x, y) -> 'RegressionAccumulator':
+        """Akkumulátor tömbökből (egyszeri regresszióhoz)"""
+        accumulator = cls()
+        accumulator.add(x, y)
+        return accumulator
+
+    def add(self, x, y, sign: float = 1.0):
+        """Pont(ok) hozzáadása (skalár vagy tömb)"""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.n += sign * x.size
+        self.sum_x += sign * float(np.sum(x))
+        self.sum_y += sign * float(np.sum(y))
+        self.sum_xy += sign * float(np.sum(x * y))
+        self.sum_xx += sign * float(np.sum(x * x))
+        self.sum_yy += sign * float(np.sum(y * y))
+
+    def remove(self, x, y):
+        """Pont(ok) eltávolítása (csúszó ablak)"""
+        self.add(x, y, sign=-1.0)
+
+    def fit(self) -> Optional[Dict[str, float]]:
+        """
+        Regressziós eredmény (scipy.stats.linregress megfelelője)
+
+        Returns:
+            Dict: slope, intercept, rvalue, stderr, intercept_stderr, y_mean, y_std
+            vagy None, ha kevés pont / nulla x szórás
+        """
+        n = self.n
+        if n < 2:
+            return None
+
+        # Centrált összegek
+        s_xx = self.sum_xx - self.sum_x * self.sum_x / n
+        s_yy = max(self.sum_yy - self.sum_y * self.sum_y / n, 0.0)
+        s_xy = self.sum_xy - self.sum_x * self.sum_y / n
+        if s_xx <= 0:
+            return None
+
+        slope = s_xy / s_xx
+        intercept = (self.sum_y - slope * self.sum_x) / n
+        rvalue = s_xy / math.sqrt(s_xx * s_yy) if s_yy > 0 else 0.0
+        rvalue = max(-1.0, min(1.0, rvalue))
+
+        if n > 2:
+            stderr = math.sqrt(max((1.0 - rvalue ** 2) * s_yy / s_xx / (n - 2), 0.0))
+        else:
+            stderr = 0.0
+
+        return {
+            'slope': slope,
+            'intercept': intercept,
+            'rvalue': rvalue,
+            'stderr': stderr,
+            'intercept_stderr': stderr * math.sqrt(self.sum_xx / n),
+            'y_mean': self.sum_y / n,
+            'y_std': math.sqrt(s_yy / (n - 1))
+        }
+
+
+def cumulative_consumption(daily_kg) -> np.ndarray:
+    """
+    Kumulatív fogyasztási görbe napi fogyasztásokból
+
+    Args:
+        daily_kg: Napi fogyasztás (kg) a mostantól számított 0, 1, 2, ... napokra
+                  (az utolsó tengely a nap, előtte tetszőleges batch tengelyek)
+
+    Returns:
+        Kumulatív fogyasztás egész napos csomópontokban, vezető 0-val (hossz + 1)
+    """
+    daily_kg = np.asarray(daily_kg, dtype=float)
+    zeros = np.zeros(daily_kg.shape[:-1] + (1,))
+    return np.concatenate((zeros, np.cumsum(daily_kg, axis=-1)), axis=-1)
+
+
+def solve_empty_days(weight, cumulative_kg) -> np.ndarray:
+    """
+    Kiürülési idő (napokban) zárt alakban - óránkénti ciklus helyett
+
+    A kumulatív görbe egész napos csomópontjai között lineáris (napon belül
+    egyenletes fogyás), így az első metszés vektorizált kereséssel, majd
+    napon belüli interpolációval pontosan (perc pontossággal) adódik.
+
+    Args:
+        weight: Kiinduló súly(ok) kg-ban (skalár vagy batch tömb)
+        cumulative_kg: cumulative_consumption() eredménye (..., horizont + 1)
+
+    Returns:
+        Napok száma a 0 kg-ig, np.nan ha a horizonton belül nem ürül ki
+    """
+    cumulative_kg = np.asarray(cumulative_kg, dtype=float)
+    weight = np.asarray(weight, dtype=float)
+
+    # Első csomópont, ahol a kumulatív fogyás eléri a súlyt (nem monoton görbén is az első)
+    reached = cumulative_kg >= weight[..., None]
+    first = np.argmax(reached, axis=-1)
+    before = np.maximum(first - 1, 0)
+
+    c_before = np.take_along_axis(cumulative_kg, before[..., None], axis=-1)[..., 0]
+    c_first = np.take_along_axis(cumulative_kg, first[..., None], axis=-1)[..., 0]
+    step = c_first - c_before
+
+    # Napon belüli interpoláció
+    fraction = np.where(step > 0, (weight - c_before) / np.where(step > 0, step, 1.0), 0.0)
+    days = np.where(first == 0, 0.0, before + fraction)
+
+    return np.where(np.any(reached, axis=-1), days, np.nan)
+
+
+def forecast_trajectory(weight: float, cumulative_kg, step_hours: int = TRAJECTORY_STEP_HOURS,
+                        max_points: int = TRAJECTORY_MAX_POINTS,
+                        quantum_kg: int = TRAJECTORY_QUANTUM_KG) -> Dict[str, List[int]]:
+    """
+    Előrejelzett súlygörbe kompakt formában (párhuzamos offset / súly tömbök)
+
+    Ugyanabból a kumulatív fogyásgörbéből számoljuk, mint a kiürülési időt,
+    így gyakorlatilag nincs többletköltség. Az utolsó pont a 0 kg (vagy a horizont vége).
+
+    Args:
+        weight: Kiinduló súly (kg)
+        cumulative_kg: cumulative_consumption() eredménye (egy forgatókönyv)
+        step_hours: Lépésköz órában
+        max_points: Maximális pontszám
+        quantum_kg: Súly kerekítés (kg)
+
+    Returns:
+        {'offset_h': [...], 'weight_kg': [...]}
+    """
+    cumulative_kg = np.asarray(cumulative_kg, dtype=float)
+    horizon_hours = (len(cumulative_kg) - 1) * 24
+
+    offsets_h = np.arange(0, horizon_hours + 1, step_hours)[:max_points]
+    weights = weight - np.interp(offsets_h / 24.0, np.arange(len(cumulative_kg)), cumulative_kg)
+
+    # Első nem-pozitív pontig (azt 0-ra vágva)
+    empty = np.nonzero(weights <= 0)[0]
+    if len(empty):
+        offsets_h = offsets_h[:empty[0] + 1]
+        weights = weights[:empty[0] + 1]
+
+    weights = np.round(np.maximum(weights, 0.0) / quantum_kg) * quantum_kg
+
+    return {
+        'offset_h': offsets_h.astype(int).tolist(),
+        'weight_kg': weights.astype(int).tolist()
+    }
+
+
+def shift_forecast_trajectory(trajectory: Dict[str, List[int]], elapsed_hours: float,
+                              quantum_kg: int = TRAJECTORY_QUANTUM_KG) -> Optional[Dict[str, List[int]]]:
+    """
+    Előrejelzett súlygörbe eltolása a mostani időpontra (extrapolált előrejelzéshez)
+
+    Az eltelt időnél korábbi pontok kimaradnak, az első pont a görbéből
+    interpolált mostani súly (0. óra).
+
+    Args:
+        trajectory: forecast_trajectory() eredménye
+        elapsed_hours: Az előrejelzés óta eltelt idő (óra)
+        quantum_kg: Súly kerekítés (kg)
+
+    Returns:
+        {'offset_h': [...], 'weight_kg': [...]} vagy None, ha a görbe már véget ért
+    """
+    offsets = np.asarray(trajectory['offset_h'], dtype=float)
+    weights = np.asarray(trajectory['weight_kg'], dtype=float)
+    if len(offsets) == 0 or elapsed_hours >= offsets[-1]:
+        return None
+
+    later = offsets - elapsed_hours >= 1.0
+    weight_now = np.round(np.interp(elapsed_hours, offsets, weights) / quantum_kg) * quantum_kg
+
+    return {
+        'offset_h': [0] + np.round(offsets[later] - elapsed_hours).astype(int).tolist(),
+        'weight_kg': [int(weight_now)] + weights[later].astype(int).tolist()
+    }
+
+
+def solve_arithmetic_depletion(weight: float, first_step: float, step_increment: float,
+                               max_steps: float) -> Optional[float]:
+    """
+    Zárt alakú (másodfokú) megoldás lépésenként lineárisan növekvő fogyásra
+
+    A j. lépésben (0-tól) a fogyás first_step + step_increment × j, a lépésen belül
+    egyenletesen. n teljes lépés után: S(n) = n·a + b·n·(n-1)/2.
+    A másodfokú gyök adja az első egész lépést, ahol S(n) >= súly, majd a lépésen
+    belül lineáris interpoláció → pontos, tört lépésszám (lépcsős rátaváltással).
+
+    Args:
+        weight: Kiinduló súly (kg)
+        first_step: Fogyás az első lépésben (kg)
+        step_increment: Fogyás növekménye lépésenként (kg)
+        max_steps: Horizont lépésekben
+
+    Returns:
+        Lépések száma (tört) a 0 kg-ig, None ha a horizonton belül nem ürül ki
+    """
+    if weight <= 0:
+        return 0.0
+
+    a, b = first_step, step_increment
+
+    def total(n: int) -> float:
+        return n * a + b * n * (n - 1) / 2.0
+
+    # Folytonos gyök: b/2·n² + (a - b/2)·n - súly = 0 (b < 0 esetén is az első metszés)
+    if abs(b) < 1e-12:
+        if a <= 0:
+            return None
+        n_root = weight / a
+    else:
+        p = a - b / 2.0
+        discriminant = p * p + 2.0 * b * weight
+        if discriminant < 0:
+            return None  # Lassuló fogyás, soha nem éri el a 0 kg-ot
+        n_root = (-p + math.sqrt(discriminant)) / b
+
+    if n_root < 0 or n_root > max_steps + 1:
+        return None
+
+    # Első egész lépés, ahol S(k) >= súly (kerekítési hibák javítása)
+    k = max(int(math.ceil(n_root - 1e-9)), 1)
+    while k > 1 and total(k - 1) >= weight:
+        k -= 1
+    while total(k) < weight:
+        k += 1
+        if k > max_steps + 1:
+            return None
+
+    steps = (k - 1) + (weight - total(k - 1)) / (a + b * (k - 1))
+
+    return steps if steps <= max_steps else None
+
+
+def tech_exp_daily_kg(tech_data: TechnologicalFeedData, current_day, bird_count, base_rate,
+                      acceleration, horizon_days: int, correction_factor=1.0,
+                      tech_offset_days=0.0) -> np.ndarray:
+    """
+    Tech+Exp modell napi fogyasztása (kg/nap) a mostantól számított 0..horizont-1 napokra
+
+    D[k] = tech(nap + eltolás + k) × madárszám / 1000 × korrekció × (alap ráta + gyorsulás·k) / alap ráta
+
+    Minden paraméter lehet skalár vagy azonos alakú tömb (broadcast); az eredmény
+    alakja (..., horizont).
+    """
+    bird_count, correction_factor, base_rate, acceleration, start_day = (
+        np.asarray(v, dtype=float)[..., None]
+        for v in (bird_count, correction_factor, base_rate, acceleration,
+                  np.add(current_day, tech_offset_days))
+    )
+    days_elapsed = np.arange(horizon_days, dtype=float)
+
+    tech_daily_kg = tech_data.get_daily_intake_bulk(start_day + days_elapsed) * bird_count / 1000.0
+    safe_base = np.where(base_rate > 0, base_rate, 1.0)
+    exp_factor = np.where(base_rate > 0, (base_rate + acceleration * days_elapsed) / safe_base, 1.0)
+
+    return tech_daily_kg * correction_factor * exp_factor
+
+
+class ScenarioEngine:
+    """
+    Vektorizált "mi lenne, ha" (what-if) motor a Tech+Exp modellre
+
+    Paraméter-kombinációk tömbjeit (madárszám, korrekciós szorzó, alap ráta,
+    gyorsulás, kezdő súly, tech görbe eltolás) egyetlen broadcastolt NumPy
+    kiértékeléssel oldja meg: (forgatókönyv × nap) fogyás mátrix → kumulatív
+    görbe → 0 kg metszés. Több ezer forgatókönyv ezredmásodpercek alatt.
+    """
+
+    def __init__(self, tech_data: TechnologicalFeedData, horizon_days: int = 60):
+        self.tech_data = tech_data
+        self.horizon_days = horizon_days
+
+    def evaluate(self, current_weight, current_day, bird_count, base_rate, acceleration,
+                 correction_factor=1.0, tech_offset_days=0.0) -> Dict[str, np.ndarray]:
+        """
+        Forgatókönyvek kiértékelése
+
+        Args:
+            current_weight: Kezdő súly (kg)
+            current_day: Jelenlegi nevelési nap
+            bird_count: Madárszám
+            base_rate: Alap fogyási ráta (kg/nap)
+            acceleration: Gyorsulás (kg/nap²)
+            correction_factor: Korrekciós szorzó (valós / tech)
+            tech_offset_days: Tech görbe eltolása napokban (pl. korábbi / későbbi fajta)
+
+        Returns:
+            Dict tömbökkel (közös broadcast alak): paraméterek, 'days_until_empty'
+            (horizonton túl np.nan) és 'empties_within_horizon'
+        """
+        params = dict(zip(
+            ('current_weight', 'current_day', 'bird_count', 'base_rate', 'acceleration',
+             'correction_factor', 'tech_offset_days'),
+            np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (
+                current_weight, current_day, bird_count, base_rate, acceleration,
+                correction_factor, tech_offset_days)))
+        ))
+
+        daily_kg = tech_exp_daily_kg(self.tech_data, params['current_day'], params['bird_count'],
+                                     params['base_rate'], params['acceleration'], self.horizon_days,
+                                     params['correction_factor'], params['tech_offset_days'])
+        days_until_empty = solve_empty_days(params['current_weight'], cumulative_consumption(daily_kg))
+
+        params['days_until_empty'] = days_until_empty
+        params['empties_within_horizon'] = ~np.isnan(days_until_empty)
+        return params
+
+
+class ModelInputs:
+    """
+    Közös, egyszer előkészített modell bemenet (ensemble futtatáshoz)
+
+    Minden modell ugyanazokat a tömböket kapja: nyers sor (epoch, súly) az
+    utolsó feltöltés óta, 6 órás minták, valamint a fő futásban becsült
+    paraméterek (madárszám, exp ráta / gyorsulás, nevelési nap).
+    """
+
+    def __init__(self, now: datetime, current_weight: float,
+                 raw_epoch: np.ndarray, raw_weight: np.ndarray,
+                 samples: List[Tuple[datetime, float]],
+                 base_rate: float, acceleration: float,
+                 current_day: Optional[int] = None, bird_count: Optional[int] = None,
+                 horizon_days: int = ENSEMBLE_HORIZON_DAYS):
+        self.now = now
+        self.current_weight = current_weight
+        self.raw_epoch = raw_epoch
+        self.raw_weight = raw_weight
+        self.samples = samples
+        self.base_rate = base_rate
+        self.acceleration = acceleration
+        self.current_day = current_day
+        self.bird_count = bird_count
+        self.horizon_days = horizon_days
+
+    @staticmethod
+    def since_last_refill(weights: np.ndarray, jump_kg: float = 3000) -> int:
+        """Utolsó feltöltés (> jump_kg ugrás) utáni első index (0, ha nem volt)"""
+        jumps = np.nonzero(np.diff(weights) > jump_kg)[0]
+        return int(jumps[-1] + 1) if len(jumps) else 0
+
+    def resampled_since_refill(self, step_seconds: float,
+                               window_start: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nyers sor átlagolása step_seconds hosszú, egész órához igazított időszakokra
+        (az utolsó feltöltés után, opcionálisan window_start epoch-tól)
+
+        Returns:
+            (időszak kezdetek epoch, átlag súlyok) - üres időszakok kihagyva
+        """
+        start = self.since_last_refill(self.raw_weight)
+        if window_start is not None:
+            start = max(start, int(np.searchsorted(self.raw_epoch, window_start)))
+        epoch = self.raw_epoch[start:]
+        weight = self.raw_weight[start:]
+        if len(epoch) == 0:
+            return np.zeros(0), np.zeros(0)
+
+        origin = epoch[0] - epoch[0] % 3600
+        bucket = ((epoch - origin) // step_seconds).astype(int)
+        counts = np.bincount(bucket)
+        filled = counts > 0
+        return (origin + np.nonzero(filled)[0] * step_seconds,
+                np.bincount(bucket, weights=weight)[filled] / counts[filled])
+
+
+class ModelRegistry:
+    """
+    Előrejelző modellek nyilvántartása (név → függvény, ensemble súly)
+
+    Egy modell függvény (predictor, ModelInputs) → Dict vagy None, ahol a Dict
+    vagy 'daily_kg' (napi fogyasztás a horizonton; ezeket egyetlen vektorizált
+    kereséssel oldjuk meg), vagy 'days_until_empty' (zárt alakú eredmény) kulcsot tartalmaz.
+    """
+
+    def __init__(self):
+        self._models = {}  # {név: (függvény, súly)}
+
+    def register(self, name: str, weight: float = 1.0):
+        """Dekorátor: modell regisztrálása"""
+        def decorator(func):
+            self._models[name] = (func, weight)
+            return func
+        return decorator
+
+    def items(self) -> List[Tuple[str, Tuple]]:
+        return list(self._models.items())
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+
+PREDICTION_MODELS = ModelRegistry()
+
+
+@PREDICTION_MODELS.register('tech_exp', weight=3.0)
+def model_tech_exp(predictor: 'SiloPredictor', inputs: ModelInputs) -> Optional[Dict]:
+    """Tech + Exp modell (predict_with_tech_and_exp): madárszám × tech görbe × exp gyorsulás"""
+    if inputs.current_day is None or not inputs.bird_count or inputs.base_rate <= 0:
+        return None
+    return {'daily_kg': tech_exp_daily_kg(predictor.tech_data, inputs.current_day, inputs.bird_count,
+                                          inputs.base_rate, inputs.acceleration, inputs.horizon_days)}
+
+
+@PREDICTION_MODELS.register('exp_only', weight=2.0)
+def model_exp_only(predictor: 'SiloPredictor', inputs: ModelInputs) -> Optional[Dict]:
+    """Csak exp modell (predict_with_exp_only): base_rate + k × gyorsulás kg/nap"""
+    if inputs.base_rate <= 0:
+        return None
+    return {'daily_kg': inputs.base_rate + inputs.acceleration * np.arange(inputs.horizon_days, dtype=float)}
+
+
+@PREDICTION_MODELS.register('linear', weight=1.0)
+def model_linear(predictor: 'SiloPredictor', inputs: ModelInputs) -> Optional[Dict]:
+    """Régi lineáris (opcionálisan növekedési korrekciós) modell (calculate_prediction), 3 órás átlagokon"""
+    epoch, weight = inputs.resampled_since_refill(3 * 3600)
+    segment = [(datetime.fromtimestamp(t, LOCAL_TZ), w) for t, w in zip(epoch.tolist(), weight.tolist())]
+    result = predictor.calculate_prediction(segment)
+
+    if not result or result.get('status') != 'emptying':
+        return None
+    empty_at = datetime.fromisoformat(result['predicted_empty_timestamp'])
+    return {'days_until_empty': (empty_at - inputs.now).total_seconds() / 86400}
+
+
+@PREDICTION_MODELS.register('polynomial', weight=1.0)
+def model_polynomial(predictor: 'SiloPredictor', inputs: ModelInputs) -> Optional[Dict]:
+    """
+    Polinom modell (custom_components/silo_prediction/sensor.py átirata, numpy-val)
+
+    Óránkénti átlagokra illesztett másodfokú polinom, első 0 kg gyök a
+    horizonton belül. Eltérés az eredetitől: csak az utolsó feltöltés utáni
+    szakaszra illesztünk (a fűrészfog alakú sorra a polinom értelmetlen),
+    és a gyököt zárt alakban keressük az 500 pontos rács helyett.
+    """
+    # Óránkénti átlag (resample('H').mean() megfelelője), az utolsó 30 napból
+    epoch, hourly_w = inputs.resampled_since_refill(3600, inputs.now.timestamp() - POLYNOMIAL_HISTORY_DAYS * 86400)
+    if len(epoch) <= POLYNOMIAL_DEGREE:
+        return None
+    origin = epoch[0]
+    hourly_t = epoch - origin
+
+    coefficients = np.polyfit(hourly_t, hourly_w, POLYNOMIAL_DEGREE)
+    now_t = inputs.now.timestamp() - origin
+    if hourly_w[-1] <= 0:
+        return {'days_until_empty': 0.0}
+
+    # Első valós gyök az utolsó óra után, a horizonton belül
+    last_t = hourly_t[-1]
+    roots = np.roots(coefficients)
+    roots = np.sort(roots[np.isreal(roots)].real)
+    roots = roots[(roots >= last_t) & (roots <= last_t + inputs.horizon_days * 86400)]
+    if len(roots) == 0 or roots[0] < now_t:
+        return None
+
+    return {'days_until_empty': (roots[0] - now_t) / 86400}
+
+
+class SiloPredictor:
+    """Egy silo előrejelzési logikája technológiai adatok alapján"""
+
+    def __init__(self, ha_url: str, ha_token: str, entity_id: str, sensor_name: str,
+                 refill_threshold: int, max_capacity: int, prediction_days: int = 45,
+                 tech_csv_path: str = DEFAULT_TECH_CSV_PATH, tech_curve_name: str = DEFAULT_TECH_CURVE,
+                 enable_growth_correction: bool = False, animal_age_days: Optional[float] = None,
+                 growth_rate_kg_per_hour_per_day: float = 0.000201, defer_cycle_data: bool = False,
+                 clock: Optional[Clock] = None):
+        self.ha_url = ha_url
+        self.clock = clock or SYSTEM_CLOCK
+        self.ha_token = ha_token
+        self.entity_id = entity_id
+        self.sensor_name = sensor_name
+        self.refill_threshold = refill_threshold
+        self.max_capacity = max_capacity
+        self.prediction_days = prediction_days  # 45 nap ajánlott
+
+        # Régi lineáris modell: növekedési korrekció (életkor: nevelési napból, ha ismert)
+        self.enable_growth_correction = enable_growth_correction
+        self.animal_age_days = animal_age_days or 0.0
+        self.growth_rate_kg_per_hour_per_day = growth_rate_kg_per_hour_per_day
+        self.previous_slope = None
+        self.previous_r_squared = None
+
+        # Technológiai fogyasztási adatok (közös, újratölthető nyilvántartásból)
+        self.tech_curve_name = tech_curve_name
+        self.tech_curve = TECH_CURVES.get(tech_csv_path)
+
+        # Ciklus adatok (betöltés HA szenzorból)
+        self.cycle_start_date = None  # 0. nap dátuma
+        self.bird_count = None  # Madár darabszám
+
+        # Utolsó Tech+Exp futás modell állapota (what-if forgatókönyvekhez)
+        self.model_state = None
+
+        # Utolsó exp regresszió statisztikái (meredekség standard hibája, ráták szórása)
+        self.exp_fit_stats = None
+
+        # Exp regresszió futó összegei (6 órás periódusonként frissítve)
+        self._exp_accumulator = RegressionAccumulator()
+        self._exp_points = deque()  # (epoch, x, y) az ablakban lévő pontok, időrendben
+        self._exp_origin = None
+        self._exp_last_epoch = None
+
+        # Utolsó előrejelzés kumulatív fogyásgörbéje (súlygörbe attribútumhoz)
+        self.last_forecast_cumulative = None
+
+        # Utolsó lekért nyers sor (újraszámoláshoz HA lekérés nélkül; meleg cache a következő lekéréshez)
+        self.cached_raw_data = None
+        self._cached_from = None  # A cache-elt sor lekérési ablaka
+        self._cached_until = None
+
+        # Rekurzív madárszám becslő (állapota a szenzor attribútumaiban perzisztál)
+        self.bird_estimator = BirdCountEstimator()
+
+        # Utolsó detektált feltöltés esemény (a manager tölti ki)
+        self.last_refill_event = None
+
+        # Utolsó sikeres előrejelzés (compute_prediction()) és időpontja
+        self.last_prediction = None
+        self.last_prediction_at = None
+
+        # Utolsó sikeres szenzor frissítés (clock.time(); az elavulás figyeléshez)
+        self.last_published_at = None
+
+        # Szenzor közzétételek sorba rendezése: a határidő / elavulás figyelés extrapolált
+        # előrejelzése nem keveredhet a párhuzamosan futó feldolgozás friss POST-jaival
+        self._publish_lock = threading.Lock()
+        self._publish_lock_async = asyncio.Lock()
+
+        # Az utolsó feldolgozás / feltöltés ellenőrzés aktív feltöltést látott
+        self.refill_in_progress = False
+
+        # A mentett ciklus állapot betöltve (vagy a szenzor még nem létezik)
+        self.cycle_data_loaded = False
+
+        # A szenzorban tárolt utolsó várható kiürülés (indulási sürgősségi sorrendhez)
+        self.restored_empty_timestamp = None
+
+        self.headers = {
+            'Authorization': f'Bearer {self.ha_token}',
+            'Content-Type': 'application/json'
+        }
+
+        logger.info(f"📦 Silo inicializálva: {self.sensor_name} ({self.entity_id})")
+        logger.info(f"📊 Előrejelzési időablak: {self.prediction_days} nap")
+        logger.info(f"📚 Tech görbe: {self.tech_curve_name} ({tech_csv_path})")
+
+        # Betöltjük a ciklus adatokat (ha vannak) - a manager a HA elérhetősége után, az első feldolgozáskor
+        if not defer_cycle_data:
+            self._load_cycle_data()
+
+    @property
+    def tech_data(self) -> TechnologicalFeedData:
+        """Aktuális lefordított tech görbe (újratöltés után automatikusan az új)"""
+        return self.tech_curve.curve
+
+    @property
+    def sensor_entity_id(self) -> str:
+        """A ciklus adatokat tároló (dátum) szenzor entity_id-ja"""
+        return f"sensor.{self.sensor_name.lower().replace(' ', '_')}"
+
+    def _cycle_sensor_url(self) -> str:
+        return f"{self.ha_url}/api/states/{self.sensor_entity_id}"
+
+    def _load_cycle_data(self) -> bool:
+        """
+        Ciklus adatok betöltése a HA szenzor attribútumaiból
+
+        Returns:
+            True, ha betöltve (vagy a szenzor még nem létezik); False HA hiba esetén -
+            ilyenkor újra kell próbálni, különben a feldolgozás felülírná a mentett állapotot
+        """
+        try:
+            response = requests.get(self._cycle_sensor_url(), headers=self.headers, timeout=10)
+            return self._apply_cycle_data(response.status_code,
+                                          response.json() if response.status_code == 200 else None)
+        except Exception as e:
+            logger.warning(f"⚠️ [{self.sensor_name}] Ciklus adatok betöltése nem sikerült: {e}")
+            return False
+
+    async def _load_cycle_data_async(self, client: 'AsyncHAClient') -> bool:
+        """_load_cycle_data() asyncio változata"""
+        try:
+            status, data = await client.get_json(self._cycle_sensor_url(), timeout=10)
+            return self._apply_cycle_data(status, data)
+        except Exception as e:
+            logger.warning(f"⚠️ [{self.sensor_name}] Ciklus adatok betöltése nem sikerült: {e}")
+            return False
+
+    def _apply_cycle_data(self, status: int, data: Optional[Dict]) -> bool:
+        """Szenzor lekérés eredményének alkalmazása (_load_cycle_data())"""
+        if status == 200:
+            attributes = (data or {}).get('attributes', {})
+
+            # Ciklus kezdete (0. nap)
+            cycle_start_str = attributes.get('cycle_start_date')
+            if cycle_start_str:
+                self.cycle_start_date = datetime.fromisoformat(cycle_start_str).replace(tzinfo=LOCAL_TZ)
+                logger.info(f"📥 [{self.sensor_name}] Ciklus kezdete betöltve: {self.cycle_start_date.strftime('%Y-%m-%d')}")
+
+            # Madár darabszám
+            self.bird_count = attributes.get('bird_count')
+            if self.bird_count:
+                logger.info(f"📥 [{self.sensor_name}] Madár darabszám betöltve: {self.bird_count}")
+
+            # Rekurzív madárszám becslő állapota
+            self.bird_estimator.load_dict(attributes.get('bird_count_estimator'))
+            if self.bird_estimator.estimate is not None:
+                logger.info(f"📥 [{self.sensor_name}] Madárszám becslő betöltve: {self.bird_estimator.estimate:.0f} "
+                           f"± {self.bird_estimator.std:.0f} ({self.bird_estimator.last_day}. napig)")
+
+            self.restored_empty_timestamp = attributes.get('predicted_empty_timestamp')
+
+        elif status == 404:
+            logger.debug(f"ℹ️ [{self.sensor_name}] Szenzor még nem létezik, nincs ciklus adat")
+
+        else:
+            logger.warning(f"⚠️ [{self.sensor_name}] Ciklus adatok betöltése sikertelen (HTTP {status}), később újra")
+            return False
+
+        self.cycle_data_loaded = True
+        return True
+
+    @property
+    def predicted_empty_at(self) -> Optional[datetime]:
+        """Utolsó ismert várható kiürülés (számolt, vagy a szenzorból visszaállított)"""
+        timestamp = (self.last_prediction or {}).get('predicted_empty_timestamp') or self.restored_empty_timestamp
+        try:
+            return datetime.fromisoformat(timestamp) if timestamp else None
+        except (TypeError, ValueError):
+            return None
+
+    def _save_cycle_data(self, cycle_start_date: datetime, bird_count: int):
+        """Ciklus adatok mentése (0. nap, madár darabszám)"""
+        self.cycle_start_date = cycle_start_date
+        self.bird_count = bird_count
+        logger.info(f"💾 [{self.sensor_name}] Ciklus adatok mentve: "
+                   f"kezdet={cycle_start_date.strftime('%Y-%m-%d')}, madarak={bird_count}")
+
+    def _save_current_slope(self, slope: float, r_squared: float):
+        """Jó minőségű regressziós meredekség mentése (feltöltés utáni azonnali előrejelzéshez)"""
+        self.previous_slope = slope
+        self.previous_r_squared = r_squared
+
+    def _history_request(self, start_time: datetime, end_time: datetime) -> Tuple[str, Dict]:
+        """HA history lekérés URL-je és paraméterei a siló szenzorára"""
+        url = f"{self.ha_url}/api/history/period/{start_time.isoformat()}"
+        params = {
+            'filter_entity_id': self.entity_id,
+            'end_time': end_time.isoformat()
+        }
+        return url, params
+
+    def _history_window(self) -> Tuple[datetime, datetime, datetime]:
+        """
+        Történeti lekérés időablaka (prediction_days nap, lokális időben)
+
+        Returns:
+            (ablak kezdete, vége, lekérés kezdete) - meleg cache esetén csak a cache
+            vége (HISTORY_CACHE_OVERLAP átfedéssel) utáni szakaszt kell lekérni
+        """
+        end_time = self.clock.now()
+        start_time = end_time - timedelta(days=self.prediction_days)
+
+        fetch_start = start_time
+        if (self.cached_raw_data and self._cached_from is not None and self._cached_from <= start_time
+                and self._cached_until - HISTORY_CACHE_OVERLAP > start_time):
+            fetch_start = self._cached_until - HISTORY_CACHE_OVERLAP
+
+        logger.info(f"📊 [{self.sensor_name}] Adatok lekérése: {fetch_start.strftime('%Y-%m-%d %H:%M')} - {end_time.strftime('%Y-%m-%d %H:%M')}"
+                    f"{' (meleg cache)' if fetch_start > start_time else ''}")
+        return start_time, end_time, fetch_start
+
+    def _merge_history(self, fresh: List[Tuple[datetime, float]], window_start: datetime,
+                       end_time: datetime, fetch_start: datetime) -> List[Tuple[datetime, float]]:
+        """
+        Lekért szakasz összefűzése a cache-elt sorral: a cache ablak előtti része
+        elhagyva, az átfedő szakasz a friss adatra cserélve
+
+        Returns:
+            A teljes ablak nyers sora
+        """
+        if fetch_start > window_start:
+            kept = [point for point in self.cached_raw_data if window_start <= point[0] < fetch_start]
+            new = [point for point in fresh if point[0] >= fetch_start]
+            merged = kept + new
+            logger.info(f"♻️ [{self.sensor_name}] Meleg cache: {len(kept)} cache-elt + {len(new)} új adatpont")
+        else:
+            merged = fresh
+
+        self._cached_from = window_start
+        self._cached_until = end_time
+        return merged
+
+    def get_historical_data(self) -> List[Tuple[datetime, float]]:
+        """Történeti adatok lekérése a Home Assistant API-ból (meleg cache esetén csak a hiányzó szakasz)"""
+        window_start, end_time, fetch_start = self._history_window()
+        url, params = self._history_request(fetch_start, end_time)
+
+        try:
+            response = requests.get(url, headers=self.headers, params=params, timeout=30)
+            response.raise_for_status()
+            return self._merge_history(self.parse_history(response.json()), window_start, end_time, fetch_start)
+
+        except requests.RequestException as e:
+            logger.error(f"❌ [{self.sensor_name}] API hiba: {e}")
+            return []
+
+    def parse_history(self, data) -> List[Tuple[datetime, float]]:
+        """
+        HA history válasz feldolgozása: UTC → lokális idő, érvénytelen állapotok
+        kiszűrése, időrendbe rendezés
+
+        Returns:
+            [(timestamp, weight), ...]
+        """
+        if not data or not data[0]:
+            logger.warning(f"❌ [{self.sensor_name}] Nincs adat a válaszban")
+            return []
+
+        processed_data = []
+        for entry in data[0]:
+            try:
+                # HA UTC-ben küldi, konvertáljuk lokálisra
+                timestamp_utc = datetime.fromisoformat(entry['last_changed'].replace('Z', '+00:00'))
+                # Konvertálás lokális időzónára
+                timestamp = timestamp_utc.astimezone(LOCAL_TZ)
+
+                state = entry.get('state', '0')
+                if state in ['unknown', 'unavailable', 'null', None]:
+                    continue
+
+                weight = float(state)
+                if 0 <= weight <= 50000:
+                    processed_data.append((timestamp, weight))
+
+            except (ValueError, KeyError, TypeError):
+                continue
+
+        processed_data.sort(key=lambda x: x[0])
+
+        logger.info(f"✅ [{self.sensor_name}] {len(processed_data)} adatpont betöltve")
+        return processed_data
+
+    def sample_daily_data(self, data: List[Tuple[datetime, float]]) -> List[Tuple[datetime, float]]:
+        """
+        6 ÓRÁNKÉNTI mintavételezés (napi 4 adatpont) - 7:00-kor nap váltás
+
+        Minden 6 órás periódusból (7:00, 13:00, 19:00, 1:00) egy átlagos súlyértéket készít.
+
+        INDOKLÁS:
+        A nevelési ciklus végén a fogyási ráta exponenciálisan növekszik:
+        - 1-2. feltöltés: 7-9 nap
+        - 2-3. feltöltés: 5 nap
+        - 3-4. feltöltés: 4 nap
+        - 4+. feltöltés: 2-3 nap
+
+        Napi 1 adatpont későbbi fázisban pontatlan lenne!
+
+        Args:
+            data: Nyers adatok
+
+        Returns:
+            List of (timestamp, átlag_súly) - 6 óránként
+        """
+        if not data:
+            return []
+
+        # 6 órás időszakokra csoportosítás
+        # Periódusok: 7:00-12:59, 13:00-18:59, 19:00-0:59, 1:00-6:59
+        period_buckets = {}
+
+        for timestamp, weight in data:
+            # Nap kulcs (7:00-os nap váltással)
+            if timestamp.hour < 7:
+                day_key = timestamp.date() - timedelta(days=1)
+            else:
+                day_key = timestamp.date()
+
+            # Periódus meghatározása (0-3: 7:00, 13:00, 19:00, 1:00)
+            if 7 <= timestamp.hour < 13:
+                period = 0  # 7:00-12:59
+            elif 13 <= timestamp.hour < 19:
+                period = 1  # 13:00-18:59
+            elif 19 <= timestamp.hour < 24:
+                period = 2  # 19:00-23:59
+            else:  # 0 <= timestamp.hour < 7
+                period = 3  # 0:00-6:59 (előző nap folytatása)
+
+            period_key = (day_key, period)
+
+            if period_key not in period_buckets:
+                period_buckets[period_key] = []
+
+            period_buckets[period_key].append(weight)
+
+        # Periódus átlagok számítása
+        sampled_data = []
+        for (day_key, period) in sorted(period_buckets.keys()):
+            weights = period_buckets[(day_key, period)]
+            avg_weight = np.mean(weights)
+
+            # Timestamp: a periódus kezdete
+            if period == 0:
+                period_timestamp = datetime.combine(day_key, datetime.min.time()).replace(hour=7, tzinfo=LOCAL_TZ)
+            elif period == 1:
+                period_timestamp = datetime.combine(day_key, datetime.min.time()).replace(hour=13, tzinfo=LOCAL_TZ)
+            elif period == 2:
+                period_timestamp = datetime.combine(day_key, datetime.min.time()).replace(hour=19, tzinfo=LOCAL_TZ)
+            else:  # period == 3
+                # 1:00 (következő nap 1:00-ja, de még az előző naphoz tartozik)
+                period_timestamp = datetime.combine(day_key + timedelta(days=1), datetime.min.time()).replace(hour=1, tzinfo=LOCAL_TZ)
+
+            sampled_data.append((period_timestamp, avg_weight))
+
+        if sampled_data:
+            logger.info(f"📈 [{self.sensor_name}] {len(sampled_data)} adatpont mintavételezve (6 óránként, napi 4 minta) "
+                       f"({sampled_data[0][0].strftime('%Y-%m-%d %H:%M')} - {sampled_data[-1][0].strftime('%Y-%m-%d %H:%M')})")
+
+        return sampled_data
+
+    def build_gap_index(self, data: List[Tuple[datetime, float]]) -> SeriesGapIndex:
+        """
+        Adathiány index készítése a mintavételezett sorhoz (egyszer futásonként)
+
+        Ha a HA vagy a Modbus híd órákig áll, a 6 órás periódusok kimaradnak.
+        A későbbi lépések ezt az indexet használják időalapú kereséshez.
+
+        Args:
+            data: Mintavételezett adatok (6 óránként)
+
+        Returns:
+            SeriesGapIndex
+        """
+        gap_index = SeriesGapIndex.from_series(data)
+
+        if gap_index.gaps:
+            missing_hours = float(np.sum(gap_index.gap_ends - gap_index.gap_starts)) / 3600
+            logger.warning(f"🕳️ [{self.sensor_name}] {len(gap_index.gaps)} adathiány a mintasorban "
+                           f"(>{GAP_THRESHOLD_HOURS:.0f} óra, összesen {missing_hours:.0f} óra)")
+            for gap_start, gap_end in gap_index.gaps:
+                logger.debug(f"   🕳️ {gap_start.strftime('%Y-%m-%d %H:%M')} -> {gap_end.strftime('%Y-%m-%d %H:%M')}")
+
+        return gap_index
+
+    def detect_refills(self, data: List[Tuple[datetime, float]]) -> Tuple[List[Tuple[datetime, float]], Optional[datetime]]:
+        """
+        Feltöltések detektálása és csak az utolsó feltöltés UTÁNI adatok megtartása
+
+        Returns:
+            Tuple: (cleaned_data, last_refill_timestamp)
+                   last_refill_timestamp: None ha nem volt feltöltés, különben az utolsó feltöltés időpontja
+        """
+        if len(data) < 2:
+            return data, None
+
+        last_refill_index = -1
+        last_refill_timestamp = None
+
+        for i in range(1, len(data)):
+            prev_weight = data[i-1][1]
+            curr_weight = data[i][1]
+            weight_change = curr_weight - prev_weight
+
+            if weight_change > 3000:
+                logger.info(f"🔄 [{self.sensor_name}] Feltöltés detektálva: {data[i-1][0]} -> {data[i][0]}, "
+                           f"Súlyváltozás: +{weight_change:.0f}kg")
+                last_refill_index = i
+                last_refill_timestamp = data[i][0]
+
+        if last_refill_index >= 0:
+            cleaned_data = data[last_refill_index:]
+            logger.info(f"✅ [{self.sensor_name}] Utolsó feltöltés után: {len(cleaned_data)} adatpont ({data[last_refill_index][0]})")
+        else:
+            cleaned_data = data
+            logger.info(f"✅ [{self.sensor_name}] Nem volt feltöltés, {len(cleaned_data)} adatpont használva")
+
+        return cleaned_data, last_refill_timestamp
+
+    def detect_cycle_start(self, data: List[Tuple[datetime, float]]) -> Optional[datetime]:
+        """
+        0. nap detektálása: INTELLIGENS első feltöltés detektálás + 100kg+ súlycsökkenés napja
+
+        Logika (KÉTLÉPCSŐS):
+        1. ELSŐDLEGES: Keresünk ~5 napos "csend" periódust (előző ciklus vége):
+           - Siló súlya < 1000 kg
+           - Nincs jelentős fogyasztás (< 50 kg/nap)
+           - Ezt követő 3000kg+ ugrás = ELSŐ FELTÖLTÉS (új ciklus kezdete)
+        2. FALLBACK: Ha nincs csend periódus, keresünk nagy (10000kg+) feltöltést
+           - Ez valószínűleg ciklus kezdő feltöltés
+        3. Utána keressük az első 100kg+ csökkenést egy nap alatt
+        4. Ez lesz a 0. nap (állomány érkezése)
+
+        Args:
+            data: Mintavételezett adatok (6 óránként)
+
+        Returns:
+            0. nap dátuma vagy None
+        """
+        if len(data) < 7:  # Minimum 7 nap adat kell
+            return None
+
+        # 1. ELSŐDLEGES: Csend periódus + első feltöltés keresése (kernel)
+        # Előző 5 minta: súly <= 1000 kg és szomszédos változás <= 50 kg, majd 3000kg+ ugrás
+        first_refill_index = int(silence_refill_index(np.array([w for _, w in data], dtype=float),
+                                                      5, 1000.0, 50.0, 3000.0))
+
+        if first_refill_index >= 0:
+            i = first_refill_index
+            weight_change = data[i][1] - data[i-1][1]
+            logger.info(f"📍 [{self.sensor_name}] Csend periódus detektálva: "
+                       f"{data[i-5][0].strftime('%Y-%m-%d')} - {data[i-1][0].strftime('%Y-%m-%d')} "
+                       f"(súly < 1000 kg, nincs fogyasztás)")
+            logger.info(f"📍 [{self.sensor_name}] ELSŐ FELTÖLTÉS (csend után): {data[i][0].strftime('%Y-%m-%d')}, "
+                       f"+{weight_change:.0f} kg → súly: {data[i][1]:.0f} kg")
+
+        # 2. FALLBACK: Ha nincs csend periódus, keresünk nagy (5000kg+) feltöltést
+        if first_refill_index < 0:
+            logger.info(f"🔍 [{self.sensor_name}] Csend periódus nem található, alternatív módszer: nagy feltöltés keresése...")
 
             for i in range(1, len(data)):
                 weight_change = data[i][1] - data[i-1][1]
@@ -506,77 +2129,64 @@ class SiloPredictor:
 
         return continuous_data
 
-    def calculate_daily_bird_count(self, continuous_data: List[Tuple[datetime, float, int, float]]) -> Dict[int, int]:
+    def update_bird_estimator(self, continuous_data: List[Tuple[datetime, float, int, float]],
+                              gap_index: Optional[SeriesGapIndex] = None) -> Optional[Tuple[int, float]]:
         """
-        Madár darabszám kalkuláció naponta - 6 ÓRÁNKÉNTI MINTÁK ALAPJÁN
-
-        FONTOS LOGIKA:
-        - NAPI összesített fogyasztást számolunk (4x6óra = 24óra)
-        - Csak a 7:00-as adatpontokat használjuk összehasonlításra
-        - Mai 7:00 súly - Tegnapi 7:00 súly = TEGNAPI fogyasztás
-        - Tegnapi tech adatot használjuk (mert az a nap fogyott)
+        Rekurzív madárszám becslő frissítése az új lezárt napokkal
 
-        Args:
-            continuous_data: [(timestamp, normalized_weight, day_in_cycle, exact_day), ...]
-                             6 óránkénti adatok
+        Új ciklus (eltérő 0. nap) esetén a becslő újraindul. A már beépített
+        napokat nem dolgozzuk fel újra: a napi tábla csak az utolsó beépített
+        nap utáni 7:00-as párokból készül.
 
         Returns:
-            {day: bird_count}
+            (madárszám, szórás) vagy None, ha még nincs becslés
         """
-        if not continuous_data or len(continuous_data) < 8:  # Minimum 2 nap x 4 adatpont kell
-            return {}
-
-        bird_counts = {}
-
-        # Csak 7:00-as adatpontokat szűrjük ki
-        daily_7am_data = [(ts, w, day, exact) for ts, w, day, exact in continuous_data if ts.hour == 7]
-
-        if len(daily_7am_data) < 2:
-            logger.warning(f"⚠️ [{self.sensor_name}] Nincs elég 7:00-as adatpont a madár számhoz ({len(daily_7am_data)})")
-            return {}
-
-        # Minden napra: előző 7:00 - jelenlegi 7:00 = ELŐZŐ NAP fogyasztása
-        for i in range(1, len(daily_7am_data)):
-            prev_timestamp, prev_weight, prev_day, _ = daily_7am_data[i-1]
-            curr_timestamp, curr_weight, curr_day, _ = daily_7am_data[i]
-
-            # Napi fogyasztás (ez az ELŐZŐ NAP fogyasztása!)
-            daily_consumption_kg = prev_weight - curr_weight
-
-            if daily_consumption_kg < 0:  # Negatív fogyasztás (hibás adat vagy feltöltés maradt)
-                logger.debug(f"⚠️ [{self.sensor_name}] {prev_day}. nap: negatív fogyasztás ({daily_consumption_kg:.1f} kg), kihagyva")
-                continue
-
-            if daily_consumption_kg < 10:  # Túl kicsi fogyasztás (< 10 kg/nap)
-                logger.debug(f"⚠️ [{self.sensor_name}] {prev_day}. nap: túl kicsi fogyasztás ({daily_consumption_kg:.1f} kg), kihagyva")
-                continue
-
-            # FONTOS: ELŐZŐ NAP tech adatát használjuk (mert az a nap fogyott!)
-            expected_per_bird_g = self.tech_data.get_daily_intake_per_bird(prev_day)
-
-            if expected_per_bird_g <= 0:
-                logger.debug(f"⚠️ [{self.sensor_name}] {prev_day}. nap: nincs tech adat (0 g/madár)")
-                continue
+        cycle_start = self.cycle_start_date.isoformat() if self.cycle_start_date else None
+        if self.bird_estimator.cycle_start != cycle_start:
+            if self.bird_estimator.estimate is not None:
+                logger.info(f"🔄 [{self.sensor_name}] Új ciklus → madárszám becslő újraindítva")
+            self.bird_estimator.reset(cycle_start)
+
+        if continuous_data:
+            new_days = DailyConsumptionTable.build(continuous_data, self.tech_data, gap_index,
+                                                   after_day=self.bird_estimator.last_day)
+            if new_days.skipped_pairs > 0:
+                logger.debug(f"🕳️ [{self.sensor_name}] {new_days.skipped_pairs} napi 7:00 különbség kihagyva "
+                            f"(hiányzó nap / adathiány)")
+            added = self.bird_estimator.update_from_table(new_days)
+            if added:
+                logger.info(f"🐔 [{self.sensor_name}] Madárszám becslő: +{added} nap → "
+                           f"{self.bird_estimator.estimate:.0f} ± {self.bird_estimator.std:.0f} "
+                           f"({self.bird_estimator.last_day}. napig)")
+
+        if self.bird_estimator.estimate is None:
+            return None
+        return int(round(self.bird_estimator.estimate)), self.bird_estimator.std
 
-            # Madár darabszám kalkuláció
-            actual_consumption_g = daily_consumption_kg * 1000
-            bird_count = int(actual_consumption_g / expected_per_bird_g)
+    def estimate_birds_subdaily(self, continuous_data: List[Tuple[datetime, float, int, float]],
+                                gap_index: Optional[SeriesGapIndex] = None) -> Optional[Tuple[int, float]]:
+        """
+        Madárszám becslés mind a 4 időszakból (napszakos fogyasztási arányokkal)
 
-            # ELŐZŐ NAPHOZ rendeljük!
-            bird_counts[prev_day] = bird_count
+        Nem kell hozzá két teljes nap: már a 0. nap első időszakai után ad
+        becslést (amíg a rekurzív becslőnek nincs lezárt napja).
 
-            logger.debug(f"📊 [{self.sensor_name}] {prev_day}. nap: {daily_consumption_kg:.1f} kg fogyasztás, "
-                        f"{expected_per_bird_g:.1f} g/madár → {bird_count} madár")
+        Returns:
+            (madárszám, szórás) vagy None
+        """
+        table = BucketConsumptionTable.build(continuous_data, self.tech_data, gap_index)
+        result = table.bird_count()
 
-        if bird_counts:
-            avg_birds = int(np.mean(list(bird_counts.values())))
-            logger.info(f"🐔 [{self.sensor_name}] Madár darabszám: {min(bird_counts.values())}-{max(bird_counts.values())} "
-                       f"(átlag: {avg_birds})")
+        if result:
+            shares = ', '.join(f"{h}:00={share:.2f}" for h, share in zip(BUCKET_START_HOURS, table.shares))
+            logger.info(f"🐔 [{self.sensor_name}] Madárszám (6 órás időszakok, {int(np.sum(table.valid))} db): "
+                       f"{result[0]} ± {result[1]:.0f} (napszakos arány {table.share_days} napból: {shares})")
 
-        return bird_counts
+        return result
 
     def calculate_correction_factor(self, continuous_data: List[Tuple[datetime, float, int, float]],
-                                    bird_counts: Dict[int, int]) -> float:
+                                    bird_counts: Dict[int, int],
+                                    gap_index: Optional[SeriesGapIndex] = None) -> float:
         """
         Korrekciós szorzó számítása: valós fogyás vs. technológiai fogyás aránya
 
@@ -586,6 +2196,7 @@ class SiloPredictor:
         Args:
             continuous_data: Normalizált adatok (6 óránként)
             bird_counts: Napi madár darabszámok
+            gap_index: Adathiány index (ha None, itt készül)
 
         Returns:
             correction_factor:
@@ -596,45 +2207,9 @@ class SiloPredictor:
         if not continuous_data or not bird_counts or len(continuous_data) < 2:
             return 1.0  # Alapértelmezett: nincs korrekció
 
-        total_actual_consumption = 0.0
-        total_expected_consumption = 0.0
-
-        # Csak 7:00-as adatpontokat használunk napi összehasonlításhoz
-        daily_7am_data = [(ts, w, day, exact) for ts, w, day, exact in continuous_data if ts.hour == 7]
-
-        # Végigmegyünk minden napon, ahol van bird_count
-        for i in range(1, len(daily_7am_data)):
-            prev_timestamp, prev_weight, prev_day, _ = daily_7am_data[i-1]
-            curr_timestamp, curr_weight, curr_day, _ = daily_7am_data[i]
-
-            # Csak azokat a napokat nézzük, ahol van madár szám
-            if prev_day not in bird_counts:
-                continue
-
-            # Valós fogyasztás (mért)
-            actual_consumption_kg = prev_weight - curr_weight
-
-            if actual_consumption_kg < 0:  # Hibás adat
-                continue
-
-            # Várható fogyasztás (tech adat)
-            bird_count = bird_counts[prev_day]
-            expected_per_bird_g = self.tech_data.get_daily_intake_per_bird(prev_day)
-
-            if expected_per_bird_g <= 0:
-                continue
-
-            expected_consumption_kg = (expected_per_bird_g * bird_count) / 1000.0
-
-            # Hozzáadjuk az összegekhez
-            total_actual_consumption += actual_consumption_kg
-            total_expected_consumption += expected_consumption_kg
-
-        # Korrekciós szorzó számítása
-        if total_expected_consumption > 0:
-            correction_factor = total_actual_consumption / total_expected_consumption
-        else:
-            correction_factor = 1.0  # Alapértelmezett
+        # Napi fogyasztási tábla: valós (mért) vs. várható (tech × madárszám) fogyasztás összege
+        table = DailyConsumptionTable.build(continuous_data, self.tech_data, gap_index)
+        correction_factor, total_actual_consumption, total_expected_consumption = table.correction_factor(bird_counts)
 
         logger.info(f"📐 [{self.sensor_name}] Korrekciós szorzó: {correction_factor:.3f} "
                    f"(valós: {total_actual_consumption:.0f} kg, várható: {total_expected_consumption:.0f} kg)")
@@ -643,17 +2218,23 @@ class SiloPredictor:
 
     def calculate_prediction_with_tech_data(self, continuous_data: List[Tuple[datetime, float, int, float]],
                                            bird_counts: Dict[int, int],
-                                           current_real_weight: float) -> Optional[Dict]:
+                                           current_real_weight: float,
+                                           iterative: bool = False) -> Optional[Dict]:
         """
         Előrejelzés készítése technológiai adatok alapján
 
         FONTOS: A normalizált görbe csak a madár darabszám és korrekciós szorzó számításához
         használatos! Az előrejelzés a JELENLEGI VALÓS SÚLYBÓL indul!
 
+        A kiürülési időt zárt alakban számoljuk: tech prefix összeg × madárszám × korrekció,
+        majd a 0 kg metszés vektorizált kereséssel. Az óránkénti szimuláció
+        (iterative=True) referencia / ellenőrző módként megmaradt.
+
         Args:
             continuous_data: Normalizált adatok (timestamp, weight, day, exact_day) - CSAK analízishez! (6 óránként)
             bird_counts: Napi madár darabszámok
             current_real_weight: VALÓS jelenlegi súly (nem normalizált!)
+            iterative: Óránkénti referencia szimuláció használata
 
         Returns:
             Prediction dictionary vagy None
@@ -688,42 +2269,25 @@ class SiloPredictor:
         # Korrekciós szorzó számítása (valós vs. tech fogyás)
         correction_factor = self.calculate_correction_factor(continuous_data, bird_counts)
 
-        # Iteratív szimuláció: VALÓS jelenlegi súlyból indulunk!
+        # VALÓS jelenlegi súlyból indulunk!
         weight = current_real_weight
-        day = current_day
-        hours_elapsed = 0
         max_days = 100  # Maximum 100 nap előrejelzés
 
         logger.info(f"🎯 [{self.sensor_name}] Előrejelzés indítása: "
-                   f"valós súly={weight:.0f} kg, {day}. nap")
-
-        while weight > 0 and day < current_day + max_days:
-            # Várható napi fogyasztás (1 madár, tech adat)
-            expected_per_bird_g = self.tech_data.get_daily_intake_per_bird(day)
-
-            # Teljes állomány napi fogyasztása (tech szerint)
-            total_daily_kg = (expected_per_bird_g * avg_bird_count) / 1000.0
-
-            # KORREKCIÓ: valós vs. tech arány alapján
-            corrected_daily_kg = total_daily_kg * correction_factor
+                   f"valós súly={weight:.0f} kg, {current_day}. nap")
 
-            # Óránkénti fogyasztás (korrigált)
-            hourly_kg = corrected_daily_kg / 24.0
-
-            # Súly csökkentése (1 óra)
-            weight -= hourly_kg
-            hours_elapsed += 1
-
-            # Nap váltás minden 24 órában
-            if hours_elapsed % 24 == 0:
-                day += 1
-
-            # Debug log minden 7 napban
-            if hours_elapsed % (24 * 7) == 0:
-                logger.debug(f"   {hours_elapsed}h ({day}. nap): súly={weight:.0f} kg, "
-                           f"tech={total_daily_kg:.1f} kg/nap, korrigált={corrected_daily_kg:.1f} kg/nap")
-
-        prediction_datetime = datetime.now(LOCAL_TZ) + timedelta(hours=hours_elapsed)
+        if iterative:
+            hours_elapsed = self._simulate_tech_hourly(weight, current_day, avg_bird_count,
+                                                       correction_factor, max_days)
+        else:
+            # Kumulatív fogyás egész napos csomópontokban: tech prefix összeg × madárszám × korrekció
+            day_nodes = current_day + np.arange(max_days + 1)
+            cumulative_kg = (self.tech_data.cumulative_intake_between(current_day, day_nodes)
+                             * avg_bird_count * correction_factor / 1000.0)
+            days_to_empty = solve_empty_days(weight, cumulative_kg)
+            hours_elapsed = max_days * 24.0 if np.isnan(days_to_empty) else float(days_to_empty) * 24.0
+
+        prediction_datetime = self.clock.now() + timedelta(hours=hours_elapsed)
         days_until = hours_elapsed / 24.0
 
         # Formázott dátum időablakkal
@@ -744,6 +2308,20 @@ class SiloPredictor:
             'tech_data_used': True
         }
 
+    def _simulate_tech_hourly(self, weight: float, current_day: int, bird_count: int,
+                              correction_factor: float, max_days: int) -> int:
+        """
+        Óránkénti referencia szimuláció (tech × korrekció) - ellenőrző mód
+
+        Returns:
+            Órák száma a 0 kg-ig (vagy a horizont végéig)
+        """
+        # Napi óránkénti fogyás (tech × madárszám × korrekció / 24), majd óránkénti kernel
+        tech_g = self.tech_data.get_daily_intake_bulk(np.arange(current_day, current_day + max_days))
+        hourly_kg = (tech_g * bird_count) / 1000.0 * correction_factor / 24.0
+
+        return int(hourly_depletion_hours(float(weight), hourly_kg))
+
     def resample_5min(self, start_time: datetime, end_time: datetime) -> List[Tuple[datetime, float]]:
         """
         5 perces mintavételezés CSAK feltöltés detektáláshoz
@@ -757,11 +2335,7 @@ class SiloPredictor:
         Returns:
             [(timestamp, weight), ...] 5 percenként
         """
-        url = f"{self.ha_url}/api/history/period/{start_time.isoformat()}"
-        params = {
-            'filter_entity_id': self.entity_id,
-            'end_time': end_time.isoformat()
-        }
+        url, params = self._history_request(start_time, end_time)
 
         try:
             response = requests.get(url, headers=self.headers, params=params, timeout=30)
@@ -771,6 +2345,11 @@ class SiloPredictor:
             logger.error(f"❌ [{self.sensor_name}] 5min resample API hiba: {e}")
             return []
 
+        return self.resample_5min_history(history, start_time, end_time)
+
+    @staticmethod
+    def resample_5min_history(history, start_time: datetime, end_time: datetime) -> List[Tuple[datetime, float]]:
+        """5 perces mintavételezés egy már lekért HA history válaszból (resample_5min())"""
         if not history or len(history) == 0:
             return []
 
@@ -852,18 +2431,24 @@ class SiloPredictor:
         # Feltöltés folyamatban
         return True, None
 
-    def check_active_refill(self) -> Tuple[bool, Optional[datetime], Optional[float]]:
+    def check_active_refill(self, data_5min: Optional[List[Tuple[datetime, float]]] = None
+                            ) -> Tuple[bool, Optional[datetime], Optional[float]]:
         """
         Ellenőrzi, hogy most folyik-e aktív feltöltés (5 perces mintavételezéssel)
 
+        Args:
+            data_5min: Már lekért utolsó 30 perc 5 perces mintái (asyncio mód);
+                       None esetén itt kérjük le
+
         Returns:
             (is_refilling, refill_end_time, current_weight)
         """
-        now = datetime.now(LOCAL_TZ)
-        start_time = now - timedelta(minutes=30)  # Utolsó 30 perc
+        if data_5min is None:
+            now = self.clock.now()
+            start_time = now - timedelta(minutes=30)  # Utolsó 30 perc
 
-        # 5 perces mintavételezés
-        data_5min = self.resample_5min(start_time, now)
+            # 5 perces mintavételezés
+            data_5min = self.resample_5min(start_time, now)
 
         if not data_5min:
             return False, None, None
@@ -883,15 +2468,25 @@ class SiloPredictor:
 
         return False, None, current_weight
 
-    def calculate_exp_constant(self, normalized_curve: List[Tuple[datetime, float]]) -> Tuple[float, float, float]:
+    def calculate_exp_constant(self, normalized_curve: List[Tuple[datetime, float]],
+                               gap_index: Optional[SeriesGapIndex] = None) -> Tuple[float, float, float]:
         """
         Exponenciális állandó számítása normalizált görbéből
 
-        24 órás ablakokból (4x6h adatpont) napi fogyási rátákat számol,
-        majd lineáris regresszióval meghatározza a gyorsulást.
+        24 órás ablakokból napi fogyási rátákat számol, majd lineáris
+        regresszióval meghatározza a gyorsulást. A 24 órával korábbi mintát
+        időalapon keressük (nem i-4 indexként), adathiányon átívelő
+        különbségek kizárva.
+
+        A regresszió futó összegekből (RegressionAccumulator) frissül: minden
+        periódus EGYSZER kerül be, a sor elejéről kieső pontok kikerülnek.
+        A sor utolsó, még gyűlő periódusa NEM kerül be (értéke a következő
+        futásig változhat); csak a következő minta megjelenésekor, lezártként.
+        Ha az utoljára feldolgozott periódus eltűnik a sorból, újraépítés.
 
         Args:
             normalized_curve: [(timestamp, normalized_weight), ...] 6 óránként
+            gap_index: Adathiány index (ha None, itt készül)
 
         Returns:
             (exp_constant, base_rate, acceleration)
@@ -900,52 +2495,95 @@ class SiloPredictor:
             logger.warning(f"❌ [{self.sensor_name}] Exp állandó: kevés adat ({len(normalized_curve)} pont)")
             return 0.0, 0.0, 0.0
 
-        # Napi fogyási ráták számítása 24 órás ablakokból
-        daily_rates = []
-        days = []
-
-        for i in range(4, len(normalized_curve)):  # 4 pont = 24 óra
-            prev_time, prev_weight = normalized_curve[i-4]
-            curr_time, curr_weight = normalized_curve[i]
-
-            # Napi fogyás (lehet negatív a normalizált görbében!)
-            daily_consumption = prev_weight - curr_weight
-            if daily_consumption < 0:
-                daily_consumption = abs(daily_consumption)
-
-            # Csak értelmes fogyásokat vegyük figyelembe
-            if daily_consumption > 10:  # Min 10 kg/nap
-                daily_rates.append(daily_consumption)
-                days.append(i / 4.0)  # Nap index (4 adatpont = 1 nap)
-
-        if len(daily_rates) < 3:
-            logger.warning(f"⚠️ [{self.sensor_name}] Exp állandó: kevés napi adat ({len(daily_rates)})")
+        if gap_index is None:
+            gap_index = SeriesGapIndex.from_series(normalized_curve)
+
+        weights = np.array([w for _, w in normalized_curve], dtype=float)
+        epoch = gap_index.epoch
+        accumulator = self._exp_accumulator
+
+        # Ha az utoljára feldolgozott periódus már nincs a sorban (újraindulás, új sor) → újraépítés
+        if self._exp_last_epoch is not None and gap_index.lookup(self._exp_last_epoch) < 0:
+            logger.info(f"♻️ [{self.sensor_name}] Exp regresszió akkumulátor újraépítése")
+            self._exp_accumulator = accumulator = RegressionAccumulator()
+            self._exp_points.clear()
+            self._exp_origin = None
+            self._exp_last_epoch = None
+
+        if self._exp_origin is None:
+            self._exp_origin = float(epoch[0])
+
+        # Csak a LEZÁRT (nem az utolsó, még gyűlő) és még fel nem dolgozott periódusok
+        last_epoch = self._exp_last_epoch if self._exp_last_epoch is not None else -np.inf
+        new_idx = np.nonzero(epoch[:-1] > last_epoch)[0]
+
+        if len(new_idx):
+            # 24 órával korábbi minta (bináris keresés időbélyeg szerint)
+            prev_idx = gap_index.lookup(epoch[new_idx] - 86400)
+            has_prev = prev_idx >= 0
+            prev_idx = np.where(has_prev, prev_idx, 0)
+
+            # Napi fogyás (lehet negatív a normalizált görbében → abszolút érték)
+            daily_consumption = np.abs(weights[prev_idx] - weights[new_idx])
+
+            # Érvényes: van 24 órás pár, nem ível át adathiányon, értelmes fogyás (min 10 kg/nap)
+            valid = has_prev & ~gap_index.spans_gap(epoch[prev_idx], epoch[new_idx]) & (daily_consumption > 10)
+
+            # Nap = valós eltelt idő a rögzített origótól
+            x_new = (epoch[new_idx][valid] - self._exp_origin) / 86400
+            y_new = daily_consumption[valid]
+            accumulator.add(x_new, y_new)
+            self._exp_points.extend(zip(epoch[new_idx][valid], x_new, y_new))
+            self._exp_last_epoch = float(epoch[new_idx[-1]])
+
+        # Csúszó ablak: a sorból kiesett (24 órás párja már nincs meg) pontok eltávolítása
+        window_start = epoch[0] + 86400 - 60
+        while self._exp_points and self._exp_points[0][0] < window_start:
+            _, x_old, y_old = self._exp_points.popleft()
+            accumulator.remove(x_old, y_old)
+
+        if accumulator.n < 3:
+            logger.warning(f"⚠️ [{self.sensor_name}] Exp állandó: kevés napi adat ({int(accumulator.n)})")
             return 0.0, 0.0, 0.0
 
-        # Lineáris regresszió: fogyási ráta változása az időben
-        rates_array = np.array(daily_rates)
-        days_array = np.array(days)
+        # Lineáris regresszió O(1)-ben a futó összegekből
+        fit = accumulator.fit()
+        if fit is None:
+            return 0.0, 0.0, 0.0
 
-        slope, intercept, r_value, _, _ = stats.linregress(days_array, rates_array)
+        slope = fit['slope']
 
         # Exponenciális állandó = gyorsulás / átlag ráta
-        avg_rate = np.mean(rates_array)
+        avg_rate = fit['y_mean']
         exp_constant = slope / avg_rate if avg_rate > 0 else 0.0
 
+        # Bizonytalansági adatok a Monte Carlo intervallumhoz
+        self.exp_fit_stats = {
+            'n': int(accumulator.n),
+            'slope': float(slope),
+            'slope_stderr': float(fit['stderr']),
+            'r_value': float(fit['rvalue']),
+            'rate_mean': float(avg_rate),
+            'rate_stderr': float(fit['y_std'] / np.sqrt(accumulator.n))
+        }
+
         logger.info(f"📈 [{self.sensor_name}] Exp állandó: {exp_constant:.6f}, "
                    f"alap ráta: {avg_rate:.1f} kg/nap, gyorsulás: {slope:.2f} kg/nap²")
 
         return exp_constant, avg_rate, slope
 
     def predict_with_tech_and_exp(self, current_real_weight: float, cycle_start: datetime,
-                                   bird_count: int, base_rate: float, acceleration: float) -> Tuple[datetime, float]:
+                                   bird_count: int, base_rate: float, acceleration: float,
+                                   iterative: bool = False) -> Tuple[datetime, float]:
         """
         ELSŐDLEGES: Tech adat + Exponenciális predikció (VAN 0. nap)
 
-        Iteratív szimuláció:
+        Zárt alakú megoldás:
         - Tech napi fogyasztás (madárszám × tech g/nap)
         - Exponenciális korrekció (gyorsulás figyelembevételével)
         - Valós jelenlegi súlyból indul
+        - A horizont kumulatív fogyásgörbéjén vektorizált 0 kg keresés, napon belüli
+          interpolációval (perc pontosság az 1 órás kvantálás helyett)
 
         Args:
             current_real_weight: Jelenlegi valós súly (kg)
@@ -953,89 +2591,277 @@ class SiloPredictor:
             bird_count: Madárszám
             base_rate: Alap fogyási ráta (kg/nap)
             acceleration: Gyorsulás (kg/nap²)
+            iterative: Óránkénti referencia szimuláció (ellenőrző mód)
+
+        Returns:
+            (prediction_datetime, days_until)
+        """
+        weight = current_real_weight
+        current_time = self.clock.now()
+
+        # Jelenlegi nevelési nap
+        current_day = (current_time - cycle_start).days
+        max_days = 60  # Max 60 nap előre
+
+        logger.info(f"🎯 [{self.sensor_name}] Tech+Exp predikció: súly={weight:.0f} kg, "
+                   f"nap={current_day}, madár={bird_count:,}")
+
+        if iterative:
+            self.last_forecast_cumulative = None
+            hours = self._simulate_tech_and_exp_hourly(weight, current_day, bird_count,
+                                                       base_rate, acceleration, max_days)
+        else:
+            daily_kg = self._tech_exp_daily_kg(current_day, bird_count, base_rate, acceleration, max_days)
+            self.last_forecast_cumulative = cumulative_consumption(daily_kg)
+            days_to_empty = solve_empty_days(weight, self.last_forecast_cumulative)
+            hours = max_days * 24.0 if np.isnan(days_to_empty) else float(days_to_empty) * 24.0
+
+        prediction_time = current_time + timedelta(hours=hours)
+        days_until = hours / 24.0
+
+        logger.info(f"📅 [{self.sensor_name}] Tech+Exp: {prediction_time.strftime('%b %d, %H:%M')} "
+                   f"({days_until:.1f} nap)")
+
+        return prediction_time, days_until
+
+    def _tech_exp_daily_kg(self, current_day: int, bird_count: int, base_rate: float,
+                           acceleration: float, horizon_days: int) -> np.ndarray:
+        """
+        Tech+Exp modell napi fogyasztása a horizonton (kg/nap, a mostantól számított napokra)
+
+        D[k] = tech(current_day + k) × madárszám × (base_rate + gyorsulás × k) / base_rate
+        """
+        return tech_exp_daily_kg(self.tech_data, current_day, bird_count, base_rate, acceleration, horizon_days)
+
+    def _simulate_tech_and_exp_hourly(self, weight: float, current_day: int, bird_count: int,
+                                      base_rate: float, acceleration: float, max_days: int) -> int:
+        """
+        Óránkénti referencia szimuláció (Tech+Exp) - ellenőrző mód
+
+        Returns:
+            Órák száma a 0 kg-ig (vagy a horizont végéig)
+        """
+        # Napi óránkénti fogyás (tech × madárszám × exp szorzó / 24), majd óránkénti kernel
+        days_elapsed = np.arange(max_days)
+        tech_daily_kg = (self.tech_data.get_daily_intake_bulk(current_day + days_elapsed) * bird_count) / 1000.0
+        exp_factor = (base_rate + (acceleration * days_elapsed)) / base_rate if base_rate > 0 else 1.0
+        hourly_kg = (tech_daily_kg * exp_factor) / 24.0
+
+        return int(hourly_depletion_hours(float(weight), hourly_kg))
+
+    def run_scenarios(self, **overrides) -> Optional[Dict[str, np.ndarray]]:
+        """
+        "Mi lenne, ha" forgatókönyvek az utolsó Tech+Exp futás állapotából
+
+        Példa: silo.run_scenarios(bird_count=silo.model_state['bird_count'] * np.array([0.95, 1.0, 1.05]))
+
+        Args:
+            **overrides: ScenarioEngine.evaluate paraméterei (skalár vagy tömb);
+                         a meg nem adottak az utolsó futás értékei
+
+        Returns:
+            ScenarioEngine.evaluate eredménye + 'predicted_empty_timestamp' lista, vagy None
+        """
+        if not self.model_state:
+            logger.warning(f"⚠️ [{self.sensor_name}] Nincs Tech+Exp modell állapot a forgatókönyvekhez")
+            return None
+
+        params = {key: value for key, value in self.model_state.items() if key != 'computed_at'}
+        params.update(overrides)
+
+        results = ScenarioEngine(self.tech_data).evaluate(**params)
+
+        computed_at = self.model_state['computed_at']
+        results['predicted_empty_timestamp'] = [
+            (computed_at + timedelta(days=float(days))).isoformat() if not np.isnan(days) else None
+            for days in np.ravel(results['days_until_empty'])
+        ]
+
+        logger.info(f"🔮 [{self.sensor_name}] {np.size(results['days_until_empty'])} forgatókönyv kiértékelve")
+        return results
+
+    def build_model_inputs(self, raw_data: List[Tuple[datetime, float]],
+                           daily_data: List[Tuple[datetime, float]],
+                           base_rate: float, acceleration: float,
+                           bird_count: Optional[int] = None) -> ModelInputs:
+        """Közös modell bemenet a futás már előkészített adataiból (egyszer, minden modellhez)"""
+        now = self.clock.now()
+        return ModelInputs(
+            now=now,
+            current_weight=raw_data[-1][1],
+            raw_epoch=np.array([t.timestamp() for t, _ in raw_data], dtype=float),
+            raw_weight=np.array([w for _, w in raw_data], dtype=float),
+            samples=daily_data,
+            base_rate=base_rate,
+            acceleration=acceleration,
+            current_day=(now - self.cycle_start_date).days if self.cycle_start_date else None,
+            bird_count=bird_count
+        )
+
+    def run_model_ensemble(self, inputs: ModelInputs) -> Optional[Dict]:
+        """
+        Az összes regisztrált modell futtatása ugyanazon a bemeneten + súlyozott ensemble
+
+        A modellek egymás után futnak (rövid NumPy hívások; a párhuzamosságot a
+        manager munkaszál-készlete adja silók között), a napi fogyasztási görbét adó
+        modellek kiürülési idejét egyetlen vektorizált kereséssel oldjuk meg.
+        Hibás / eredmény nélküli modell nem akasztja meg a többit.
 
         Returns:
-            (prediction_datetime, days_until)
+            Dict: days_until_empty, predicted_empty, spread_days és modellenkénti
+            eredmények ('models'), vagy None ha egyik modell sem adott eredményt
         """
-        weight = current_real_weight
-        current_time = datetime.now(LOCAL_TZ)
+        started = time.perf_counter()
+        models = PREDICTION_MODELS.items()
 
-        # Jelenlegi nevelési nap
-        current_day = (current_time - cycle_start).days
+        def run_one(func):
+            try:
+                return func(self, inputs)
+            except Exception as e:
+                logger.warning(f"⚠️ [{self.sensor_name}] Modell hiba ({func.__name__}): {e}")
+                return None
+
+        outputs = [run_one(func) for _, (func, _) in models]
+
+        # Görbe modellek: egy batch keresés
+        curve_idx = [i for i, out in enumerate(outputs) if out and 'daily_kg' in out]
+        days = np.full(len(models), np.nan)
+        if curve_idx:
+            stacked = np.stack([outputs[i]['daily_kg'] for i in curve_idx])
+            days[curve_idx] = solve_empty_days(inputs.current_weight, cumulative_consumption(stacked))
+        for i, out in enumerate(outputs):
+            if out and 'days_until_empty' in out:
+                days[i] = out['days_until_empty']
+
+        weights = np.array([weight for _, (_, weight) in models], dtype=float)
+        usable = np.isfinite(days) & (days >= 0)
+
+        results = {}
+        for i, (name, _) in enumerate(models):
+            if usable[i]:
+                results[name] = {
+                    'days_until_empty': round(float(days[i]), 2),
+                    'predicted_empty': (inputs.now + timedelta(days=float(days[i]))).isoformat(),
+                    'weight': float(weights[i]),
+                    'status': 'ok'
+                }
+            else:
+                results[name] = {'days_until_empty': None, 'predicted_empty': None, 'weight': float(weights[i]),
+                                 'status': 'no_result' if outputs[i] is None else 'not_empty_within_horizon'}
 
-        hours = 0
-        day = current_day
-        max_days = 60  # Max 60 nap előre
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not np.any(usable):
+            logger.warning(f"⚠️ [{self.sensor_name}] Ensemble: egyik modell sem adott eredményt ({elapsed_ms:.0f} ms)")
+            return None
 
-        logger.info(f"🎯 [{self.sensor_name}] Tech+Exp predikció: súly={weight:.0f} kg, "
-                   f"nap={day}, madár={bird_count:,}")
+        w = weights[usable] / weights[usable].sum()
+        ensemble_days = float(np.sum(w * days[usable]))
+        spread_days = float(np.sqrt(np.sum(w * (days[usable] - ensemble_days) ** 2)))
 
-        while weight > 0 and day < current_day + max_days:
-            # Tech adat: g/madár/nap
-            tech_per_bird_g = self.tech_data.get_daily_intake_per_bird(day)
-            tech_daily_kg = (tech_per_bird_g * bird_count) / 1000.0
+        summary = ', '.join(f"{name}={r['days_until_empty']}" for name, r in results.items() if r['status'] == 'ok')
+        logger.info(f"🧩 [{self.sensor_name}] Ensemble ({int(np.sum(usable))}/{len(models)} modell, {elapsed_ms:.0f} ms): "
+                   f"{ensemble_days:.2f} ± {spread_days:.2f} nap ({summary})")
 
-            # Exponenciális korrekció
-            days_elapsed = day - current_day
-            current_rate = base_rate + (acceleration * days_elapsed)
-            exp_factor = current_rate / base_rate if base_rate > 0 else 1.0
+        return {
+            'days_until_empty': round(ensemble_days, 2),
+            'predicted_empty': (inputs.now + timedelta(days=ensemble_days)).isoformat(),
+            'spread_days': round(spread_days, 2),
+            'models': results
+        }
 
-            # Korrigált napi fogyás
-            actual_daily_kg = tech_daily_kg * exp_factor
+    def calculate_prediction_intervals(self, bird_count_std: float,
+                                       n_samples: int = MONTE_CARLO_SAMPLES,
+                                       seed: Optional[int] = None) -> Optional[Dict]:
+        """
+        Monte Carlo predikciós intervallum a kiürülési időre (P10 / P50 / P90)
 
-            # Óránkénti fogyás
-            hourly_kg = actual_daily_kg / 24.0
-            weight -= hourly_kg
-            hours += 1
+        A paramétereket a megfigyelt szórásukból mintavételezzük, és az összes
+        pályát egyetlen tömbszámítással szimuláljuk (ScenarioEngine):
+        - madárszám: a becslés (rekurzív vagy 6 órás) és szórása
+        - gyorsulás / alap ráta: calculate_exp_constant regressziós standard hibái
 
-            if hours % 24 == 0:
-                day += 1
+        A korrekciós szorzó fix 1.0: a madárszám a napi fogyasztás / tech arányból
+        készül, így szórása már tartalmazza a napi mérések ingadozását. Egy külön,
+        ugyanebből a szórásból mintavételezett szorzó ugyanazt a bizonytalanságot
+        kétszer számolná (~√2-szer szélesebb intervallum).
 
-        prediction_time = current_time + timedelta(hours=hours)
-        days_until = hours / 24.0
+        Args:
+            bird_count_std: Madárszám becslés szórása
+            n_samples: Pályák száma
+            seed: Véletlenszám mag (reprodukálható futáshoz)
 
-        logger.info(f"📅 [{self.sensor_name}] Tech+Exp: {prediction_time.strftime('%b %d, %H:%M')} "
-                   f"({days_until:.1f} nap)")
+        Returns:
+            Dict P10/P50/P90 időbélyegekkel és napokkal, vagy None
+        """
+        if not self.model_state or not self.exp_fit_stats or bird_count_std is None:
+            return None
 
-        return prediction_time, days_until
+        started = time.perf_counter()
+        rng = np.random.default_rng(seed)
+        state = self.model_state
+        engine = ScenarioEngine(self.tech_data)
+
+        bird_samples = np.clip(rng.normal(state['bird_count'], bird_count_std, n_samples), 1.0, None)
+        acceleration_samples = rng.normal(state['acceleration'], self.exp_fit_stats['slope_stderr'], n_samples)
+        base_rate_samples = np.clip(rng.normal(state['base_rate'], self.exp_fit_stats['rate_stderr'], n_samples), 1.0, None)
+
+        results = engine.evaluate(state['current_weight'], state['current_day'], bird_samples,
+                                  base_rate_samples, acceleration_samples, state['correction_factor'])
+
+        # Horizonton túli pályák a horizont végére kerülnek (felső becslés)
+        days = np.where(results['empties_within_horizon'], results['days_until_empty'], float(engine.horizon_days))
+        p10, p50, p90 = np.percentile(days, [10, 50, 90])
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"🎲 [{self.sensor_name}] Monte Carlo ({n_samples} pálya, {elapsed_ms:.0f} ms): "
+                   f"P10={p10:.2f}, P50={p50:.2f}, P90={p90:.2f} nap")
+
+        computed_at = state['computed_at']
+        return {
+            'empty_p10': (computed_at + timedelta(days=float(p10))).isoformat(),
+            'empty_p50': (computed_at + timedelta(days=float(p50))).isoformat(),
+            'empty_p90': (computed_at + timedelta(days=float(p90))).isoformat(),
+            'days_until_empty_p10': round(float(p10), 2),
+            'days_until_empty_p50': round(float(p50), 2),
+            'days_until_empty_p90': round(float(p90), 2)
+        }
 
     def predict_with_exp_only(self, current_real_weight: float, normalized_curve: List[Tuple[datetime, float]],
-                               base_rate: float, acceleration: float) -> Tuple[datetime, float]:
+                               base_rate: float, acceleration: float,
+                               iterative: bool = False) -> Tuple[datetime, float]:
         """
         FALLBACK: Csak exponenciális predikció (NINCS 0. nap)
 
-        Gyorsuló lineáris extrapoláció a történelmi adatokból.
+        Gyorsuló lineáris extrapoláció a történelmi adatokból: a k. napon
+        base_rate + k × gyorsulás kg/nap. Zárt alakú (másodfokú) megoldás a
+        napi lépcsős rátaváltással; az óránkénti ciklus (iterative=True)
+        referencia / ellenőrző módként megmaradt.
 
         Args:
             current_real_weight: Jelenlegi valós súly (kg)
             normalized_curve: Normalizált görbe
             base_rate: Alap fogyási ráta (kg/nap)
             acceleration: Gyorsulás (kg/nap²)
+            iterative: Óránkénti referencia szimuláció
 
         Returns:
             (prediction_datetime, days_until)
         """
         weight = current_real_weight
-        current_time = datetime.now(LOCAL_TZ)
-
-        hours = 0
-        current_rate = base_rate
+        current_time = self.clock.now()
         max_days = 60
 
         logger.info(f"🎯 [{self.sensor_name}] Exp-only predikció: súly={weight:.0f} kg, "
                    f"ráta={base_rate:.1f} kg/nap, gyorsulás={acceleration:.2f}")
 
-        while weight > 0 and hours < (max_days * 24):
-            # Napi fogyás (gyorsuló)
-            daily_kg = current_rate
-            hourly_kg = daily_kg / 24.0
-
-            weight -= hourly_kg
-            hours += 1
-
-            # Naponta növeljük a rátát a gyorsulással
-            if hours % 24 == 0:
-                current_rate += acceleration
+        if iterative:
+            self.last_forecast_cumulative = None
+            hours = self._simulate_exp_only_hourly(weight, base_rate, acceleration, max_days)
+        else:
+            days_to_empty = solve_arithmetic_depletion(weight, base_rate, acceleration, max_days)
+            hours = max_days * 24.0 if days_to_empty is None else days_to_empty * 24.0
+            # Ugyanaz a modell egész napos csomópontokban (súlygörbe attribútumhoz)
+            self.last_forecast_cumulative = cumulative_consumption(base_rate + acceleration * np.arange(max_days))
 
         prediction_time = current_time + timedelta(hours=hours)
         days_until = hours / 24.0
@@ -1045,6 +2871,20 @@ class SiloPredictor:
 
         return prediction_time, days_until
 
+    def _simulate_exp_only_hourly(self, weight: float, base_rate: float, acceleration: float,
+                                  max_days: int) -> int:
+        """
+        Óránkénti referencia szimuláció (Exp-only) - ellenőrző mód
+
+        Returns:
+            Órák száma a 0 kg-ig (vagy a horizont végéig)
+        """
+        # Napi ráta lépésenkénti gyorsulással (ismételt összeadás, mint a ciklusban), majd óránkénti kernel
+        daily_rates = np.cumsum(np.concatenate(([base_rate], np.full(max_days - 1, acceleration))))
+        hourly_kg = daily_rates / 24.0
+
+        return int(hourly_depletion_hours(float(weight), hourly_kg))
+
     def calculate_prediction_exponential_fallback(self, data: List[Tuple[datetime, float]]) -> Optional[Dict]:
         """
         FALLBACK MÓDSZER: Exponenciális regressziós előrejelzés
@@ -1091,8 +2931,13 @@ class SiloPredictor:
         weights = np.array([w for _, w in cleaned_data])
 
         # Lineáris illesztés
-        slope, intercept, r_value, p_value, std_err = stats.linregress(timestamps, weights)
-        r_squared = r_value ** 2
+        fit = RegressionAccumulator.from_arrays(timestamps, weights).fit()
+        if fit is None:
+            logger.warning(f"❌ [{self.sensor_name}] Exponenciális fallback: regresszió nem számolható")
+            return None
+
+        slope = fit['slope']
+        r_squared = fit['rvalue'] ** 2
 
         logger.info(f"📉 [{self.sensor_name}] Lineáris regresszió: "
                    f"meredekség={slope:.2f} kg/óra, R²={r_squared:.3f}")
@@ -1113,7 +2958,7 @@ class SiloPredictor:
             logger.warning(f"⚠️ [{self.sensor_name}] Exponenciális fallback: negatív előrejelzés")
             return None
 
-        prediction_datetime = datetime.now(LOCAL_TZ) + timedelta(hours=hours_until_empty)
+        prediction_datetime = self.clock.now() + timedelta(hours=hours_until_empty)
         days_until = hours_until_empty / 24.0
 
         # Formázott dátum
@@ -1141,7 +2986,7 @@ class SiloPredictor:
         """
         Előrejelzés készítése lineáris regresszióval (opcionális növekedési korrekcióval)
 
-        ⚠️ EZ A RÉGI MÓDSZER - MOSTANTÓL NEM HASZNÁLT!
+        A modell ensemble 'linear' modellje (model_linear) futtatja minden feldolgozáskor.
 
         Args:
             data: Súly adatok (timestamp, weight) párok
@@ -1153,7 +2998,7 @@ class SiloPredictor:
 
         # Ellenőrizzük, hogy éppen most van-e feltöltés (utolsó 15 percben)
         if last_refill_time:
-            time_since_refill = (datetime.now(LOCAL_TZ) - last_refill_time).total_seconds() / 3600
+            time_since_refill = (self.clock.now() - last_refill_time).total_seconds() / 3600
             if time_since_refill < 0.25:  # 15 perc = 0.25 óra
                 minutes_since = int(time_since_refill * 60)
                 logger.info(f"🔄 [{self.sensor_name}] Feltöltés folyamatban ({minutes_since} perce)")
@@ -1209,8 +3054,13 @@ class SiloPredictor:
             logger.info(f"📉 [{self.sensor_name}] Előző ciklus slope használata: meredekség={slope:.2f} kg/óra, R²={r_squared:.4f}")
         else:
             # Normál regresszió
-            slope, intercept, r_value, p_value, std_err = stats.linregress(hours, weights)
-            r_squared = r_value ** 2
+            fit = RegressionAccumulator.from_arrays(hours, weights).fit()
+            if fit is None:
+                logger.warning(f"⚠️ [{self.sensor_name}] Regresszió nem számolható (azonos időpontok)")
+                return None
+
+            slope, intercept = fit['slope'], fit['intercept']
+            r_squared = fit['rvalue'] ** 2
 
             # Mentjük el a slope-ot a következő ciklushoz
             if r_squared > 0.7:  # Csak jó minőségű slope-ot mentünk
@@ -1246,8 +3096,11 @@ class SiloPredictor:
 
         # Növekedési korrekció alkalmazása
         if self.enable_growth_correction:
+            animal_age_days = self.animal_age_days
+            if self.cycle_start_date:
+                animal_age_days = (self.clock.now() - self.cycle_start_date).total_seconds() / 86400
             hours_from_now = self._calculate_with_growth_correction(
-                current_weight, slope, current_hours, self.animal_age_days
+                current_weight, slope, current_hours, animal_age_days
             )
             logger.info(f"🌱 [{self.sensor_name}] Növekedési korrekció alkalmazva: {hours_from_now:.1f} óra")
         else:
@@ -1282,7 +3135,7 @@ class SiloPredictor:
             }
 
         # Előrejelzés lokális időben
-        prediction_datetime = datetime.now(LOCAL_TZ) + timedelta(hours=hours_from_now)
+        prediction_datetime = self.clock.now() + timedelta(hours=hours_from_now)
 
         # Formázott dátum időablakkal (±1 óra)
         formatted_date, window_midpoint_hours = self._format_prediction_with_window(prediction_datetime)
@@ -1295,6 +3148,7 @@ class SiloPredictor:
 
         return {
             'prediction_date': formatted_date,
+            'predicted_empty_timestamp': prediction_datetime.isoformat(),
             'days_until_empty': round(days_until_midpoint, 2),
             'slope': round(slope, 2),
             'r_squared': round(r_squared, 4),
@@ -1322,7 +3176,7 @@ class SiloPredictor:
             Tuple: (formatted_string, hours_until_midpoint)
                    hours_until_midpoint: Órák száma az időablak közepéig
         """
-        now = datetime.now(LOCAL_TZ)
+        now = self.clock.now()
 
         # ±1 óra ablak számítása
         window_start_dt = prediction_datetime - timedelta(hours=1)
@@ -1388,59 +3242,57 @@ class SiloPredictor:
 
     def _calculate_with_growth_correction(self, current_weight: float, base_slope: float,
                                           current_hours: float, animal_age_days: float,
-                                          step_hours: int = 3) -> float:
+                                          step_hours: int = 3, iterative: bool = False) -> float:
         """
-        Növekedési korrekciós számítás - iteratív megoldás
+        Növekedési korrekciós számítás
 
         A növekvő takarmányfogyasztás miatt a siló gyorsabban ürül, mint amit a lineáris regresszió mutat.
 
+        A j. lépésben a fogyás step × (g × (életkor + j·step/24) - meredekség), vagyis
+        lépésenként lineárisan nő → zárt alakú (másodfokú) megoldás, tört órára pontosan.
+        A lépésenkénti szimuláció (iterative=True) referencia / ellenőrző mód.
+
         Args:
             current_weight: Jelenlegi súly (kg)
             base_slope: Lineáris regresszió meredeksége (kg/óra) - NEGATÍV!
             current_hours: Eltelt órák száma a mérési kezdet óta
             animal_age_days: Állatok jelenlegi életkora napokban
             step_hours: Szimulációs lépésköz órákban (alapértelmezett: 3)
+            iterative: Lépésenkénti referencia szimuláció
 
         Returns:
             Hátralévő órák száma a 0 kg eléréséig
         """
-        # Iteratív számítás - 3 órás lépésekkel
-        weight = current_weight
-        hours_elapsed = 0
         max_iterations = 10000 // step_hours  # Maximum ~416 nap (3 órás lépésekkel)
+        growth_rate = self.growth_rate_kg_per_hour_per_day
+
+        if not iterative:
+            first_step = step_hours * (growth_rate * animal_age_days - base_slope)
+            step_increment = step_hours * growth_rate * step_hours / 24.0
+            steps = solve_arithmetic_depletion(current_weight, first_step, step_increment, max_iterations)
 
-        # Jelenlegi nap
-        current_day = animal_age_days
+            if steps is None:
+                logger.warning(f"⚠️ [{self.sensor_name}] Növekedési korrekció: horizonton belül nem ürül ki "
+                               f"({max_iterations * step_hours} óra)")
+                return float(max_iterations * step_hours)
 
-        logger.info(f"🧮 [{self.sensor_name}] Növekedési szimulációs számítás indítása...")
+            hours_elapsed = steps * step_hours
+            logger.info(f"✅ [{self.sensor_name}] Növekedési korrekció (zárt alak): {hours_elapsed:.1f} óra "
+                       f"({hours_elapsed/24:.1f} nap)")
+            return hours_elapsed
+
+        # Lépésenkénti számítás (kernel) - 3 órás lépésekkel
+        logger.info(f"🧮 [{self.sensor_name}] Növekedési szimulációs számítás indítása ({KERNEL_BACKEND})...")
         logger.info(f"   Kezdeti súly: {current_weight:.1f} kg")
         logger.info(f"   Alapmeredekség: {base_slope:.4f} kg/óra")
         logger.info(f"   Állat életkor: {animal_age_days:.1f} nap")
         logger.info(f"   Szimulációs lépésköz: {step_hours} óra")
 
-        iteration = 0
-        while weight > 0 and iteration < max_iterations:
-            # Aktuális nap (az állatokéhoz képest)
-            day_in_cycle = current_day + (hours_elapsed / 24.0)
-
-            # Növekedési korrekció az aktuális napra
-            growth_adjustment = self.growth_rate_kg_per_hour_per_day * day_in_cycle
-
-            # Teljes óránkénti fogyás (negatív, ezért a growth_adjustment CSÖKKENTI)
-            hourly_consumption = base_slope - growth_adjustment
+        iterations = int(growth_depletion_steps(float(current_weight), float(base_slope), float(growth_rate),
+                                                float(animal_age_days), int(step_hours), int(max_iterations)))
+        hours_elapsed = iterations * step_hours
 
-            # Súly csökkentése (step_hours órányira)
-            weight += hourly_consumption * step_hours
-
-            hours_elapsed += step_hours
-            iteration += 1
-
-            # Debug log minden 100 iterációnként (~300 óra)
-            if iteration % 100 == 0:
-                logger.debug(f"   {hours_elapsed}h: súly={weight:.1f} kg, "
-                           f"napi_pozíció={day_in_cycle:.1f}, korrekció={growth_adjustment:.6f} kg/óra")
-
-        if iteration >= max_iterations:
+        if iterations >= max_iterations:
             logger.warning(f"⚠️ [{self.sensor_name}] Szimulációs limit elérve ({max_iterations} iteráció)")
             return hours_elapsed
 
@@ -1450,17 +3302,39 @@ class SiloPredictor:
 
     def update_sensor(self, prediction_data: Dict):
         """Home Assistant szenzor frissítése"""
+        with self._publish_lock:
+            self._post_sensors(prediction_data)
+
+    def _post_sensors(self, prediction_data: Dict):
+        """Szenzorok elküldése (a hívó tartja a _publish_lock-ot)"""
+        results = [self._post_sensor(entity_id, state, attributes)
+                   for entity_id, state, attributes in self.build_sensor_payloads(prediction_data)]
+        if results and all(results):
+            self.last_published_at = self.clock.time()
+
+    def build_sensor_payloads(self, prediction_data: Dict) -> List[Tuple[str, str, Dict]]:
+        """
+        Szenzor állapotok összeállítása (HA hívás nélkül - a küldés szinkron vagy asyncio módban történik)
+
+        Returns:
+            [(entity_id, state, attributes), ...]
+        """
         if not prediction_data:
             logger.warning(f"❌ [{self.sensor_name}] Nincs előrejelzési adat a szenzor frissítéshez")
-            return
-
-        self._update_date_sensor(prediction_data)
-        self._update_time_remaining_sensor(prediction_data)
-        self._update_bird_count_sensor(prediction_data)
-        self._update_last_updated_sensor()
+            return []
 
-    def _update_date_sensor(self, prediction_data: Dict):
-        """Dátum szenzor frissítése (mikor lesz 0 kg)"""
+        payloads = [
+            self._date_sensor_payload(prediction_data),
+            self._time_remaining_sensor_payload(prediction_data),
+            self._bird_count_sensor_payload(prediction_data)
+        ]
+        if prediction_data.get('ensemble'):
+            payloads.append(self._ensemble_sensor_payload(prediction_data['ensemble']))
+        payloads.append(self._last_updated_sensor_payload())
+        return payloads
+
+    def _date_sensor_payload(self, prediction_data: Dict) -> Tuple[str, str, Dict]:
+        """Dátum szenzor (mikor lesz 0 kg)"""
         sensor_entity_id = f"sensor.{self.sensor_name.lower().replace(' ', '_')}"
 
         prediction_date = prediction_data.get('prediction_date')
@@ -1477,6 +3351,10 @@ class SiloPredictor:
         attributes = {
             'prediction_date': prediction_date,
             'predicted_empty_timestamp': prediction_data.get('predicted_empty_timestamp'),
+            'predicted_empty_p10': prediction_data.get('empty_p10'),
+            'predicted_empty_p50': prediction_data.get('empty_p50'),
+            'predicted_empty_p90': prediction_data.get('empty_p90'),
+            'forecast_trajectory': prediction_data.get('forecast_trajectory'),
             'days_until_empty': prediction_data.get('days_until_empty'),
             'current_weight_kg': prediction_data.get('current_weight'),
             'bird_count': prediction_data.get('bird_count'),
@@ -1487,13 +3365,19 @@ class SiloPredictor:
             'icon': 'mdi:silo',
             # Ciklus adatok mentése
             'cycle_start_date': self.cycle_start_date.isoformat() if self.cycle_start_date else None,
-            'tech_data_used': prediction_data.get('tech_data_used', False)
+            'tech_data_used': prediction_data.get('tech_data_used', False),
+            'tech_curve': self.tech_curve_name,
+            'bird_count_estimator': self.bird_estimator.to_dict(),
+            'last_refill_event': self.last_refill_event,
+            # Extrapolált előrejelzés (elavulás figyelés): 'stale' csak elmaradt frissítésnél
+            'stale': prediction_data.get('stale', False),
+            'extrapolated_from': prediction_data.get('extrapolated_from')
         }
 
-        self._post_sensor(sensor_entity_id, state, attributes)
+        return sensor_entity_id, state, attributes
 
-    def _update_time_remaining_sensor(self, prediction_data: Dict):
-        """Hátralévő idő szenzor frissítése (X nap Y óra formátum)"""
+    def _time_remaining_sensor_payload(self, prediction_data: Dict) -> Tuple[str, str, Dict]:
+        """Hátralévő idő szenzor (X nap Y óra formátum)"""
         time_sensor_entity_id = f"sensor.{self.sensor_name.lower().replace(' ', '_')}_time_remaining"
 
         days_until = prediction_data.get('days_until_empty')
@@ -1515,14 +3399,15 @@ class SiloPredictor:
             'hours': int((days_until - int(days_until)) * 24) if days_until is not None else None,
             'total_hours': round(days_until * 24, 1) if days_until is not None else None,
             'status': status,
+            'stale': prediction_data.get('stale', False),
             'friendly_name': f"{self.sensor_name} - Hátralévő Idő",
             'icon': 'mdi:timer-sand'
         }
 
-        self._post_sensor(time_sensor_entity_id, state, attributes)
+        return time_sensor_entity_id, state, attributes
 
-    def _update_bird_count_sensor(self, prediction_data: Dict):
-        """Madár darabszám szenzor frissítése"""
+    def _bird_count_sensor_payload(self, prediction_data: Dict) -> Tuple[str, str, Dict]:
+        """Madár darabszám szenzor"""
         bird_count_entity_id = f"sensor.{self.sensor_name.lower().replace(' ', '_')}_bird_count"
 
         bird_count = prediction_data.get('bird_count')
@@ -1535,20 +3420,37 @@ class SiloPredictor:
 
         attributes = {
             'bird_count': bird_count,
+            'bird_count_std': prediction_data.get('bird_count_std'),
+            'bird_count_source': prediction_data.get('bird_count_source'),
             'day_in_cycle': day_in_cycle,
             'unit_of_measurement': 'madár',
             'friendly_name': f"{self.sensor_name} - Madár Darabszám",
             'icon': 'mdi:bird'
         }
 
-        self._post_sensor(bird_count_entity_id, state, attributes)
+        return bird_count_entity_id, state, attributes
 
-    def _update_last_updated_sensor(self):
+    def _ensemble_sensor_payload(self, ensemble: Dict) -> Tuple[str, str, Dict]:
+        """Modell ensemble szenzor (súlyozott kiürülési idő + modellenkénti eredmények)"""
+        ensemble_entity_id = f"sensor.{self.sensor_name.lower().replace(' ', '_')}_ensemble"
+
+        attributes = {
+            'days_until_empty': ensemble.get('days_until_empty'),
+            'spread_days': ensemble.get('spread_days'),
+            'models': ensemble.get('models'),
+            'device_class': 'timestamp',
+            'friendly_name': f"{self.sensor_name} - Modell Ensemble",
+            'icon': 'mdi:chart-multiple'
+        }
+
+        return ensemble_entity_id, ensemble.get('predicted_empty') or "unknown", attributes
+
+    def _last_updated_sensor_payload(self) -> Tuple[str, str, Dict]:
         """Utolsó frissítés időpontja szenzor"""
         last_updated_entity_id = f"sensor.{self.sensor_name.lower().replace(' ', '_')}_last_updated"
 
         # Aktuális idő lokális időzónában
-        now = datetime.now(LOCAL_TZ)
+        now = self.clock.now()
 
         # Formázott időbélyeg
         timestamp = now.strftime('%Y-%m-%d %H:%M:%S')
@@ -1559,9 +3461,9 @@ class SiloPredictor:
             'icon': 'mdi:clock-check-outline'
         }
 
-        self._post_sensor(last_updated_entity_id, timestamp, attributes)
+        return last_updated_entity_id, timestamp, attributes
 
-    def _post_sensor(self, entity_id: str, state: str, attributes: Dict):
+    def _post_sensor(self, entity_id: str, state: str, attributes: Dict) -> bool:
         """Közös metódus szenzor adatok POST-olásához"""
         url = f"{self.ha_url}/api/states/{entity_id}"
         payload = {
@@ -1573,10 +3475,103 @@ class SiloPredictor:
             response = requests.post(url, headers=self.headers, json=payload, timeout=10)
             response.raise_for_status()
             logger.info(f"✅ [{self.sensor_name}] Szenzor frissítve: {entity_id} = {state}")
+            return True
         except requests.RequestException as e:
             logger.error(f"❌ [{self.sensor_name}] Szenzor frissítési hiba ({entity_id}): {e}")
             if hasattr(e, 'response') and hasattr(e.response, 'text'):
                 logger.error(f"Válasz: {e.response.text}")
+            return False
+
+    async def _post_sensor_async(self, client: 'AsyncHAClient', entity_id: str, state: str, attributes: Dict) -> bool:
+        """_post_sensor() asyncio változata"""
+        url = f"{self.ha_url}/api/states/{entity_id}"
+        try:
+            await client.post_json(url, {'state': state, 'attributes': attributes})
+            logger.info(f"✅ [{self.sensor_name}] Szenzor frissítve: {entity_id} = {state}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ [{self.sensor_name}] Szenzor frissítési hiba ({entity_id}): {e}")
+            return False
+
+    async def update_sensor_async(self, client: 'AsyncHAClient', prediction_data: Dict):
+        """update_sensor() asyncio változata (a szenzorok párhuzamosan kerülnek elküldésre)"""
+        async with self._publish_lock_async:
+            await self._post_sensors_async(client, prediction_data)
+
+    async def _post_sensors_async(self, client: 'AsyncHAClient', prediction_data: Dict):
+        """_post_sensors() asyncio változata (a hívó tartja a _publish_lock_async-ot)"""
+        results = await asyncio.gather(*(self._post_sensor_async(client, entity_id, state, attributes)
+                                         for entity_id, state, attributes in self.build_sensor_payloads(prediction_data)))
+        if results and all(results):
+            self.last_published_at = self.clock.time()
+
+    async def process_async(self, client: 'AsyncHAClient', executor):
+        """
+        process() asyncio változata: a HA lekérések és szenzor POST-ok nem blokkolnak,
+        a NumPy számolás (compute_prediction) az executorban fut
+        """
+        try:
+            logger.info(f"🔄 [{self.sensor_name}] Feldolgozás indítása...")
+
+            # 0. Mentett ciklus állapot (az első feldolgozásnál / korábbi HA hiba után)
+            if not self.cycle_data_loaded and not await self._load_cycle_data_async(client):
+                logger.warning(f"⚠️ [{self.sensor_name}] Ciklus adatok nélkül nem dolgozunk fel (felülírnánk) → később újra")
+                return
+
+            # 1. Adatok lekérése (45 nap, meleg cache esetén csak a hiányzó szakasz)
+            #    + aktív feltöltés ablak (utolsó 30 perc) egyszerre
+            window_start, end_time, fetch_start = self._history_window()
+            refill_start = end_time - timedelta(minutes=30)
+            (status, history), (refill_status, refill_history) = await asyncio.gather(
+                client.get_json(*self._history_request(fetch_start, end_time), timeout=30),
+                client.get_json(*self._history_request(refill_start, end_time), timeout=30)
+            )
+
+            if status != 200:
+                logger.error(f"❌ [{self.sensor_name}] API hiba: HTTP {status}")
+                return
+            raw_data = self._merge_history(self.parse_history(history), window_start, end_time, fetch_start)
+
+            if not raw_data:
+                logger.warning(f"⚠️ [{self.sensor_name}] Nincs adat")
+                return
+
+            # Nyers sor cache-elése (újraszámoláshoz HA lekérés nélkül, pl. tech görbe frissítés után)
+            self.cached_raw_data = raw_data
+
+            # 2. AKTÍV FELTÖLTÉS ELLENŐRZÉS (5 perces mintavételezéssel)
+            data_5min = self.resample_5min_history(refill_history if refill_status == 200 else None,
+                                                   refill_start, end_time)
+            is_refilling, refill_end, current_weight = self.check_active_refill(data_5min)
+            self.refill_in_progress = is_refilling
+
+            if is_refilling:
+                await self.update_sensor_async(client, self._refilling_prediction(current_weight))
+                logger.info(f"✅ [{self.sensor_name}] Feltöltés alatt szenzor frissítve")
+                return
+
+        except Exception as e:
+            logger.error(f"❌ [{self.sensor_name}] Hiba a feldolgozás során: {e}", exc_info=True)
+            return
+
+        await self._compute_and_publish_async(client, executor, raw_data)
+
+    async def recompute_async(self, client: 'AsyncHAClient', executor) -> bool:
+        """recompute_from_cache() asyncio változata"""
+        if not self.cached_raw_data:
+            logger.info(f"ℹ️ [{self.sensor_name}] Nincs cache-elt adat az újraszámoláshoz")
+            return False
+
+        logger.info(f"♻️ [{self.sensor_name}] Újraszámolás cache-elt adatokból ({len(self.cached_raw_data)} adatpont)")
+        await self._compute_and_publish_async(client, executor, self.cached_raw_data)
+        return True
+
+    async def _compute_and_publish_async(self, client: 'AsyncHAClient', executor, raw_data: List[Tuple[datetime, float]]):
+        """Előrejelzés az executorban (nem blokkolja az event loop-ot), majd szenzor frissítés"""
+        prediction = await asyncio.get_running_loop().run_in_executor(executor, self.compute_prediction, raw_data)
+        if prediction:
+            await self.update_sensor_async(client, prediction)
+            logger.info(f"✅ [{self.sensor_name}] Feldolgozás sikeres")
 
     def process(self):
         """
@@ -1597,6 +3592,11 @@ class SiloPredictor:
         try:
             logger.info(f"🔄 [{self.sensor_name}] Feldolgozás indítása...")
 
+            # 0. Mentett ciklus állapot (az első feldolgozásnál / korábbi HA hiba után)
+            if not self.cycle_data_loaded and not self._load_cycle_data():
+                logger.warning(f"⚠️ [{self.sensor_name}] Ciklus adatok nélkül nem dolgozunk fel (felülírnánk) → később újra")
+                return
+
             # 1. Adatok lekérése (45 nap)
             raw_data = self.get_historical_data()
 
@@ -1604,23 +3604,165 @@ class SiloPredictor:
                 logger.warning(f"⚠️ [{self.sensor_name}] Nincs adat")
                 return
 
+            # Nyers sor cache-elése (újraszámoláshoz HA lekérés nélkül, pl. tech görbe frissítés után)
+            self.cached_raw_data = raw_data
+
             # 2. AKTÍV FELTÖLTÉS ELLENŐRZÉS (5 perces mintavételezéssel)
             is_refilling, refill_end, current_weight = self.check_active_refill()
+            self.refill_in_progress = is_refilling
 
             if is_refilling:
                 # Feltöltés alatt szenzor frissítése
-                refilling_data = {
-                    'prediction_date': 'Feltöltés alatt',
-                    'days_until_empty': None,
-                    'current_weight': current_weight,
-                    'bird_count': self.bird_count,
-                    'day_in_cycle': None,
-                    'status': 'refilling'
-                }
-                self.update_sensor(refilling_data)
+                self.update_sensor(self._refilling_prediction(current_weight))
                 logger.info(f"✅ [{self.sensor_name}] Feltöltés alatt szenzor frissítve")
                 return
 
+        except Exception as e:
+            logger.error(f"❌ [{self.sensor_name}] Hiba a feldolgozás során: {e}", exc_info=True)
+            return
+
+        self._process_raw_data(raw_data)
+
+    def recompute_from_cache(self) -> bool:
+        """
+        Újraszámolás a cache-elt nyers sorból (HA history lekérés nélkül)
+
+        Pl. tech görbe újratöltése után: az előrejelzés az új görbével frissül.
+
+        Returns:
+            True ha volt cache-elt sor és lefutott a feldolgozás
+        """
+        if not self.cached_raw_data:
+            logger.info(f"ℹ️ [{self.sensor_name}] Nincs cache-elt adat az újraszámoláshoz")
+            return False
+
+        logger.info(f"♻️ [{self.sensor_name}] Újraszámolás cache-elt adatokból ({len(self.cached_raw_data)} adatpont)")
+        self._process_raw_data(self.cached_raw_data)
+        return True
+
+    def stale_prediction(self, stale: bool = True) -> Optional[Dict]:
+        """
+        Az utolsó sikeres előrejelzés extrapolálva a mostani időpontra (HA hívás nélkül)
+
+        A kiürülés időpontja változatlan, a hátralévő idő / nevelési nap a mostani
+        időhöz, a súly és a súlygörbe az előrejelzett súlygörbéhez igazodik. A P10-P90
+        intervallum kimarad (az előrejelzés idejére szólt).
+
+        Args:
+            stale: Elmaradt frissítés ('stale' jelölés); False → csak extrapolált
+
+        Returns:
+            Szenzor frissítéshez kész előrejelzés, vagy None (nincs korábbi előrejelzés)
+        """
+        if not self.last_prediction or self.last_prediction_at is None:
+            return None
+
+        now = self.clock.now()
+        prediction = {key: value for key, value in self.last_prediction.items()
+                      if key != 'ensemble' and not key.startswith(('empty_p', 'days_until_empty_p'))}
+
+        trajectory = prediction.get('forecast_trajectory')
+        if trajectory and trajectory.get('offset_h'):
+            elapsed_hours = (now - self.last_prediction_at).total_seconds() / 3600
+            prediction['current_weight'] = round(float(np.interp(elapsed_hours, trajectory['offset_h'],
+                                                                 trajectory['weight_kg'])), 0)
+            prediction['forecast_trajectory'] = shift_forecast_trajectory(trajectory, elapsed_hours)
+
+        empty_at = self.predicted_empty_at
+        if empty_at is not None:
+            prediction['prediction_date'], window_midpoint_hours = self._format_prediction_with_window(empty_at)
+            prediction['days_until_empty'] = round(max(window_midpoint_hours, 0.0) / 24.0, 2)
+
+        if prediction.get('day_in_cycle') is not None and self.cycle_start_date:
+            prediction['day_in_cycle'] = (now - self.cycle_start_date).days
+
+        prediction['stale'] = stale
+        prediction['extrapolated_from'] = self.last_prediction_at.isoformat()
+        return prediction
+
+    def _stale_prediction_to_publish(self, stale_before: float, stale: bool) -> Optional[Dict]:
+        """Közzéteendő extrapolált előrejelzés (a _publish_lock alatt, közvetlenül a POST előtt hívandó)"""
+        if self.last_published_at is not None and self.last_published_at >= stale_before:
+            return None  # Közben friss előrejelzés került ki
+        if self.last_prediction_at is not None and self.last_prediction_at.timestamp() >= stale_before:
+            return None  # Közben friss előrejelzés készült (a közzététele folyamatban / sikertelen)
+        if self.refill_in_progress:
+            return None  # Feltöltés alatt az utolsó (feltöltés előtti) előrejelzés nem érvényes
+
+        prediction = self.stale_prediction(stale)
+        if prediction is None:
+            logger.warning(f"⚠️ [{self.sensor_name}] Nincs korábbi előrejelzés, extrapolált állapot nem közölhető")
+        return prediction
+
+    def _log_stale_published(self, prediction: Dict):
+        label = "Elavult" if prediction['stale'] else "Extrapolált"
+        logger.info(f"🕰️ [{self.sensor_name}] {label} előrejelzés közzétéve "
+                   f"({prediction['extrapolated_from']} állapot extrapolálva)")
+
+    def publish_stale(self, stale_before: float, stale: bool = True) -> bool:
+        """
+        Extrapolált előrejelzés közzététele, ha stale_before óta nem volt sikeres
+        szenzor frissítés (határidő túllépés / sikertelen futás / elavulás figyelés)
+
+        Args:
+            stale_before: Ennél korábbi utolsó közzétételnél frissítünk (epoch s)
+            stale: Elmaradt frissítés ('stale' jelölés); False → csak extrapolált
+
+        Returns:
+            True ha a szenzorok frissültek
+        """
+        with self._publish_lock:
+            prediction = self._stale_prediction_to_publish(stale_before, stale)
+            if prediction is None:
+                return False
+            self._post_sensors(prediction)
+
+        self._log_stale_published(prediction)
+        return True
+
+    async def publish_stale_async(self, client: 'AsyncHAClient', stale_before: float, stale: bool = True) -> bool:
+        """publish_stale() asyncio változata"""
+        async with self._publish_lock_async:
+            prediction = self._stale_prediction_to_publish(stale_before, stale)
+            if prediction is None:
+                return False
+            await self._post_sensors_async(client, prediction)
+
+        self._log_stale_published(prediction)
+        return True
+
+    def _refilling_prediction(self, current_weight: Optional[float]) -> Dict:
+        """Feltöltés alatti szenzor állapot (előrejelzés nélkül)"""
+        return {
+            'prediction_date': 'Feltöltés alatt',
+            'days_until_empty': None,
+            'current_weight': current_weight,
+            'bird_count': self.bird_count,
+            'day_in_cycle': None,
+            'status': 'refilling'
+        }
+
+    def _process_raw_data(self, raw_data: List[Tuple[datetime, float]]):
+        """
+        Feldolgozás a nyers sorból (process() 3-6. lépései): mintavételezés,
+        exp állandó, 0. nap, előrejelzés, szenzor frissítés
+        """
+        prediction = self.compute_prediction(raw_data)
+        if prediction:
+            self.update_sensor(prediction)
+            logger.info(f"✅ [{self.sensor_name}] Feldolgozás sikeres")
+
+    def compute_prediction(self, raw_data: List[Tuple[datetime, float]]) -> Optional[Dict]:
+        """
+        Előrejelzés számítása a nyers sorból HA hívás nélkül (mintavételezés,
+        exp állandó, 0. nap, előrejelzés, ensemble)
+
+        Returns:
+            Szenzor frissítéshez kész előrejelzés, vagy None
+        """
+        try:
+            self.last_forecast_cumulative = None
+
             # 3. 6 órás mintavételezés (predikciós görbéhez)
             daily_data = self.sample_daily_data(raw_data)
 
@@ -1635,8 +3777,11 @@ class SiloPredictor:
             # 4. Normalizált görbe készítése (csak timestamp, weight párokat használunk)
             normalized_simple = [(t, w) for t, w, _, _ in daily_data] if daily_data and len(daily_data[0]) == 4 else daily_data
 
+            # Adathiány index (egyszer, a teljes mintasorra)
+            gap_index = self.build_gap_index(daily_data)
+
             # 5. Exponenciális állandó számítása
-            exp_constant, base_rate, acceleration = self.calculate_exp_constant(normalized_simple)
+            exp_constant, base_rate, acceleration = self.calculate_exp_constant(normalized_simple, gap_index)
 
             if base_rate == 0:
                 logger.warning(f"⚠️ [{self.sensor_name}] Nem sikerült exp állandót számítani")
@@ -1665,10 +3810,16 @@ class SiloPredictor:
                     logger.warning(f"⚠️ [{self.sensor_name}] Nincs folyamatos görbe adat")
                     return
 
-                # Madár darabszám kalkuláció
-                bird_counts = self.calculate_daily_bird_count(continuous_data)
+                # Madár darabszám: rekurzív becslő (csak az új lezárt napokkal)
+                bird_estimate = self.update_bird_estimator(continuous_data, gap_index)
+                bird_count_source = 'daily'
+
+                # Még nincs lezárt nap → 6 órás időszakokból becsülünk
+                if bird_estimate is None:
+                    bird_estimate = self.estimate_birds_subdaily(continuous_data, gap_index)
+                    bird_count_source = 'subdaily'
 
-                if not bird_counts:
+                if bird_estimate is None:
                     logger.warning(f"⚠️ [{self.sensor_name}] Madár darabszám nem számolható, fallback...")
                     # Fallback-re váltunk
                     prediction_time, days_until = self.predict_with_exp_only(
@@ -1680,7 +3831,7 @@ class SiloPredictor:
                     days_until_midpoint = window_midpoint_hours / 24.0
 
                     # Nevelési nap (ha van cycle_start_date)
-                    current_day = (datetime.now(LOCAL_TZ) - self.cycle_start_date).days if self.cycle_start_date else None
+                    current_day = (self.clock.now() - self.cycle_start_date).days if self.cycle_start_date else None
 
                     prediction = {
                         'prediction_date': formatted_date,
@@ -1693,8 +3844,8 @@ class SiloPredictor:
                         'tech_data_used': False
                     }
                 else:
-                    # Átlag madárszám
-                    avg_bird_count = int(np.mean(list(bird_counts.values())))
+                    # Rekurzív becslés (napi ingadozás kisimítva)
+                    avg_bird_count, bird_count_std = bird_estimate
 
                     # Tech + Exp predikció
                     prediction_time, days_until = self.predict_with_tech_and_exp(
@@ -1702,12 +3853,24 @@ class SiloPredictor:
                         avg_bird_count, base_rate, acceleration
                     )
 
+                    # Modell állapot mentése (what-if forgatókönyvekhez, process() újrafuttatása nélkül)
+                    self.model_state = {
+                        'computed_at': self.clock.now(),
+                        'current_weight': current_real_weight,
+                        'current_day': (self.clock.now() - self.cycle_start_date).days,
+                        'bird_count': avg_bird_count,
+                        'base_rate': base_rate,
+                        'acceleration': acceleration,
+                        'correction_factor': 1.0,
+                        'tech_offset_days': 0.0
+                    }
+
                     # Formázott dátum
                     formatted_date, window_midpoint_hours = self._format_prediction_with_window(prediction_time)
                     days_until_midpoint = window_midpoint_hours / 24.0
 
                     # Nevelési nap
-                    current_day = (datetime.now(LOCAL_TZ) - self.cycle_start_date).days
+                    current_day = (self.clock.now() - self.cycle_start_date).days
 
                     prediction = {
                         'prediction_date': formatted_date,
@@ -1715,11 +3878,18 @@ class SiloPredictor:
                         'days_until_empty': round(days_until_midpoint, 2),
                         'current_weight': round(current_real_weight, 0),
                         'bird_count': avg_bird_count,
+                        'bird_count_std': round(bird_count_std, 0),
+                        'bird_count_source': bird_count_source,
                         'day_in_cycle': current_day,
                         'status': 'emptying',
                         'tech_data_used': True
                     }
 
+                    # Monte Carlo predikciós intervallum (P10 / P50 / P90)
+                    intervals = self.calculate_prediction_intervals(bird_count_std)
+                    if intervals:
+                        prediction.update(intervals)
+
             # 7b. EXPONENCIÁLIS FALLBACK MÓDSZER (ha nincs 0. nap)
             else:
                 logger.info(f"⚠️ [{self.sensor_name}] EXP-ONLY FALLBACK MÓDSZER használata")
@@ -1744,29 +3914,349 @@ class SiloPredictor:
                     'tech_data_used': False
                 }
 
-            # 5. Szenzor frissítése
+            # Modell ensemble (az összes regisztrált modell ugyanazon a bemeneten)
+            if prediction:
+                inputs = self.build_model_inputs(raw_data, daily_data, base_rate, acceleration,
+                                                 prediction.get('bird_count'))
+                ensemble = self.run_model_ensemble(inputs)
+                if ensemble:
+                    prediction['ensemble'] = ensemble
+
+            # Előrejelzett súlygörbe (ugyanabból a kumulatív görbéből, mint a kiürülési idő)
+            if prediction and self.last_forecast_cumulative is not None:
+                prediction['forecast_trajectory'] = forecast_trajectory(current_real_weight,
+                                                                        self.last_forecast_cumulative)
+
             if prediction:
                 # Mentjük a bird_count-ot a ciklus adatok közé
                 if not self.bird_count and prediction.get('bird_count'):
                     self.bird_count = prediction['bird_count']
+                self.last_prediction = prediction
+                self.last_prediction_at = self.clock.now()
+                return prediction
 
-                self.update_sensor(prediction)
-                logger.info(f"✅ [{self.sensor_name}] Feldolgozás sikeres")
-            else:
-                logger.warning(f"⚠️ [{self.sensor_name}] Előrejelzés sikertelen")
+            logger.warning(f"⚠️ [{self.sensor_name}] Előrejelzés sikertelen")
+            return None
 
         except Exception as e:
             logger.error(f"❌ [{self.sensor_name}] Hiba a feldolgozás során: {e}", exc_info=True)
+            return None
+
+
+class RefillState:
+    """
+    Egy siló feltöltés figyelési állapota
+
+    Silónként független: cooldown (feldolgozott feltöltés után ne detektáljuk
+    újra ugyanazt), függő utófeldolgozás időpontja (és az első detektálásé,
+    az elhúzódó feltöltés felső korlátjához), utolsó feltöltés esemény.
+    """
+
+    def __init__(self):
+        self.cooldown_until = 0.0
+        self.followup_due = None
+        self.first_detected_at = None
+        self.last_event = None
+        self.refills_processed = 0
+
+    def in_cooldown(self, now: float) -> bool:
+        return now < self.cooldown_until
+
+    def register_detection(self, now: float, event: Dict) -> float:
+        """
+        Detektált feltöltés rögzítése; az utófeldolgozás a (még tartó) feltöltés
+        után REFILL_FOLLOWUP_DELAY-jel, de legkésőbb az első detektálás után
+        REFILL_FOLLOWUP_MAX_DELAY-jel esedékes
+
+        Returns:
+            Utófeldolgozás időpontja
+        """
+        if self.first_detected_at is None:
+            self.first_detected_at = now
+        self.last_event = event
+        self.followup_due = min(now + REFILL_FOLLOWUP_DELAY, self.first_detected_at + REFILL_FOLLOWUP_MAX_DELAY)
+        return self.followup_due
+
+    def advance_followup(self, due: float) -> float:
+        """Függő utófeldolgozás előrehozása (pl. a feltöltés befejeződött); az új időpont"""
+        self.followup_due = due if self.followup_due is None else min(self.followup_due, due)
+        return self.followup_due
+
+    def complete_followup(self, now: float):
+        """Utófeldolgozás kész → cooldown indul"""
+        self.cooldown_until = now + REFILL_COOLDOWN
+        self.followup_due = None
+        self.first_detected_at = None
+        self.refills_processed += 1
+
+
+class JobScheduler:
+    """
+    Időzítő kupac (heapq) siló szintű feladatokhoz
+
+    Feladat = (fajta, kulcs) pár, pl. ('refill_followup', entity_id). Egy
+    (fajta, kulcs) párhoz egyszerre egy időpont tartozik: újraütemezés
+    felülírja az előzőt (a kupacban maradt régi bejegyzést kivételkor eldobjuk).
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._pending = {}  # {(fajta, kulcs): (időpont, sorszám)}
+        self._counter = itertools.count()
+
+    def schedule(self, due: float, kind: str, key: Optional[str] = None, keep_earlier: bool = False):
+        """
+        Feladat ütemezése (epoch másodperc)
+
+        Args:
+            keep_earlier: Ha már van korábbi időpont, azt megtartjuk (nem toljuk ki)
+        """
+        current = self._pending.get((kind, key))
+        if keep_earlier and current is not None and current[0] <= due:
+            return
+
+        entry = (due, next(self._counter))
+        self._pending[(kind, key)] = entry
+        heapq.heappush(self._heap, (entry[0], entry[1], kind, key))
+
+    def cancel(self, kind: str, key: Optional[str] = None):
+        """Függő feladat törlése"""
+        self._pending.pop((kind, key), None)
+
+    def due_at(self, kind: str, key: Optional[str] = None) -> Optional[float]:
+        """Függő feladat időpontja (None, ha nincs)"""
+        entry = self._pending.get((kind, key))
+        return entry[0] if entry else None
+
+    def _drop_stale(self):
+        while self._heap:
+            due, seq, kind, key = self._heap[0]
+            if self._pending.get((kind, key)) == (due, seq):
+                return
+            heapq.heappop(self._heap)
+
+    def next_due(self) -> Optional[float]:
+        """Legkorábbi függő feladat időpontja"""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[Tuple[str, Optional[str]]]:
+        """Az összes esedékes feladat kivétele, időrendben"""
+        jobs = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            due, seq, kind, key = heapq.heappop(self._heap)
+            if self._pending.get((kind, key)) == (due, seq):
+                del self._pending[(kind, key)]
+                jobs.append((kind, key))
+            self._drop_stale()
+        return jobs
+
+
+def wait_for_home_assistant(ha_url: str, token: Optional[str], clock: Clock = SYSTEM_CLOCK) -> float:
+    """
+    Várakozás, amíg a Home Assistant API válaszol (GET /api/), exponenciális
+    visszalépéssel (HA_READY_INITIAL_DELAY → HA_READY_MAX_DELAY)
+
+    5xx (pl. 502 Bad Gateway a supervisor proxytól) és kapcsolódási hiba = még indul;
+    bármely más válasz = a core fut (401 esetén a token hibás, azt a hívások naplózzák).
+
+    Returns:
+        Várakozással töltött idő (s)
+    """
+    started = clock.time()
+    delay = HA_READY_INITIAL_DELAY
+    attempt = 0
+    headers = {'Authorization': f'Bearer {token}'}
+
+    while True:
+        attempt += 1
+        try:
+            response = requests.get(f"{ha_url}/api/", headers=headers, timeout=10)
+            if response.status_code < 500:
+                return _home_assistant_ready(clock.time() - started, attempt, response.status_code)
+            reason = f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            reason = type(e).__name__
+
+        logger.info(f"⏳ Home Assistant még nem elérhető ({reason}), újra {delay:.0f} s múlva")
+        clock.sleep(delay)
+        delay = min(delay * 2, HA_READY_MAX_DELAY)
+
+
+async def wait_for_home_assistant_async(client: 'AsyncHAClient', clock: Clock = SYSTEM_CLOCK) -> float:
+    """wait_for_home_assistant() asyncio változata"""
+    started = clock.time()
+    delay = HA_READY_INITIAL_DELAY
+    attempt = 0
+
+    while True:
+        attempt += 1
+        try:
+            status, _ = await client.get_json(f"{client.ha_url}/api/", timeout=10)
+            if status < 500:
+                return _home_assistant_ready(clock.time() - started, attempt, status)
+            reason = f"HTTP {status}"
+        except Exception as e:
+            reason = type(e).__name__
+
+        logger.info(f"⏳ Home Assistant még nem elérhető ({reason}), újra {delay:.0f} s múlva")
+        await clock.sleep_async(delay)
+        delay = min(delay * 2, HA_READY_MAX_DELAY)
+
+
+def _home_assistant_ready(waited: float, attempt: int, status: int) -> float:
+    if status != 200:
+        logger.error(f"❌ Home Assistant API válasz: HTTP {status} (token?)")
+    logger.info(f"✅ Home Assistant elérhető ({attempt}. próbálkozás, {waited:.1f} s várakozás)")
+    return waited
+
+
+class AsyncHAClient:
+    """
+    Nem blokkoló Home Assistant kliens (asyncio mód)
+
+    aiohttp-vel natív aszinkron REST + WebSocket; aiohttp nélkül a requests
+    hívások az alapértelmezett executorban futnak, WebSocket figyelés nélkül.
+    """
+
+    def __init__(self, ha_url: str, token: Optional[str]):
+        self.ha_url = ha_url
+        self.token = token
+        self.headers = {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json'
+        }
+        self.session = None
+
+    async def start(self):
+        if AIOHTTP_AVAILABLE:
+            self.session = aiohttp.ClientSession(headers=self.headers)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    @property
+    def websocket_available(self) -> bool:
+        return self.session is not None
+
+    @property
+    def websocket_url(self) -> str:
+        """Supervisor proxy: ws://supervisor/core/websocket, közvetlen HA: ws://<host>/api/websocket"""
+        base = 'ws' + self.ha_url[4:] if self.ha_url.startswith('http') else self.ha_url
+        base = base.rstrip('/')
+        return f"{base}/websocket" if base.endswith('/core') else f"{base}/api/websocket"
+
+    async def get_json(self, url: str, params: Optional[Dict] = None, timeout: float = 30):
+        """
+        GET kérés
+
+        Returns:
+            (HTTP státusz, JSON válasz - nem 200 esetén None)
+        """
+        if self.session is not None:
+            async with self.session.get(url, params=params,
+                                        timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                if response.status != 200:
+                    return response.status, None
+                return response.status, await response.json()
+
+        response = await asyncio.to_thread(requests.get, url, headers=self.headers, params=params, timeout=timeout)
+        return response.status_code, (response.json() if response.status_code == 200 else None)
+
+    async def post_json(self, url: str, payload: Dict, timeout: float = 10):
+        """POST kérés (HTTP hiba esetén kivétel)"""
+        if self.session is not None:
+            async with self.session.post(url, json=payload,
+                                         timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                response.raise_for_status()
+            return
+
+        response = await asyncio.to_thread(requests.post, url, headers=self.headers, json=payload, timeout=timeout)
+        response.raise_for_status()
+
+    async def watch_states(self, entity_ids: List[str], on_change):
+        """
+        Siló szenzorok állapotváltozásának követése WebSocket-en (subscribe_trigger,
+        state platform); megszakadt kapcsolat után újracsatlakozás növekvő várakozással
+
+        Args:
+            on_change: on_change(entity_id, régi állapot, új állapot) - az event loop-on hívódik
+        """
+        retry_delay = 5
+        while True:
+            try:
+                async with self.session.ws_connect(self.websocket_url, heartbeat=30) as ws:
+                    await ws.receive_json()  # auth_required
+                    await ws.send_json({'type': 'auth', 'access_token': self.token})
+                    auth = await ws.receive_json()
+                    if auth.get('type') != 'auth_ok':
+                        logger.error(f"❌ WebSocket hitelesítés sikertelen: {auth.get('message', auth.get('type'))}")
+                        return
+
+                    await ws.send_json({'id': 1, 'type': 'subscribe_trigger',
+                                        'trigger': {'platform': 'state', 'entity_id': list(entity_ids)}})
+                    logger.info(f"🔌 WebSocket feliratkozás: {len(entity_ids)} siló szenzor")
+                    retry_delay = 5
+
+                    async for message in ws:
+                        if message.type != aiohttp.WSMsgType.TEXT:
+                            continue
+                        data = message.json()
+                        if data.get('type') != 'event':
+                            continue
+                        trigger = data.get('event', {}).get('variables', {}).get('trigger', {})
+                        on_change(trigger.get('entity_id'),
+                                  (trigger.get('from_state') or {}).get('state'),
+                                  (trigger.get('to_state') or {}).get('state'))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ WebSocket hiba: {e}")
+
+            logger.info(f"🔌 WebSocket újracsatlakozás {retry_delay} s múlva")
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 300)
+
+
+class MultiSiloManager:
+    """
+    Multi-silo manager - kezeli az összes silót
 
+    Sharded módban (ShardCoordinator) minden worker folyamat egy példányt futtat:
+    a silókat és a tech görbéket a koordinátortól kapja, az eredményeket neki jelenti.
 
-class MultiSiloManager:
-    """Multi-silo manager - kezeli az összes silót"""
+    Az időt a clock adja (alapértelmezés: valós idő); VirtualClock-kal a teljes
+    szolgáltatás ciklus rögzített adatokon gyorsítva visszajátszható.
+    """
 
-    def __init__(self):
+    def __init__(self, silo_configs: Optional[List[Dict]] = None, shard: Optional['ShardLink'] = None,
+                 clock: Optional[Clock] = None):
+        self.clock = clock or SYSTEM_CLOCK
         self.ha_url = os.getenv('HA_URL', 'http://supervisor/core')
         self.ha_token = os.getenv('HA_TOKEN', os.getenv('SUPERVISOR_TOKEN'))
         self.prediction_days = int(os.getenv('PREDICTION_DAYS', '45'))  # 45 nap az új alapértelmezett
         self.update_interval = int(os.getenv('UPDATE_INTERVAL', '86400'))  # 24 óra (86400s)
+        self.tech_curves_dir = os.getenv('TECH_CURVES_DIR', DEFAULT_TECH_CURVES_DIR)
+        self.max_workers = max(1, int(os.getenv('MAX_WORKERS', str(DEFAULT_MAX_WORKERS))))
+        self.burst_concurrency = max(1, int(os.getenv('BURST_CONCURRENCY', str(DEFAULT_BURST_CONCURRENCY))))
+        self.burst_stagger = float(os.getenv('BURST_STAGGER_SECONDS', str(DEFAULT_BURST_STAGGER_SECONDS)))
+        self.burst_jitter = float(os.getenv('BURST_JITTER_SECONDS', str(DEFAULT_BURST_JITTER_SECONDS)))
+        self.job_deadline = float(os.getenv('JOB_DEADLINE_SECONDS', str(DEFAULT_JOB_DEADLINE_SECONDS)))
+        self.max_stale = float(os.getenv('MAX_STALE_MINUTES', str(DEFAULT_MAX_STALE_MINUTES))) * 60
+        self.execution_mode = os.getenv('EXECUTION_MODE', 'threads').lower()
+        if self.execution_mode not in EXECUTION_MODES:
+            logger.warning(f"⚠️ Ismeretlen futtatási mód '{self.execution_mode}', 'threads' használata")
+            self.execution_mode = 'threads'
+        if shard is not None and self.execution_mode != 'threads':
+            logger.info("ℹ️ Sharded worker: 'threads' futtatási mód (a koordinátor parancsait szál fogadja)")
+            self.execution_mode = 'threads'
+
+        # Sharded worker: kapcsolat a koordinátorral (None = önálló futás)
+        self.shard = shard
 
         logger.info("🚀 Multi-Silo Prediction Add-on indítva")
         logger.info(f"Home Assistant URL: {self.ha_url}")
@@ -1776,23 +4266,69 @@ class MultiSiloManager:
         else:
             logger.info(f"✅ Token hossza: {len(self.ha_token)} karakter")
 
+        # Névvel ellátott tech görbék betöltése (fajták / takarmány programok) - sharded
+        # workerben a koordinátor már lefordította és megosztott memóriában adta át
+        if shard is None:
+            TECH_CURVES.register_directory(self.tech_curves_dir)
+
         # Siló konfiguráció betöltése
-        self.silos = self._load_silo_config()
+        self.silos = self._load_silo_config() if silo_configs is None else self._create_silos(silo_configs)
+        self.silos_by_key = {silo.entity_id: silo for silo in self.silos}
         logger.info(f"📦 {len(self.silos)} silo konfigurálva")
 
-    def _load_silo_config(self) -> List[SiloPredictor]:
-        """Siló konfiguráció betöltése JSON-ból"""
+        # Feladat ütemező (siló szintű újraszámolás, feltöltés utáni frissítés, periodikus frissítés)
+        self.scheduler = JobScheduler()
+
+        # Silónkénti feltöltés figyelési állapot (cooldown, függő utófeldolgozás, utolsó esemény)
+        self.refill_states = {silo.entity_id: RefillState() for silo in self.silos}
+
+        # Korlátos munkaszál-készlet: silók párhuzamos feldolgozása / feltöltés ellenőrzése.
+        # A futó feladatokat (csoport, siló) szerint tartjuk nyilván: egy siló egyszerre
+        # csak egyszer dolgozódik fel; az eredményeket a fő szál alkalmazza (az ütemező egyszálú).
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix=f"shard{shard.shard_id}" if shard else 'silo')
+        self._in_flight = {}  # {(csoport, entity_id): (feladat fajta, Future, indítás ideje)}
+        self._rerun = {}  # {entity_id: feladat fajta} - foglalt silóra érkezett feldolgozás kérés
+        self._burst_waiting = deque()  # teljes feldolgozásra váró silók (burst_concurrency korlát)
+        self._failed_runs = set()  # silók, amelyek utolsó (teljes / periodikus) feldolgozása nem adott előrejelzést
+        self._wakeup = threading.Event()
+        logger.info(f"🧵 Párhuzamos feldolgozás: max {self.max_workers} munkaszál ({self.execution_mode} mód)")
+
+        # asyncio módban a nem blokkoló HA kliens (run_async() hozza létre)
+        self.http = None
+
+        # Indulási várakozás a HA API-ra (s) - None, amíg nem futott
+        self.ha_ready_wait_seconds = None
+
+    @staticmethod
+    def _read_silo_configs() -> List[Dict]:
+        """Siló konfigurációk (SILOS_CONFIG JSON)"""
         silos_json = os.getenv('SILOS_CONFIG', '[]')
 
         try:
-            silos_config = json.loads(silos_json)
+            return json.loads(silos_json)
         except json.JSONDecodeError as e:
             logger.error(f"❌ Hibás JSON konfiguráció: {e}")
             return []
 
+    def _load_silo_config(self) -> List[SiloPredictor]:
+        """Siló konfiguráció betöltése JSON-ból"""
+        return self._create_silos(self._read_silo_configs())
+
+    def _create_silos(self, silos_config: List[Dict]) -> List[SiloPredictor]:
+        """SiloPredictor példányok a konfigurációkból (hibás bejegyzés kimarad)"""
         silos = []
         for silo_cfg in silos_config:
             try:
+                # Siló tech görbéje (név → lefordított görbe); ismeretlen név esetén alapértelmezett
+                curve_name = silo_cfg.get('tech_curve') or DEFAULT_TECH_CURVE
+                curve = TECH_CURVES.get_named(curve_name)
+                if curve is None:
+                    logger.warning(f"⚠️ Ismeretlen tech görbe '{curve_name}' ({silo_cfg.get('sensor_name')}), "
+                                   f"alapértelmezett használata. Elérhető: {', '.join(TECH_CURVES.names())}")
+                    curve_name = DEFAULT_TECH_CURVE
+                    curve = TECH_CURVES.get_named(curve_name)
+
                 silo = SiloPredictor(
                     ha_url=self.ha_url,
                     ha_token=self.ha_token,
@@ -1801,7 +4337,13 @@ class MultiSiloManager:
                     refill_threshold=silo_cfg.get('refill_threshold', 1000),
                     max_capacity=silo_cfg.get('max_capacity', 20000),
                     prediction_days=self.prediction_days,
-                    tech_csv_path='/app/tech_feed_data.csv'
+                    tech_csv_path=curve.csv_path,
+                    tech_curve_name=curve_name,
+                    enable_growth_correction=silo_cfg.get('enable_growth_correction', False),
+                    animal_age_days=silo_cfg.get('animal_age_days'),
+                    growth_rate_kg_per_hour_per_day=silo_cfg.get('growth_rate_kg_per_hour_per_day', 0.000201),
+                    defer_cycle_data=True,  # HA elérhetősége után, az első feldolgozáskor
+                    clock=self.clock
                 )
                 silos.append(silo)
             except KeyError as e:
@@ -1809,37 +4351,64 @@ class MultiSiloManager:
 
         return silos
 
-    def _check_recent_refill(self, silo: 'SiloPredictor') -> bool:
+    def _check_recent_refill(self, silo: 'SiloPredictor',
+                             window_minutes: float = REFILL_DETECTION_WINDOW_MINUTES) -> Optional[Dict]:
         """
-        Ellenőrzi, hogy volt-e friss feltöltés az elmúlt 15 percben
+        Ellenőrzi, hogy volt-e friss feltöltés az elmúlt 15 percben (ritkább
+        ellenőrzésnél az ellenőrzési intervallumot lefedő ablakban)
 
         JAVÍTOTT LOGIKA: Az utolsó 15 perc min/max értékeiből számítja az összesített
         emelkedést, nem csak két szomszédos pontot néz (ami 10kg-os lépésekkel nem működik)
 
         Args:
             silo: SiloPredictor példány
+            window_minutes: Keresési ablak (perc)
 
         Returns:
-            True ha volt friss feltöltés (100+ kg emelkedés az elmúlt 15 percben)
+            Feltöltés esemény (min / max súly és időpont, emelkedés) ha volt friss
+            feltöltés (100+ kg emelkedés az elmúlt 15 percben), különben None
         """
         try:
-            # Utolsó 15 perc adat lekérése
-            end_time = datetime.now(LOCAL_TZ)
-            start_time = end_time - timedelta(minutes=15)
-
-            url = f"{self.ha_url}/api/history/period/{start_time.isoformat()}"
-            params = {
-                'filter_entity_id': silo.entity_id,
-                'end_time': end_time.isoformat()
-            }
+            # Utolsó 15 perc (ablak) adat lekérése
+            end_time = self.clock.now()
+            url, params = silo._history_request(end_time - timedelta(minutes=window_minutes), end_time)
 
             response = requests.get(url, headers=silo.headers, params=params, timeout=10)
             if response.status_code != 200:
-                return False
+                return None
+
+            return self._detect_recent_refill(silo, response.json())
+
+        except Exception as e:
+            logger.debug(f"❌ [{silo.sensor_name}] Feltöltés ellenőrzési hiba: {e}")
+            return None
+
+    async def _check_recent_refill_async(self, silo: 'SiloPredictor',
+                                         window_minutes: float = REFILL_DETECTION_WINDOW_MINUTES) -> Optional[Dict]:
+        """_check_recent_refill() asyncio változata"""
+        try:
+            end_time = self.clock.now()
+            status, data = await self.http.get_json(
+                *silo._history_request(end_time - timedelta(minutes=window_minutes), end_time), timeout=10)
+            if status != 200:
+                return None
+
+            return self._detect_recent_refill(silo, data)
+
+        except Exception as e:
+            logger.debug(f"❌ [{silo.sensor_name}] Feltöltés ellenőrzési hiba: {e}")
+            return None
 
-            data = response.json()
+    def _detect_recent_refill(self, silo: 'SiloPredictor', data) -> Optional[Dict]:
+        """
+        Friss feltöltés keresése az utolsó 15 perc (ablak) HA history válaszában
+
+        Returns:
+            Feltöltés esemény, vagy None
+        """
+        try:
             if not data or not data[0] or len(data[0]) < 5:
-                return False
+                return None
 
             # Összes adat értelmezése - keresünk min → max emelkedést
             weights_with_time = []
@@ -1854,7 +4423,7 @@ class MultiSiloManager:
                     continue
 
             if len(weights_with_time) < 5:
-                return False
+                return None
 
             # Rendezés időrendbe
             weights_with_time.sort(key=lambda x: x[0])
@@ -1881,7 +4450,7 @@ class MultiSiloManager:
 
             # Mennyi ideje fejeződött be (utolsó adat timestamp)
             last_data_time = weights_with_time[-1][0]
-            minutes_since_end = (datetime.now(LOCAL_TZ) - last_data_time).total_seconds() / 60
+            minutes_since_end = (self.clock.now() - last_data_time).total_seconds() / 60
 
             # FELTÖLTÉS DETEKTÁLÁS: 100+ kg emelkedés az elmúlt 15 percben
             # ÉS az utolsó adat 10 percen belül volt (aktív feltöltés vagy nemrég befejeződött)
@@ -1891,94 +4460,1010 @@ class MultiSiloManager:
                 logger.info(f"   📊 Max: {max_weight_after_min:.0f} kg ({max_time.strftime('%H:%M') if max_time else 'N/A'})")
                 logger.info(f"   📈 Összes emelkedés: +{total_rise:.0f} kg")
                 logger.info(f"   ⏱️ Utolsó adat: {minutes_since_end:.0f} perce")
-                return True
+                return {
+                    'detected_at': self.clock.now().isoformat(),
+                    'start': min_time.isoformat() if min_time else None,
+                    'end': max_time.isoformat() if max_time else None,
+                    'weight_before_kg': round(min_weight, 0),
+                    'weight_after_kg': round(max_weight_after_min, 0),
+                    'rise_kg': round(total_rise, 0)
+                }
 
-            return False
+            return None
 
         except Exception as e:
             logger.debug(f"❌ [{silo.sensor_name}] Feltöltés ellenőrzési hiba: {e}")
-            return False
+            return None
 
-    def run(self):
+    @staticmethod
+    def _check_refill_progress(silo: 'SiloPredictor') -> Tuple[bool, Optional[datetime], Optional[float]]:
+        """Folyamatban lévő feltöltés követése (5 perces minták, detect_refill_completion)"""
+        return silo.check_active_refill()
+
+    async def _check_refill_progress_async(self, silo: 'SiloPredictor'
+                                           ) -> Tuple[bool, Optional[datetime], Optional[float]]:
+        """_check_refill_progress() asyncio változata"""
+        end_time = self.clock.now()
+        start_time = end_time - timedelta(minutes=30)
+        status, history = await self.http.get_json(*silo._history_request(start_time, end_time), timeout=10)
+        data_5min = silo.resample_5min_history(history if status == 200 else None, start_time, end_time)
+        return silo.check_active_refill(data_5min)
+
+    def _refill_poll_interval(self, silo: 'SiloPredictor') -> float:
+        """
+        Feltöltés ellenőrzés gyakorisága a siló állapota szerint
+
+        - Feltöltés folyamatban / utófeldolgozás függőben: REFILL_POLL_ACTIVE
+        - Feltöltés várható (refill_threshold alatti súly vagy REFILL_EXPECTED_HOURS-on
+          belüli kiürülés) / semmi nem ismert: REFILL_CHECK_INTERVAL
+        - Kiürülés REFILL_POLL_NEAR_DAYS napon belül / nincs előrejelzés (küszöb feletti
+          súllyal): REFILL_POLL_NEAR
+        - Távoli kiürülés: REFILL_POLL_IDLE
+        """
+        if silo.refill_in_progress or self.refill_states[silo.entity_id].followup_due is not None:
+            return REFILL_POLL_ACTIVE
+
+        current_weight = (silo.last_prediction or {}).get('current_weight')
+        if current_weight is not None and current_weight < silo.refill_threshold:
+            return REFILL_CHECK_INTERVAL
+
+        empty_at = silo.predicted_empty_at
+        if empty_at is None:
+            return REFILL_CHECK_INTERVAL if current_weight is None else REFILL_POLL_NEAR
+
+        days_left = (empty_at - self.clock.now()).total_seconds() / 86400
+        if days_left <= REFILL_EXPECTED_HOURS / 24:
+            return REFILL_CHECK_INTERVAL
+        if days_left <= REFILL_POLL_NEAR_DAYS:
+            return REFILL_POLL_NEAR
+        return REFILL_POLL_IDLE
+
+    def _check_tech_curve_reload(self):
+        """
+        Tech görbe fájlok változásának ellenőrzése; újratöltés után csak az
+        érintett silók újraszámolása a cache-elt sorból (HA lekérés nélkül)
+        """
+        reloaded = TECH_CURVES.check_reload()
+        if reloaded:
+            self._schedule_recompute(reloaded)
+
+    def _schedule_recompute(self, csv_paths: List[str]):
+        """Az adott tech görbéket használó silók újraszámolása a cache-elt sorból"""
+        for silo in self.silos:
+            if silo.tech_curve.csv_path in csv_paths:
+                self.scheduler.schedule(self.clock.time(), 'recompute', silo.entity_id)
+
+    def add_silos(self, silo_configs: List[Dict]):
+        """
+        Silók felvétele futás közben (sharded worker: koordinátor kiosztás) -
+        azonnali feldolgozással és feltöltés figyeléssel
+        """
+        now = self.clock.time()
+        new_configs = [cfg for cfg in silo_configs if cfg.get('entity_id') not in self.silos_by_key]
+        added = self._create_silos(new_configs)
+        for silo in added:
+            self.silos.append(silo)
+            self.silos_by_key[silo.entity_id] = silo
+            self.refill_states[silo.entity_id] = RefillState()
+            self.scheduler.schedule(now + REFILL_CHECK_INTERVAL, 'refill_check', silo.entity_id)
+            logger.info(f"📦 [{silo.sensor_name}] Silo hozzárendelve")
+        self._schedule_burst(added)
+
+    def _drain_shard_commands(self) -> bool:
+        """
+        Koordinátor parancsok alkalmazása a fő szálon (sharded worker)
+
+        Returns:
+            False, ha le kell állni
+        """
+        while self.shard.commands:
+            command, payload = self.shard.commands.popleft()
+            if command == 'stop':
+                logger.info(f"🛑 Worker #{self.shard.shard_id} leállítva")
+                return False
+            if command == 'assign':
+                self.add_silos(payload)
+            elif command == 'tech_curves':
+                changed = self.shard.attach_curves(payload)
+                if changed:
+                    self._schedule_recompute(changed)
+        return True
+
+    @staticmethod
+    def _next_midnight(now: datetime) -> datetime:
+        """Következő helyi éjfél"""
+        return LOCAL_TZ.localize(datetime.combine(now.date() + timedelta(days=1), datetime.min.time()))
+
+    @staticmethod
+    def _run_isolated(silo: 'SiloPredictor', func, *args):
+        """
+        Feladat futtatása munkaszálon: a szál neve a siló (naplóban azonosítható),
+        a hiba csak ezt a silót érinti
+
+        Returns:
+            (sikeres, eredmény)
+        """
+        thread = threading.current_thread()
+        pool_name = thread.name
+        thread.name = f"{pool_name}:{silo.entity_id}"
+        try:
+            return True, func(*args)
+        except Exception as e:
+            logger.error(f"❌ [{silo.sensor_name}] Hiba a feldolgozás során: {e}", exc_info=True)
+            return False, None
+        finally:
+            thread.name = pool_name
+
+    @staticmethod
+    async def _run_isolated_async(silo: 'SiloPredictor', job):
+        """_run_isolated() asyncio változata: a korutin hibája csak ezt a silót érinti"""
+        try:
+            return True, await job
+        except Exception as e:
+            logger.error(f"❌ [{silo.sensor_name}] Hiba a feldolgozás során: {e}", exc_info=True)
+            return False, None
+
+    def _submit(self, group: str, kind: str, silo: 'SiloPredictor', func, *args):
+        """
+        Feladat indítása: munkaszál-készletben, asyncio módban (func korutin függvény)
+        az event loop-on - befejezéskor az ütemező felébred
+        """
+        if self.http is not None:
+            future = asyncio.ensure_future(self._run_isolated_async(silo, func(*args)))
+        else:
+            future = self.executor.submit(self._run_isolated, silo, func, *args)
+        self._in_flight[(group, silo.entity_id)] = (kind, future, self.clock.time())
+        future.add_done_callback(lambda _: self._wakeup.set())
+        if group == 'process':
+            self.scheduler.schedule(self.clock.time() + self.job_deadline, 'deadline', silo.entity_id)
+
+    def _start_processing(self, kind: str, silo: 'SiloPredictor'):
+        """
+        Siló feldolgozás indítása; ha a siló épp feldolgozás alatt áll, a kérés
+        összevonódik és a futás végén egyszer lefut (a legerősebb függő fajtával)
+        """
+        key = silo.entity_id
+        if ('process', key) in self._in_flight:
+            previous = self._rerun.get(key)
+            if previous is None or PROCESS_JOB_PRIORITY[kind] > PROCESS_JOB_PRIORITY[previous]:
+                self._rerun[key] = kind
+            logger.info(f"⏳ [{silo.sensor_name}] {kind}: feldolgozás folyamatban, utána fut")
+            return
+
+        # Teljes újraszámolás (indulás / éjfél): legfeljebb burst_concurrency egyszerre
+        if kind == 'process' and self._burst_running() >= self.burst_concurrency:
+            if key not in self._burst_waiting:
+                self._burst_waiting.append(key)
+            return
+
+        reason = {'process': 'teljes újraszámolás', 'refresh': 'periodikus frissítés',
+                  'refill_followup': 'feltöltés utáni frissítés', 'recompute': 'tech görbe újratöltés'}[kind]
+        logger.info(f"▶️ [{silo.sensor_name}] Feldolgozás ({reason})")
+        if self.http is not None:
+            func = silo.recompute_async if kind == 'recompute' else silo.process_async
+            self._submit('process', kind, silo, func, self.http, self.executor)
+        else:
+            func = silo.recompute_from_cache if kind == 'recompute' else silo.process
+            self._submit('process', kind, silo, func)
+
+    def _publish_stale(self, silo: 'SiloPredictor', stale_before: float, stale: bool = True):
+        """Extrapolált előrejelzés közzététele külön feladatként (a futó feldolgozást nem várja meg)"""
+        if ('stale', silo.entity_id) in self._in_flight:
+            return
+        if self.http is not None:
+            self._submit('stale', 'stale', silo, silo.publish_stale_async, self.http, stale_before, stale)
+        else:
+            self._submit('stale', 'stale', silo, silo.publish_stale, stale_before, stale)
+
+    def _refresh_missed(self, silo: 'SiloPredictor', now: float) -> bool:
+        """
+        Esedékes frissítés elmaradt: határidőn túl futó / sikertelen feldolgozás, vagy
+        az utolsó előrejelzés régebbi, mint update_interval (+ határidő)
+        """
+        entry = self._in_flight.get(('process', silo.entity_id))
+        if entry is not None and now - entry[2] >= self.job_deadline:
+            return True
+        if silo.entity_id in self._failed_runs:
+            return True
+        return now - silo.last_prediction_at.timestamp() > self.update_interval + self.job_deadline
+
+    def _check_deadline(self, silo: 'SiloPredictor'):
+        """
+        Feldolgozási határidő lejárt: az utolsó előrejelzés extrapolálva kikerül,
+        a feldolgozás a háttérben befejeződik (és felülírja)
+        """
+        entry = self._in_flight.get(('process', silo.entity_id))
+        if entry is None:
+            return
+        kind, _, started = entry
+        if self.clock.time() - started < self.job_deadline:
+            return  # Közben újabb feldolgozás indult (annak saját határideje van)
+
+        logger.warning(f"⏰ [{silo.sensor_name}] {kind}: határidő ({self.job_deadline:.0f} s) lejárt → "
+                       f"elavult előrejelzés, a frissítés a háttérben folytatódik")
+        self._publish_stale(silo, started)
+
+    def _check_staleness(self):
+        """
+        Elavulás figyelés: max_stale ideje nem frissült szenzorok extrapolált
+        előrejelzéssel ('stale' jelölés csak elmaradt frissítésnél)
+        """
+        now = self.clock.time()
+        for silo in self.silos:
+            key = silo.entity_id
+            if silo.last_prediction_at is None or silo.refill_in_progress:
+                continue
+            if self.refill_states[key].followup_due is not None:
+                continue  # Feltöltés után a régi előrejelzés nem érvényes, az utófeldolgozás úgyis frissít
+
+            entry = self._in_flight.get(('process', key))
+            if entry is not None and now - entry[2] < self.job_deadline:
+                continue  # Futó feldolgozás határidőn belül
+
+            last_published = silo.last_published_at or silo.last_prediction_at.timestamp()
+            if now - last_published > self.max_stale:
+                stale = self._refresh_missed(silo, now)
+                logger.info(f"🕰️ [{silo.sensor_name}] {(now - last_published) / 60:.0f} perce nincs frissítés → "
+                           f"{'elavult' if stale else 'extrapolált'} előrejelzés")
+                self._publish_stale(silo, now - self.max_stale, stale)
+
+    def _burst_running(self) -> int:
+        return sum(1 for (group, _), (kind, _, _) in self._in_flight.items() if group == 'process' and kind == 'process')
+
+    def _schedule_burst(self, silos: List['SiloPredictor']):
+        """
+        Teljes feldolgozás ütemezése sok silóra (indulás / éjfél / kiosztás)
+
+        Sürgősségi sorrend (legkorábbi várható kiürülés elöl, ismeretlen a végén),
+        silónként burst_stagger + 0..burst_jitter másodperc halmozott eltolással
+        (a sorrend megmarad); a párhuzamosságot _start_processing korlátozza.
+        """
+        far_future = datetime.max.replace(tzinfo=pytz.UTC)
+        ordered = sorted(silos, key=lambda silo: silo.predicted_empty_at or far_future)
+
+        due = self.clock.time()
+        for silo in ordered:
+            self.scheduler.schedule(due, 'process', silo.entity_id)
+            due += self.burst_stagger + (random.uniform(0, self.burst_jitter) if self.burst_jitter > 0 else 0.0)
+
+        if ordered:
+            logger.info(f"📋 Feldolgozási sorrend (sürgősség): {', '.join(silo.sensor_name for silo in ordered)}")
+
+    def _finish_processing(self, kind: str, silo: 'SiloPredictor', started: float):
+        """
+        Feldolgozás vége (fő szálon): a periodikus frissítés update_interval múlvára
+        tolódik, utófeldolgozás után a siló cooldown-ja indul, összevont kérés újraindul.
+        Sikertelen teljes / periodikus futás után az utolsó előrejelzés 'stale' jelöléssel
+        kerül ki.
+        """
+        now = self.clock.time()
+        key = silo.entity_id
+
+        if kind in ('process', 'refresh') and silo.cycle_data_loaded and not silo.refill_in_progress:
+            if silo.last_prediction_at is not None and silo.last_prediction_at.timestamp() < started:
+                self._failed_runs.add(key)
+                logger.warning(f"⚠️ [{silo.sensor_name}] {kind}: nincs új előrejelzés → elavult előrejelzés")
+                self._publish_stale(silo, started)
+            else:
+                self._failed_runs.discard(key)
+        elif silo.last_prediction_at is not None and silo.last_prediction_at.timestamp() >= started:
+            self._failed_runs.discard(key)
+        if silo.cycle_data_loaded:
+            self.scheduler.schedule(now + self.update_interval, 'refresh', key)
+        else:
+            # A mentett ciklus állapot még nem tölthető be → hamarosan újra (nem update_interval múlva)
+            self.scheduler.schedule(now + CYCLE_DATA_RETRY_INTERVAL, 'process', key)
+
+        if kind == 'refill_followup':
+            self.refill_states[key].complete_followup(now)  # COOLDOWN INDÍTÁS (csak ennél a silónál)
+            logger.info(f"⏸️ [{silo.sensor_name}] Refill cooldown indítva "
+                       f"({REFILL_COOLDOWN // 60} perc - nem detektál új feltöltést)")
+
+        rerun = self._rerun.pop(key, None)
+        if rerun:
+            self.scheduler.schedule(now, rerun, key)
+
+        # Felszabadult teljes feldolgozási hely → a következő várakozó siló
+        if kind == 'process':
+            while self._burst_waiting:
+                waiting_key = self._burst_waiting.popleft()
+                if waiting_key in self.silos_by_key:
+                    self.scheduler.schedule(now, 'process', waiting_key)
+                    break
+
+    def _start_refill_check(self, silo: 'SiloPredictor'):
+        """
+        Egy siló feltöltés ellenőrzése (silónként független cooldown-nal) - a HA
+        lekérés munkaszálon fut, az eredményt _finish_refill_check alkalmazza
+        """
+        now = self.clock.time()
+        state = self.refill_states[silo.entity_id]
+        if state.in_cooldown(now):
+            return
+        if state.followup_due is not None and state.followup_due <= now:
+            return  # Az utófeldolgozás már esedékes / fut
+        if ('check', silo.entity_id) in self._in_flight:
+            return  # Az előző ellenőrzés még fut
+
+        # Feltöltés folyamatban → a befejezést figyeljük (5 perces minták)
+        if silo.refill_in_progress or state.followup_due is not None:
+            check = self._check_refill_progress_async if self.http is not None else self._check_refill_progress
+            self._submit('check', 'refill_progress', silo, check, silo)
+            return
+
+        # Ritkább ellenőrzésnél a keresési ablak lefedi az előző ellenőrzés óta eltelt időt
+        window_minutes = max(REFILL_DETECTION_WINDOW_MINUTES, self._refill_poll_interval(silo) / 60 + 5)
+        check = self._check_recent_refill_async if self.http is not None else self._check_recent_refill
+        self._submit('check', 'refill_check', silo, check, silo, window_minutes)
+
+    def _finish_refill_check(self, silo: 'SiloPredictor', event: Optional[Dict]):
+        """
+        Feltöltés ellenőrzés eredménye (fő szálon): új feltöltés → utófeldolgozás
+        ütemezése; a még tartó feltöltés újabb detektálása kitolja (de nem
+        duplikálja) a függő utófeldolgozást.
+        """
+        if not event:
+            return
+
+        now = self.clock.time()
+        state = self.refill_states[silo.entity_id]
+        if state.in_cooldown(now):
+            return  # Közben lefutott az utófeldolgozás
+
+        pending = state.followup_due is not None
+        due = state.register_detection(now, event)
+        silo.last_refill_event = event
+        self.scheduler.schedule(due, 'refill_followup', silo.entity_id)
+
+        if pending:
+            logger.info(f"⚡ [{silo.sensor_name}] Feltöltés még tart → utófeldolgozás "
+                       f"{datetime.fromtimestamp(due, LOCAL_TZ).strftime('%H:%M')}-kor")
+        else:
+            logger.info(f"⚡ [{silo.sensor_name}] FELTÖLTÉS DETEKTÁLVA! Újrafeldolgozás "
+                       f"{REFILL_FOLLOWUP_DELAY // 60} perc múlva (ütemezve)")
+
+        # Innentől sűrű ellenőrzés a feltöltés befejezéséig
+        self.scheduler.schedule(now + REFILL_POLL_ACTIVE, 'refill_check', silo.entity_id, keep_earlier=True)
+
+    def _finish_refill_progress(self, silo: 'SiloPredictor',
+                                progress: Tuple[bool, Optional[datetime], Optional[float]]):
+        """
+        Feltöltés követés eredménye (fő szálon): még tart → utófeldolgozás kitolása
+        (felső korláttal); befejeződött → utófeldolgozás azonnal, nem kell a
+        REFILL_FOLLOWUP_DELAY lejártára várni
+        """
+        is_refilling, refill_end, current_weight = progress
+        now = self.clock.time()
+        key = silo.entity_id
+        state = self.refill_states[key]
+        if state.in_cooldown(now):
+            return
+
+        silo.refill_in_progress = is_refilling
+        if is_refilling:
+            event = state.last_event or {
+                'detected_at': self.clock.now().isoformat(),
+                'start': None,
+                'end': None,
+                'weight_before_kg': None,
+                'weight_after_kg': round(current_weight, 0) if current_weight is not None else None,
+                'rise_kg': None
+            }
+            due = state.register_detection(now, event)
+            silo.last_refill_event = event
+            self.scheduler.schedule(due, 'refill_followup', key)
+            return
+
+        if state.followup_due is not None:
+            state.advance_followup(now)
+            self.scheduler.schedule(now, 'refill_followup', key)
+            logger.info(f"✅ [{silo.sensor_name}] Feltöltés befejeződött"
+                       f"{' (' + refill_end.strftime('%H:%M') + ')' if refill_end else ''} → utófeldolgozás most")
+
+    def _reap_finished(self):
+        """Befejezett munkaszál feladatok eredményének alkalmazása (fő szálon)"""
+        for (group, key), (kind, future, started) in list(self._in_flight.items()):
+            if not future.done():
+                continue
+            del self._in_flight[(group, key)]
+            silo = self.silos_by_key[key]
+            ok, result = future.result()
+
+            if self.shard is not None:
+                self.shard.report_job(kind, silo, ok, self.clock.time() - started, result if group == 'check' else None)
+
+            try:
+                if group == 'process':
+                    self._finish_processing(kind, silo, started)
+                elif group == 'stale':
+                    pass
+                elif ok and kind == 'refill_progress':
+                    self._finish_refill_progress(silo, result)
+                elif ok:
+                    self._finish_refill_check(silo, result)
+            except Exception as e:
+                logger.error(f"❌ [{silo.sensor_name}] Hiba az eredmény feldolgozásakor ({kind}): {e}", exc_info=True)
+
+    def _run_job(self, kind: str, key: Optional[str]):
+        """Egy esedékes feladat indítása (hibája nem állítja meg az ütemezőt)"""
+        now = self.clock.time()
+        try:
+            if kind == 'midnight':
+                logger.info("=" * 60)
+                logger.info(f"🌙 ÉJFÉLI feldolgozás ({len(self.silos)} silo) - {self.clock.now().date()}")
+                self._schedule_burst(self.silos)
+                self.scheduler.schedule(self._next_midnight(self.clock.now()).timestamp(), 'midnight')
+
+            elif kind == 'refill_check':
+                silo = self.silos_by_key.get(key)
+                if silo is None:
+                    return
+                self.scheduler.schedule(now + self._refill_poll_interval(silo), 'refill_check', key)
+                self._start_refill_check(silo)
+
+            elif kind == 'deadline':
+                silo = self.silos_by_key.get(key)
+                if silo is not None:
+                    self._check_deadline(silo)
+
+            elif kind == 'stale_watchdog':
+                self._check_staleness()
+                self.scheduler.schedule(now + STALE_WATCHDOG_INTERVAL, 'stale_watchdog')
+
+            elif kind == 'tech_reload':
+                # Tech görbe hot-reload (mtime / hash alapján)
+                self._check_tech_curve_reload()
+                self.scheduler.schedule(self.clock.time() + TECH_RELOAD_CHECK_INTERVAL, 'tech_reload')
+
+            elif kind in PROCESS_JOB_PRIORITY:
+                silo = self.silos_by_key.get(key)
+                if silo is None:
+                    return
+
+                # Függő utófeldolgozás mellett a teljes / periodikus futás felesleges (az utófeldolgozás úgyis számol)
+                if kind != 'refill_followup' and self.refill_states[key].followup_due is not None:
+                    logger.info(f"⏭️ [{silo.sensor_name}] {kind} kihagyva: feltöltés utáni frissítés függőben")
+                    return
+
+                self._start_processing(kind, silo)
+
+        except Exception as e:
+            logger.error(f"❌ Hiba a feladat végrehajtása során ({kind}, {key}): {e}", exc_info=True)
+
+    def _schedule_startup_jobs(self):
+        """Indulási feldolgozás + ismétlődő feladatok ütemezése"""
+        logger.info("🔄 Multi-Silo Prediction szolgáltatás indítva")
+        logger.info(f"📊 Napi predikció frissítés: ÉJFÉLKOR (00:00), periodikus frissítés: {self.update_interval} s")
+        logger.info(f"⚡ Feltöltés monitoring: állapot szerint {REFILL_POLL_ACTIVE} s (feltöltés alatt) - "
+                   f"{REFILL_POLL_IDLE // 60} perc (tele siló), 100+ kg küszöb")
+        logger.info(f"⚡ Feltöltés utáni frissítés: {REFILL_FOLLOWUP_DELAY // 60} perc múlva, csak az érintett silón")
+
+        # INDULÁSI feldolgozás + ismétlődő feladatok
+        now = self.clock.time()
+        logger.info("=" * 60)
+        logger.info(f"🚀 INDULÁSI feldolgozás ({len(self.silos)} silo)")
+        self._schedule_burst(self.silos)
+        self.scheduler.schedule(self._next_midnight(self.clock.now()).timestamp(), 'midnight')
+        for silo in self.silos:
+            self.scheduler.schedule(now + REFILL_CHECK_INTERVAL, 'refill_check', silo.entity_id)
+        if self.max_stale > 0:
+            self.scheduler.schedule(now + STALE_WATCHDOG_INTERVAL, 'stale_watchdog')
+        if self.shard is None:
+            # Sharded módban a koordinátor figyeli a görbefájlokat
+            self.scheduler.schedule(now + TECH_RELOAD_CHECK_INTERVAL, 'tech_reload')
+
+    def _apply_bulk_states(self, states: Optional[List[Dict]]):
+        """
+        Induláskori tömeges állapot lekérés (egy /api/states hívás) alkalmazása
+
+        Silónkénti lekérés helyett minden siló ciklus adata és utolsó várható
+        kiürülése egyszerre töltődik be, így az indulási sorrend sürgősség
+        szerinti. Hiba esetén (None) a feldolgozás silónként tölt be.
+        """
+        if states is None or not self.silos:
+            return
+
+        by_entity = {state.get('entity_id'): state for state in states if isinstance(state, dict)}
+        for silo in self.silos:
+            state = by_entity.get(silo.sensor_entity_id)
+            silo._apply_cycle_data(200 if state is not None else 404, state)
+
+        logger.info(f"📥 Ciklus adatok betöltve egy lekéréssel ({len(self.silos)} silo)")
+
+    def _load_bulk_states(self):
+        if not self.silos:
+            return
+        try:
+            response = requests.get(f"{self.ha_url}/api/states", headers={'Authorization': f'Bearer {self.ha_token}'}, timeout=30)
+            response.raise_for_status()
+            self._apply_bulk_states(response.json())
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"⚠️ Tömeges állapot lekérés sikertelen, silónkénti betöltés: {e}")
+
+    async def _load_bulk_states_async(self):
+        if not self.silos:
+            return
+        try:
+            status, states = await self.http.get_json(f"{self.ha_url}/api/states", timeout=30)
+        except Exception as e:
+            logger.warning(f"⚠️ Tömeges állapot lekérés sikertelen, silónkénti betöltés: {e}")
+            return
+        if status != 200:
+            logger.warning(f"⚠️ Tömeges állapot lekérés sikertelen (HTTP {status}), silónkénti betöltés")
+            return
+        self._apply_bulk_states(states)
+
+    def run(self, wait_for_ha: bool = True):
         """
-        Fő futási ciklus - periodikusan feldolgozza az összes silót
+        Fő futási ciklus - időzítő kupac alapú ütemező (nem blokkol)
 
         FRISSÍTÉSI LOGIKA:
-        - Napi predikció: ÉJFÉLKOR (00:00) + induláskor
-        - Folyamatos monitoring: 1 percenként ellenőrzi a feltöltéseket (100+ kg)
-        - Feltöltés után: 20 perc várakozás, majd AZONNALI frissítés
+        - Teljes predikció: induláskor + ÉJFÉLKOR (00:00), silónként
+        - Periodikus frissítés: silónként update_interval másodpercenként az utolsó feldolgozás óta
+        - Feltöltés monitoring: silónként állapot szerint (feltöltés alatt 15 s, várható
+          feltöltésnél percenként, egyébként 5-15 percenként), silónkénti cooldown-nal
+        - Feltöltés után: CSAK az érintett siló újraszámolása 15 perc múlva (ütemezett feladat,
+          közben a többi siló monitorozása folytatódik; tartó feltöltés kitolja, nem duplikálja)
+        - A silók feldolgozása / HA lekérései korlátos munkaszál-készletben, párhuzamosan futnak
+        - Határidő: job_deadline után / sikertelen futásnál az utolsó előrejelzés extrapolálva
+          ('stale') kikerül, a feldolgozás háttérben fut tovább; max_stale_minutes-nál régebbi
+          szenzor is extrapolálva frissül ('stale' csak elmaradt frissítésnél)
+        - execution_mode=asyncio: ugyanez egy event loop-on (run_async())
+
+        Args:
+            wait_for_ha: Várakozás a HA API elérhetőségére (sharded workerben False - a koordinátor már várt)
+        """
+        if self.execution_mode == 'asyncio':
+            asyncio.run(self.run_async())
+            return
+
+        # Várakozás Home Assistant core felállására (502 Bad Gateway elkerülése) - a ciklus
+        # adatok betöltése és az első feldolgozás csak ezután indul
+        if wait_for_ha:
+            self.ha_ready_wait_seconds = wait_for_home_assistant(self.ha_url, self.ha_token, self.clock)
+
+        self._load_bulk_states()
+        self._schedule_startup_jobs()
+        if self.shard is not None:
+            self.shard.start(self._wakeup)
+
+        while self.clock.running:
+            if self.shard is not None and not self._drain_shard_commands():
+                self.executor.shutdown(wait=True)
+                return
+
+            self._reap_finished()
+
+            for kind, key in self.scheduler.pop_due(self.clock.time()):
+                self._run_job(kind, key)
+
+            # Várakozás a következő esedékes feladatig (vagy egy munkaszál feladat befejezéséig)
+            next_due = self.scheduler.next_due()
+            wait = REFILL_CHECK_INTERVAL if next_due is None else next_due - self.clock.time()
+            self.clock.wait(self._wakeup, min(max(wait, 0.0), REFILL_CHECK_INTERVAL), busy=bool(self._in_flight))
+            self._wakeup.clear()
+
+        # Virtuális idő vége (szimuláció): a futó feladatok befejezése
+        self.executor.shutdown(wait=True)
+        self._reap_finished()
+
+    def _on_state_change(self, entity_id: str, old_state: Optional[str], new_state: Optional[str]):
+        """
+        WebSocket állapotváltozás (asyncio mód): jelentős súlynövekedésnél azonnali
+        feltöltés ellenőrzés, nem kell a következő percenkénti ellenőrzésre várni
+        """
+        try:
+            rise = float(new_state) - float(old_state)
+        except (TypeError, ValueError):
+            return
+
+        if rise >= REFILL_WS_TRIGGER_KG and entity_id in self.silos_by_key:
+            self.scheduler.schedule(self.clock.time(), 'refill_check', entity_id)
+            self._wakeup.set()
+
+    async def run_async(self):
+        """
+        Fő futási ciklus asyncio módban
+
+        Az ütemező, a silók feldolgozása, a feltöltés ellenőrzések és a WebSocket
+        figyelés egy event loop-on osztozik; a HA I/O nem blokkol, a NumPy számolás
+        a (max_workers méretű) executorban fut - nincs silónkénti szál.
         """
+        self.http = AsyncHAClient(self.ha_url, self.ha_token)
+        await self.http.start()
+
         # Várakozás Home Assistant core felállására (502 Bad Gateway elkerülése)
-        logger.info("⏳ Várakozás 30 másodpercet a Home Assistant core indulására...")
-        time.sleep(30)
+        self.ha_ready_wait_seconds = await wait_for_home_assistant_async(self.http, self.clock)
+        self._wakeup = asyncio.Event()
+        watcher = None
 
-        logger.info("🔄 Multi-Silo Prediction szolgáltatás indítva")
-        logger.info(f"📊 Napi predikció frissítés: ÉJFÉLKOR (00:00)")
-        logger.info(f"⚡ Feltöltés monitoring: 1 percenként (100+ kg küszöb)")
-        logger.info(f"⚡ Feltöltés utáni frissítés: 15 perc várakozás után")
+        try:
+            await self._load_bulk_states_async()
+            self._schedule_startup_jobs()
+
+            if self.http.websocket_available:
+                watcher = asyncio.ensure_future(self.http.watch_states(list(self.silos_by_key), self._on_state_change))
+            else:
+                logger.info("ℹ️ aiohttp nincs telepítve: HA hívások szálon, WebSocket figyelés nélkül")
 
-        REFILL_CHECK_INTERVAL = 60  # 1 perc
-        REFILL_COOLDOWN = 15 * 60  # 15 perc cooldown feltöltés feldolgozás után
-        last_process_date = None  # Utolsó feldolgozás dátuma (éjféli logikához)
-        last_refill_time = 0  # Utolsó feltöltés feldolgozás időpontja (cooldown)
+            while self.clock.running:
+                self._reap_finished()
+
+                for kind, key in self.scheduler.pop_due(self.clock.time()):
+                    self._run_job(kind, key)
+
+                # Várakozás a következő esedékes feladatig (vagy egy feladat befejezéséig / WebSocket eseményig)
+                next_due = self.scheduler.next_due()
+                wait = REFILL_CHECK_INTERVAL if next_due is None else next_due - self.clock.time()
+                await self.clock.wait_async(self._wakeup, min(max(wait, 0.0), REFILL_CHECK_INTERVAL),
+                                            busy=bool(self._in_flight))
+                self._wakeup.clear()
+
+            # Virtuális idő vége (szimuláció): a futó feladatok befejezése
+            await asyncio.gather(*(future for _, future, _ in self._in_flight.values()), return_exceptions=True)
+            self._reap_finished()
+
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            await self.http.close()
+            self.http = None
+
+
+
+class SharedTechCurves:
+    """
+    Lefordított tech görbék megosztott memóriában (sharded mód)
+
+    A koordinátor egyszer tölti be és fordítja a görbéket, a sűrű tömböket
+    (intake_g, majd cumulative_g) görbénként egy SharedMemory blokkba írja;
+    a workerek csak csatolnak és read-only nézeteket kapnak (nincs folyamatonkénti
+    CSV olvasás / fordítás / másolat).
+    """
+
+    def __init__(self):
+        self._blocks = {}  # {csv_path: SharedMemory} - koordinátor oldali tulajdonos
+
+    def publish(self, registry: TechCurveRegistry, csv_paths: Optional[List[str]] = None) -> Dict:
+        """
+        Görbék kiírása megosztott memóriába (újratöltéskor csak a változottaké)
+
+        A régi blokk azonnal unlink-elődik: a már csatolt workerek leképezése érvényes marad.
+
+        Returns:
+            Leíró a workereknek: {'names': {...}, 'curves': {csv_path: {shm, days, digest, is_fallback}}}
+        """
+        names, handles = registry.snapshot()
+        curves = {}
+        for csv_path, handle in handles.items():
+            curve = handle.curve
+            days = len(curve.intake_g)
+
+            if csv_paths is None or csv_path in csv_paths or csv_path not in self._blocks:
+                block = shared_memory.SharedMemory(create=True, size=(2 * days + 1) * 8)
+                data = np.ndarray((2 * days + 1,), dtype=np.float64, buffer=block.buf)
+                data[:days] = curve.intake_g
+                data[days:] = curve.cumulative_g
+                del data
+
+                old = self._blocks.get(csv_path)
+                self._blocks[csv_path] = block
+                if old is not None:
+                    old.close()
+                    old.unlink()
+
+            curves[csv_path] = {
+                'shm': self._blocks[csv_path].name,
+                'days': days,
+                'digest': handle.digest,
+                'is_fallback': curve.is_fallback
+            }
+
+        return {'names': names, 'curves': curves}
+
+    def close(self):
+        """Összes blokk felszabadítása (koordinátor leállásakor)"""
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+        self._blocks.clear()
+
+    @staticmethod
+    def attach(spec: Dict, registry: TechCurveRegistry) -> Tuple[List, List[str]]:
+        """
+        Worker oldal: blokkok csatolása és a görbék beállítása a folyamat registry-jébe
+
+        Nem csatolható blokk (közben újratöltött görbe) kimarad: a silo első
+        kérésére a registry a CSV-ből tölt, az új leíró pedig úton van.
+
+        Returns:
+            (csatolt blokkok - a nézetek élettartamáig meg kell tartani, változott görbék útvonalai)
+        """
+        blocks = []
+        changed = []
+        for csv_path, info in spec['curves'].items():
+            try:
+                block = shared_memory.SharedMemory(name=info['shm'])
+            except FileNotFoundError:
+                continue
+
+            days = info['days']
+            data = np.ndarray((2 * days + 1,), dtype=np.float64, buffer=block.buf)
+            data.flags.writeable = False
+            curve = TechnologicalFeedData.from_arrays(csv_path, data[:days], data[days:], info['is_fallback'])
+
+            blocks.append(block)
+            if registry.install(spec['names'], csv_path, curve, info['digest']):
+                changed.append(csv_path)
+
+        return blocks, changed
+
+
+class ShardLink:
+    """
+    Worker folyamat kapcsolata a koordinátorral (sharded mód)
+
+    A bejövő parancsokat (silo kiosztás, új tech görbék, leállítás) egy olvasó
+    szál gyűjti és felébreszti az ütemezőt; a parancsokat a fő szál alkalmazza.
+    Az eredmények és metrikák a közös eredmény sorba kerülnek.
+    """
+
+    def __init__(self, shard_id: int, inbox, results):
+        self.shard_id = shard_id
+        self.inbox = inbox
+        self.results = results
+        self.commands = deque()
+        self._blocks = []  # Csatolt megosztott memória blokkok (régiek is: futó számolás még használhatja)
+
+    def start(self, wakeup: threading.Event):
+        """Parancs olvasó szál indítása"""
+        reader = threading.Thread(target=self._read_inbox, args=(wakeup,),
+                                  name=f"shard{self.shard_id}-inbox", daemon=True)
+        reader.start()
+
+    def _read_inbox(self, wakeup: threading.Event):
+        while True:
+            command = self.inbox.get()
+            self.commands.append(command)
+            wakeup.set()
+            if command[0] == 'stop':
+                return
+
+    def attach_curves(self, spec: Dict) -> List[str]:
+        """Tech görbék csatolása megosztott memóriából; a változott görbék útvonalai"""
+        blocks, changed = SharedTechCurves.attach(spec, TECH_CURVES)
+        self._blocks.extend(blocks)
+        return changed
+
+    def send(self, message: Dict):
+        message.update(shard=self.shard_id, pid=os.getpid(), at=time.time())
+        self.results.put(message)
+
+    def report_job(self, kind: str, silo: 'SiloPredictor', ok: bool, seconds: float,
+                   refill_event: Optional[Dict] = None):
+        """Befejezett feladat jelentése (metrika + a siló utolsó előrejelzésének összegzése)"""
+        prediction = silo.last_prediction or {}
+        self.send({
+            'type': 'job',
+            'kind': kind,
+            'silo': silo.entity_id,
+            'ok': ok,
+            'seconds': round(seconds, 3),
+            'refill_event': refill_event,
+            'prediction': {key: prediction.get(key) for key in
+                           ('status', 'prediction_date', 'days_until_empty', 'current_weight', 'bird_count')}
+        })
+
+
+def _shard_worker_main(shard_id: int, curve_spec: Dict, inbox, results):
+    """Sharded mód: worker folyamat belépési pontja (silókat a koordinátor küld)"""
+    threading.current_thread().name = f"shard{shard_id}"
+    link = ShardLink(shard_id, inbox, results)
+    link.attach_curves(curve_spec)
+
+    manager = MultiSiloManager(silo_configs=[], shard=link)
+    link.send({'type': 'ready'})
+    manager.run(wait_for_ha=False)
+
+
+class ShardWorker:
+    """Koordinátor oldali nyilvántartás egy worker folyamatról"""
+
+    def __init__(self, shard_id: int):
+        self.shard_id = shard_id
+        self.process = None
+        self.inbox = None
+        self.entity_ids = set()
+        self.crashes = deque()  # Összeomlások ideje (SHARD_RESTART_WINDOW-n belül)
+        self.retired = False
+        self.jobs = 0
+        self.failures = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class ShardCoordinator:
+    """
+    Sharded mód nagy siló flottákhoz: N worker folyamat, mindegyik a silók egy
+    részhalmazát futtatja saját MultiSiloManager ütemezővel
+
+    - A tech görbéket egyszer fordítja és megosztott memóriában adja át (SharedTechCurves),
+      görbefájl változáskor újra közzéteszi és értesíti a workereket
+    - Az eredményeket és metrikákat egy közös sorból gyűjti
+    - Összeomlott worker újraindul és visszakapja a silóit (legkevésbé terhelt worker kapja
+      őket); túl gyakori összeomlásnál a worker kiesik, a silói a többi workerre kerülnek
+    """
+
+    def __init__(self, worker_processes: int):
+        self.tech_curves_dir = os.getenv('TECH_CURVES_DIR', DEFAULT_TECH_CURVES_DIR)
+        self.silo_configs = {cfg['entity_id']: cfg for cfg in MultiSiloManager._read_silo_configs()
+                             if 'entity_id' in cfg}
+
+        # 'spawn': tiszta worker folyamat (a szálakat futtató koordinátor nem fork-olódik)
+        self.context = multiprocessing.get_context('spawn')
+        self.results = self.context.Queue()
+        self.workers = [ShardWorker(shard_id) for shard_id in range(worker_processes)]
+        self.shared_curves = SharedTechCurves()
+        self.curve_spec = None
+        self.latest = {}  # {entity_id: utolsó jelentett feladat eredmény}
+        self.ha_ready_wait_seconds = None
+
+        logger.info(f"🧩 Sharded mód: {len(self.silo_configs)} silo, {worker_processes} worker folyamat")
+
+    def _start_worker(self, worker: ShardWorker):
+        worker.inbox = self.context.Queue()
+        worker.process = self.context.Process(
+            target=_shard_worker_main,
+            args=(worker.shard_id, self.curve_spec, worker.inbox, self.results),
+            name=f"shard{worker.shard_id}",
+            daemon=True
+        )
+        worker.process.start()
+        logger.info(f"🚀 Worker #{worker.shard_id} indítva (pid {worker.process.pid})")
+
+    def _assign(self, entity_ids: List[str]):
+        """Silók kiosztása a legkevésbé terhelt élő workerekre"""
+        candidates = [worker for worker in self.workers if not worker.retired and worker.alive]
+        if not candidates:
+            logger.error(f"❌ Nincs élő worker, {len(entity_ids)} silo kiosztatlan")
+            return
+
+        batches = {}
+        for entity_id in entity_ids:
+            worker = min(candidates, key=lambda w: (len(w.entity_ids), w.shard_id))
+            worker.entity_ids.add(entity_id)
+            batches.setdefault(worker.shard_id, []).append(self.silo_configs[entity_id])
+
+        for shard_id, configs in batches.items():
+            self.workers[shard_id].inbox.put(('assign', configs))
+            logger.info(f"📦 Worker #{shard_id}: +{len(configs)} silo "
+                       f"({len(self.workers[shard_id].entity_ids)} összesen)")
+
+    def _check_workers(self):
+        """Leállt workerek újraindítása, silóik újra kiosztása"""
+        for worker in self.workers:
+            if worker.retired or worker.process is None or worker.alive:
+                continue
+
+            orphans = sorted(worker.entity_ids)
+            worker.entity_ids = set()
+            now = time.time()
+            worker.crashes.append(now)
+            while worker.crashes and worker.crashes[0] < now - SHARD_RESTART_WINDOW:
+                worker.crashes.popleft()
+
+            logger.error(f"💥 Worker #{worker.shard_id} leállt (exit {worker.process.exitcode}), "
+                         f"{len(orphans)} silo újra kiosztása")
+
+            others_alive = any(w.alive and not w.retired for w in self.workers if w is not worker)
+            if len(worker.crashes) > SHARD_MAX_RESTARTS and others_alive:
+                worker.retired = True
+                logger.error(f"❌ Worker #{worker.shard_id} kiesett ({len(worker.crashes)} összeomlás "
+                             f"{SHARD_RESTART_WINDOW // 60} percen belül), silói a többi workerre kerülnek")
+            else:
+                self._start_worker(worker)
+
+            self._assign(orphans)
+
+    def _collect(self, timeout: float):
+        """Eredmények / metrikák begyűjtése (legfeljebb timeout másodperc várakozással)"""
+        try:
+            message = self.results.get(timeout=timeout)
+        except queue.Empty:
+            return
 
         while True:
+            self._handle_result(message)
             try:
-                now = datetime.now(LOCAL_TZ)
-                current_date = now.date()
-
-                # ÉJFÉLI FRISSÍTÉS: ha új nap van VAGY első indulás
-                need_full_process = (last_process_date is None or current_date > last_process_date)
-
-                if need_full_process:
-                    logger.info("=" * 60)
-                    if last_process_date is None:
-                        logger.info(f"🚀 INDULÁSI feldolgozás ({len(self.silos)} silo)")
-                    else:
-                        logger.info(f"🌙 ÉJFÉLI feldolgozás ({len(self.silos)} silo) - {current_date}")
-
-                    for silo in self.silos:
-                        silo.process()
-
-                    logger.info(f"✅ Feldolgozási ciklus befejezve")
-                    last_process_date = current_date
-
-                # Folyamatos refill monitoring (1 percenként)
-                # COOLDOWN: ne detektálja újra ugyanazt a feltöltést
-                time_since_refill = time.time() - last_refill_time
-                refill_detected = False
-
-                if time_since_refill >= REFILL_COOLDOWN:
-                    for silo in self.silos:
-                        if self._check_recent_refill(silo):
-                            refill_detected = True
-                else:
-                    remaining = int((REFILL_COOLDOWN - time_since_refill) / 60)
-                    if remaining % 10 == 0:  # Csak 10 percenként logol
-                        logger.info(f"⏸️ Refill cooldown: {remaining} perc hátra")
+                message = self.results.get_nowait()
+            except queue.Empty:
+                return
+
+    def _handle_result(self, message: Dict):
+        worker = self.workers[message['shard']]
+        if message['type'] == 'ready':
+            logger.info(f"✅ Worker #{worker.shard_id} kész (pid {message['pid']})")
+            return
 
-                # Ha feltöltést detektáltunk, várunk 15 percet és újra feldolgozunk
-                if refill_detected:
-                    logger.info(f"⚡ FELTÖLTÉS DETEKTÁLVA! Várakozás 15 perc, majd újra feldolgozás...")
-                    time.sleep(15 * 60)  # 15 perc
+        worker.jobs += 1
+        worker.busy_seconds += message['seconds']
+        if not message['ok']:
+            worker.failures += 1
+        self.latest[message['silo']] = message
 
-                    logger.info("=" * 60)
-                    logger.info("🔄 Feltöltés utáni AZONNALI újrafeldolgozás...")
-                    for silo in self.silos:
-                        silo.process()
+    def _check_tech_curve_reload(self):
+        """Változott görbefájlok: újrafordítás, közzététel és a workerek értesítése"""
+        reloaded = TECH_CURVES.check_reload()
+        if not reloaded:
+            return
 
-                    logger.info(f"✅ Feltöltés utáni frissítés befejezve")
-                    last_refill_time = time.time()  # COOLDOWN INDÍTÁS
-                    logger.info(f"⏸️ Refill cooldown indítva (15 perc - nem detektál új feltöltést)")
+        self.curve_spec = self.shared_curves.publish(TECH_CURVES, reloaded)
+        for worker in self.workers:
+            if worker.alive:
+                worker.inbox.put(('tech_curves', self.curve_spec))
+
+    def _log_metrics(self):
+        for worker in self.workers:
+            state = 'kiesett' if worker.retired else ('fut' if worker.alive else 'leállt')
+            mean_seconds = worker.busy_seconds / worker.jobs if worker.jobs else 0.0
+            logger.info(f"📈 Worker #{worker.shard_id} ({state}): {len(worker.entity_ids)} silo, "
+                       f"{worker.jobs} feladat, {worker.failures} hiba, átlag {mean_seconds:.2f} s, "
+                       f"{len(worker.crashes)} újraindítás")
+
+    def stop(self):
+        """Workerek leállítása és a megosztott memória felszabadítása"""
+        for worker in self.workers:
+            if worker.alive:
+                worker.inbox.put(('stop', None))
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.join(timeout=10)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+        self.shared_curves.close()
 
-                # Következő refill check (1 perc múlva)
-                time.sleep(REFILL_CHECK_INTERVAL)
+    def run(self):
+        """Koordinátor fő ciklusa"""
+        # Várakozás Home Assistant core felállására (a workerek már nem várnak)
+        self.ha_ready_wait_seconds = wait_for_home_assistant(
+            os.getenv('HA_URL', 'http://supervisor/core'), os.getenv('HA_TOKEN', os.getenv('SUPERVISOR_TOKEN')))
+
+        # Görbék egyszeri fordítása és közzététele
+        TECH_CURVES.register_directory(self.tech_curves_dir)
+        TECH_CURVES.get_named(DEFAULT_TECH_CURVE)
+        for cfg in self.silo_configs.values():
+            TECH_CURVES.get_named(cfg.get('tech_curve'))
+        self.curve_spec = self.shared_curves.publish(TECH_CURVES)
+
+        for worker in self.workers:
+            self._start_worker(worker)
+        self._assign(list(self.silo_configs))
+
+        next_reload = time.time() + TECH_RELOAD_CHECK_INTERVAL
+        next_metrics = time.time() + SHARD_METRICS_INTERVAL
+        try:
+            while True:
+                self._collect(SHARD_POLL_INTERVAL)
+                self._check_workers()
 
-            except Exception as e:
-                logger.error(f"❌ Hiba a futás során: {e}", exc_info=True)
-                time.sleep(60)
+                now = time.time()
+                if now >= next_reload:
+                    self._check_tech_curve_reload()
+                    next_reload = now + TECH_RELOAD_CHECK_INTERVAL
+                if now >= next_metrics:
+                    self._log_metrics()
+                    next_metrics = now + SHARD_METRICS_INTERVAL
+        finally:
+            self.stop()
 
 
 if __name__ == '__main__':
-    manager = MultiSiloManager()
-    manager.run()
+    worker_processes = int(os.getenv('WORKER_PROCESSES', '0'))
+    if worker_processes > 0:
+        ShardCoordinator(worker_processes).run()
+    else:
+        manager = MultiSiloManager()
+        manager.run()